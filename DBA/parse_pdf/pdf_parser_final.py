@@ -1,11 +1,31 @@
 import PyPDF2
+import os
 import re
 import io
+import sys
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from pdf2image import convert_from_bytes  # Para converter PDF para imagem
 import pytesseract  # Para o OCR
 
+# Núcleo de parse compartilhado com o serviço (no_fluxo_backend/parse-pdf):
+# padrões e limpeza de nomes, sem duplicar as regex aqui.
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "..",
+        "no_fluxo_backend",
+        "parse-pdf",
+    ),
+)
+from historico_parser import (  # noqa: E402
+    extrair_curso,
+    limpar_nome_disciplina,
+    padrao_ira,
+)
+
 app = Flask(__name__)
 CORS(app)
 
@@ -22,21 +42,10 @@ CORS(app)
 
 # Padrões de Expressão Regular (Regex)
 # --- Geral ---
-padrao_ira = re.compile(r"IRA[:\s]+(\d+\.\d+)", re.IGNORECASE)
 padrao_curriculo = r"(\d+/\d+(?:\s*-\s*\d{4}\.\d)?)"
 padrao_pend = re.compile(r"\b(APR|CANC|DISP|MATR|REP|REPF|REPMF|TRANC|CUMP)\b")
 padrao_natureza = re.compile(r"(\*|e|&|#|@|§|%)")
 
-# --- Extração de Curso ---
-padrao_curso = re.compile(
-    r"(?:CURSO|GRADUAÇÃO|BACHARELADO|LICENCIATURA)[:\s]+([A-ZÀ-Ÿ\s]+?)(?:\n|$)",
-    re.IGNORECASE,
-)
-padrao_curso_alternativo = re.compile(
-    r"(?:ENGENHARIA|CIÊNCIA|ADMINISTRAÇÃO|DIREITO|MEDICINA|PEDAGOGIA|LETRAS|HISTÓRIA|GEOGRAFIA|MATEMÁTICA|FÍSICA|QUÍMICA|BIOLOGIA|PSICOLOGIA|SOCIOLOGIA|FILOSOFIA|ECONOMIA|CONTABILIDADE|SISTEMAS|COMPUTAÇÃO|INFORMÁTICA|TECNOLOGIA)[\s\wÀ-Ÿ]+",
-    re.IGNORECASE,
-)
-
 # --- Disciplinas Padrão (com professor) ---
 padrao_status = re.compile(r"\b(APR|CANC|DISP|MATR|REP|REPF|REPMF|TRANC|CUMP)\b")
 padrao_mencao = re.compile(r"\b(SS|MS|MM|MI|II|SR)\b")
@@ -51,57 +60,6 @@ padrao_horas_cump = re.compile(
 )  # Ex: LET0331 60 100,0
 
 
-def extrair_curso(texto):
-    """
-    Extrai o nome do curso do texto do PDF
-    """
-    # Tentar padrão específico primeiro
-    match_curso = padrao_curso.search(texto)
-    if match_curso:
-        curso = match_curso.group(1).strip()
-        print(f"🎓 Curso extraído: {curso}")
-        return curso
-
-    # Tentar padrão alternativo
-    match_curso_alt = padrao_curso_alternativo.search(texto)
-    if match_curso_alt:
-        curso = match_curso_alt.group(0).strip()
-        print(f"🎓 Curso extraído (padrão alternativo): {curso}")
-        return curso
-
-    print("⚠️ Curso não encontrado no PDF")
-    return None
-
-
-def limpar_nome_disciplina(nome):
-    """
-    Remove períodos e outros elementos desnecessários do nome da disciplina
-    """
-    if not nome:
-        return nome
-
-    nome_original = nome
-
-    # Remove padrões de período como "2023.1", "2024.2", etc.
-    nome_limpo = re.sub(r"^\d{4}\.\d\s*", "", nome)
-
-    # Remove outros padrões comuns que podem aparecer no início
-    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
-    nome_limpo = re.sub(r"^—\s*", "", nome_limpo)
-
-    # Remove apenas caracteres especiais do início e fim, preservando letras, números e espaços
-    nome_limpo = re.sub(r"^[^\w\s]+|[^\w\s]+$", "", nome_limpo)
-
-    # Remove espaços extras
-    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
-
-    # Debug: mostrar quando o nome foi alterado
-    if nome_original != nome_limpo:
-        print(f"🔧 Limpeza: '{nome_original}' → '{nome_limpo}'")
-
-    return nome_limpo
-
-
 @app.route("/upload-pdf", methods=["POST"])
 def upload_pdf():
     """
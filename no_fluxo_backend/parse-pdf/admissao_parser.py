@@ -0,0 +1,171 @@
+"""
+Controle de admissão do /upload-pdf: limita os parses simultâneos e a fila
+de espera, e recusa rápido o que passar disso.
+
+Sem limite, um pico de uploads é todo aceito: cada requisição abre o PDF e
+disputa CPU com as outras, a latência sobe para todo mundo e o pod pode ser
+morto por falta de memória. Aqui cada parse fora do cache precisa de uma
+vaga (``PDF_PARSER_MAX_PARSES``); sem vaga livre a requisição espera numa
+fila limitada (``PDF_PARSER_FILA_MAX``) por até ``PDF_PARSER_FILA_ESPERA``
+segundos. Recusas:
+    - 429 quando a fila já está cheia (verificado antes de ler o corpo);
+    - 503 quando a espera na fila estoura o limite;
+    - 413 quando o PDF tem mais que ``PDF_PARSER_MAX_PAGINAS`` páginas
+      (contadas só pelo xref, antes de ocupar uma vaga).
+429 e 503 levam ``Retry-After`` estimado pela fila atual e pelo tempo médio
+dos últimos parses. Hits do cache não ocupam vaga.
+
+Profundidade da fila, vagas ocupadas, espera e recusas por motivo vão para o
+``/metrics`` (ver metricas_parser.py).
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_MAX_PARSES   parses simultâneos; 0 desliga a admissão
+                            (padrão: PDF_PARSER_POOL_WORKERS se o pool estiver
+                            ligado, senão o nº de CPUs)
+    PDF_PARSER_FILA_MAX     requisições esperando vaga (padrão: 2x MAX_PARSES)
+    PDF_PARSER_FILA_ESPERA  espera máxima na fila, em segundos (padrão: 10)
+    PDF_PARSER_MAX_PAGINAS  páginas por PDF; 0 desliga (padrão: 100)
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from metricas_parser import (
+    ESPERA_ADMISSAO,
+    FILA_ADMISSAO,
+    PARSES_EM_ANDAMENTO,
+    RECUSAS,
+)
+from pool_parser import POOL_WORKERS
+
+MAX_PARSES = int(
+    os.environ.get("PDF_PARSER_MAX_PARSES", str(POOL_WORKERS or os.cpu_count() or 2))
+)
+FILA_MAX = int(os.environ.get("PDF_PARSER_FILA_MAX", str(2 * MAX_PARSES)))
+FILA_ESPERA = float(os.environ.get("PDF_PARSER_FILA_ESPERA", "10"))
+MAX_PAGINAS = int(os.environ.get("PDF_PARSER_MAX_PAGINAS", "100"))
+
+MENSAGEM_FILA_CHEIA = (
+    "Muitos históricos sendo processados agora. Tente novamente em instantes."
+)
+MENSAGEM_SOBRECARGA = "O serviço está sobrecarregado. Tente novamente em instantes."
+
+# Peso de cada parse novo na média móvel usada no Retry-After
+_PESO_MEDIA = 0.2
+
+
+class AdmissaoRecusada(Exception):
+    """Requisição recusada pela admissão; ``status`` é o HTTP da resposta."""
+
+    def __init__(self, mensagem, status, motivo, retry_after=None):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+class ControleAdmissao:
+    """
+    Vagas de parse com fila de espera limitada. Thread-safe; um por processo
+    do servidor (cada processo do gunicorn tem o seu).
+    """
+
+    def __init__(
+        self,
+        max_parses=MAX_PARSES,
+        fila_max=FILA_MAX,
+        espera_s=FILA_ESPERA,
+        max_paginas=MAX_PAGINAS,
+    ):
+        self.max_parses = max_parses
+        self.fila_max = fila_max
+        self.espera_s = espera_s
+        self.max_paginas = max_paginas
+        self.em_andamento = 0
+        self.na_fila = 0
+        self.tempo_medio_s = 1.0
+        self._cond = threading.Condition()
+
+    @property
+    def ativa(self):
+        return self.max_parses > 0
+
+    def retry_after(self):
+        """Segundos estimados até abrir espaço para mais uma requisição."""
+        rodadas = (self.na_fila + 1) / max(1, self.max_parses)
+        return max(1, math.ceil(self.tempo_medio_s * rodadas))
+
+    def _recusar(self, motivo, status, mensagem):
+        RECUSAS.inc(reason=motivo)
+        raise AdmissaoRecusada(mensagem, status, motivo, self.retry_after())
+
+    def verificar_fila(self):
+        """
+        Recusa com 429 se a fila já estiver cheia. Barato (não lê o corpo da
+        requisição); a vaga em si só é pedida por ``entrar``.
+        """
+        if not self.ativa:
+            return
+        with self._cond:
+            if self.em_andamento >= self.max_parses and self.na_fila >= self.fila_max:
+                self._recusar("queue_full", 429, MENSAGEM_FILA_CHEIA)
+
+    def verificar_paginas(self, paginas):
+        if self.max_paginas > 0 and paginas > self.max_paginas:
+            RECUSAS.inc(reason="too_many_pages")
+            raise AdmissaoRecusada(
+                f"O PDF tem {paginas} páginas; o limite é {self.max_paginas}.",
+                413,
+                "too_many_pages",
+            )
+
+    def entrar(self):
+        """
+        Ocupa uma vaga de parse, esperando na fila se preciso. Devolve o
+        instante de entrada, que deve voltar em ``sair``.
+        """
+        if not self.ativa:
+            return time.perf_counter()
+        with self._cond:
+            if self.em_andamento >= self.max_parses:
+                if self.na_fila >= self.fila_max:
+                    self._recusar("queue_full", 429, MENSAGEM_FILA_CHEIA)
+                self.na_fila += 1
+                FILA_ADMISSAO.inc()
+                inicio = time.perf_counter()
+                try:
+                    livre = self._cond.wait_for(
+                        lambda: self.em_andamento < self.max_parses, self.espera_s
+                    )
+                finally:
+                    self.na_fila -= 1
+                    FILA_ADMISSAO.dec()
+                ESPERA_ADMISSAO.observar(time.perf_counter() - inicio)
+                if not livre:
+                    self._recusar("queue_timeout", 503, MENSAGEM_SOBRECARGA)
+            self.em_andamento += 1
+            PARSES_EM_ANDAMENTO.inc()
+        return time.perf_counter()
+
+    def sair(self, entrada):
+        if not self.ativa:
+            return
+        duracao = time.perf_counter() - entrada
+        with self._cond:
+            self.em_andamento -= 1
+            PARSES_EM_ANDAMENTO.dec()
+            self.tempo_medio_s += _PESO_MEDIA * (duracao - self.tempo_medio_s)
+            self._cond.notify()
+
+    @contextmanager
+    def vaga(self):
+        """``entrar``/``sair`` em volta do bloco."""
+        entrada = self.entrar()
+        try:
+            yield
+        finally:
+            self.sair(entrada)
@@ -0,0 +1,415 @@
+"""
+Modo ASGI do serviço parse-pdf (Starlette + uvicorn).
+
+O ``app.run`` do Flask (``python pdf_parser_final.py``) prende uma thread por
+requisição desde o primeiro byte do upload: um cliente lento no 4G segura a
+thread enquanto o corpo chega. Aqui o multipart é lido de forma assíncrona,
+pedaço a pedaço, direto para o spool (``spool_upload.ArquivoSpool``, com o
+SHA-256 calculado na gravação), e só o parse (CPU) vai para um executor de
+threads dedicado. Enquanto o corpo chega nenhuma vaga de parse nem thread do
+executor fica ocupada.
+
+O contrato do /upload-pdf é o mesmo do Flask, com a mesma lógica por baixo
+(``processar_upload``/``preparar_streaming`` de pdf_parser_final.py):
+campo ``pdf`` no multipart, ``?profile=``, ``?trace=1``, NDJSON com
+``Accept: application/x-ndjson``, modo diff (campos ``anterior`` e
+``anterior_hash``), admissão (429/503/413), ``X-Parse-Cache``,
+``X-Parse-Hash``, ``Server-Timing`` e compressão negociada. Também expõe
+``/metrics`` e ``/cache/stats``; o /upload-pdf-batch continua só no Flask.
+
+Uso (dependências em requirements_asgi.txt):
+    uvicorn asgi_parser:app --port 3001
+    python asgi_parser.py
+
+Configuração por variáveis de ambiente (além das do pdf_parser_final.py):
+    PDF_PARSER_ASGI_THREADS  threads do executor de parse (padrão: vagas da
+                             admissão + fila, ou o nº de CPUs com ela
+                             desligada)
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import pdf_parser_final as servico
+from admissao_parser import AdmissaoRecusada
+from cache_parser import chave_do_hash
+from compressao_resposta import comprimir_corpo
+from metricas_parser import (
+    EM_ANDAMENTO,
+    MIMETYPE_PROMETHEUS,
+    REQUISICAO_SEGUNDOS,
+    REQUISICOES,
+    exposicao,
+    server_timing,
+)
+from pool_parser import iniciar_pool
+from spool_upload import ArquivoSpool
+
+logger = logging.getLogger(__name__)
+
+_THREADS_PADRAO = (
+    servico.admissao.max_parses + servico.admissao.fila_max
+    if servico.admissao.ativa
+    else os.cpu_count() or 2
+)
+ASGI_THREADS = int(os.environ.get("PDF_PARSER_ASGI_THREADS", str(_THREADS_PADRAO)))
+
+# Parse (CPU) e leitura do PDF rodam aqui, nunca no loop de eventos; criado a
+# cada ciclo de vida da aplicação (ver ``ciclo_de_vida``)
+executor_parse = None
+
+
+class UploadInvalido(Exception):
+    """Corpo da requisição recusado antes do parse (``status`` HTTP)."""
+
+    def __init__(self, payload, status):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+        self.status = status
+
+
+class _LeitorMultipart:
+    """
+    Callbacks do ``python_multipart.MultipartParser``: grava a parte ``campo``
+    (a primeira com esse nome) num ``ArquivoSpool``, guarda em memória as
+    partes ``extras`` (campos pequenos, ex.: os do modo diff) e ignora as
+    demais.
+    """
+
+    def __init__(self, campo, extras=()):
+        self.campo = campo
+        self.extras = extras
+        self.campos = {}
+        self.spool = None
+        self.filename = None
+        self.content_type = None
+        self._cabecalhos = {}
+        self._nome = b""
+        self._valor = b""
+        self._destino = None
+
+    def on_part_begin(self):
+        self._cabecalhos = {}
+        self._destino = None
+
+    def on_header_field(self, dados, inicio, fim):
+        self._nome += dados[inicio:fim]
+
+    def on_header_value(self, dados, inicio, fim):
+        self._valor += dados[inicio:fim]
+
+    def on_header_end(self):
+        self._cabecalhos[self._nome.lower()] = self._valor
+        self._nome = self._valor = b""
+
+    def on_headers_finished(self):
+        _, opcoes = parse_options_header(
+            self._cabecalhos.get(b"content-disposition", b"")
+        )
+        nome = opcoes.get(b"name", b"").decode("utf-8", "replace")
+        if self.spool is None and nome == self.campo:
+            self.spool = self._destino = ArquivoSpool()
+            self.filename = opcoes.get(b"filename", b"").decode("utf-8", "replace")
+            tipo = self._cabecalhos.get(b"content-type", b"")
+            self.content_type = tipo.decode("latin-1") or None
+        elif nome in self.extras and nome not in self.campos:
+            self.campos[nome] = self._destino = io.BytesIO()
+
+    def on_part_data(self, dados, inicio, fim):
+        # Pedaços de até ~64 KB indo para o page cache: a escrita síncrona
+        # no loop custa microssegundos e evita um salto de thread por pedaço
+        if self._destino is not None:
+            self._destino.write(dados[inicio:fim])
+
+    def on_part_end(self):
+        self._destino = None
+
+    def callbacks(self):
+        return {
+            nome: getattr(self, nome)
+            for nome in dir(self)
+            if nome.startswith("on_") and callable(getattr(self, nome))
+        }
+
+
+async def receber_pdf(request, campo="pdf", extras=()):
+    """
+    Lê o corpo multipart conforme ele chega e devolve ``(spool, filename,
+    content_type, campos)``: a parte ``campo`` (``spool`` None se ela não
+    veio) e o texto das partes ``extras`` que vieram (``{nome: str}``).
+    Estourar o ``MAX_CONTENT_LENGTH`` do serviço vira ``UploadInvalido`` 413,
+    sem ler o resto do corpo.
+    """
+    limite = servico.app.config["MAX_CONTENT_LENGTH"]
+    tipo, opcoes = parse_options_header(request.headers.get("content-type", ""))
+    if tipo != b"multipart/form-data" or not opcoes.get(b"boundary"):
+        raise UploadInvalido({"error": "Nenhum arquivo PDF enviado."}, 400)
+    declarado = request.headers.get("content-length")
+    if declarado is not None and declarado.isdigit() and int(declarado) > limite:
+        raise UploadInvalido(servico.ERRO_MUITO_GRANDE, 413)
+
+    leitor = _LeitorMultipart(campo, extras)
+    parser = MultipartParser(opcoes[b"boundary"], leitor.callbacks())
+    recebidos = 0
+    try:
+        async for pedaco in request.stream():
+            recebidos += len(pedaco)
+            if recebidos > limite:
+                raise UploadInvalido(servico.ERRO_MUITO_GRANDE, 413)
+            parser.write(pedaco)
+        parser.finalize()
+    except Exception:
+        if leitor.spool is not None:
+            leitor.spool.close()
+        raise
+
+    if leitor.spool is not None:
+        leitor.spool.flush()
+        leitor.spool.seek(0)
+    campos = {
+        nome: valor.getvalue().decode("utf-8", "replace")
+        for nome, valor in leitor.campos.items()
+    }
+    return leitor.spool, leitor.filename, leitor.content_type, campos
+
+
+def _json(payload, status=200, request=None, headers=None):
+    """JSON no mesmo formato do ``jsonify`` do Flask, comprimido se couber."""
+    corpo = (
+        json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(",", ":"))
+        + "\n"
+    ).encode()
+    headers = dict(headers or {})
+    if request is not None and 200 <= status < 300:
+        headers["Vary"] = "Accept-Encoding"
+        corpo, codificacao = comprimir_corpo(
+            corpo, parse_accept_header(request.headers.get("accept-encoding"))
+        )
+        if codificacao is not None:
+            headers["Content-Encoding"] = codificacao
+    return Response(corpo, status, headers, media_type="application/json")
+
+
+def _recusa(e):
+    headers = {}
+    if e.retry_after is not None:
+        headers["Retry-After"] = str(e.retry_after)
+    return _json(servico.payload_recusa(e), e.status, headers=headers)
+
+
+def _quer_streaming(request):
+    aceitos = parse_accept_header(request.headers.get("accept"), MIMEAccept)
+    melhor = aceitos.best_match(["application/json", servico.MIMETYPE_NDJSON])
+    return melhor == servico.MIMETYPE_NDJSON
+
+
+def _quer_trace(request):
+    valor = request.query_params.get("trace") or request.headers.get(
+        "x-parse-trace", ""
+    )
+    return valor.lower() in ("1", "true", "on")
+
+
+async def _no_executor(funcao, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor_parse, partial(funcao, *args, **kwargs))
+
+
+async def _linhas_no_executor(linhas, encerrar):
+    """Consome o gerador síncrono do streaming no executor, linha a linha."""
+    fim = object()
+    try:
+        while True:
+            linha = await _no_executor(next, linhas, fim)
+            if linha is fim:
+                return
+            yield linha
+    finally:
+        await _no_executor(encerrar)
+
+
+def medir_rota(rota):
+    """
+    Equivalente dos hooks de métricas do Flask: requisições em andamento,
+    contagem por status, duração e header ``Server-Timing`` (com a medição e
+    o resultado do cache que o handler deixar em ``request.state``).
+    """
+
+    def decorador(handler):
+        @wraps(handler)
+        async def medido(request):
+            if not servico.METRICAS_ATIVAS:
+                return await handler(request)
+            inicio = time.perf_counter()
+            EM_ANDAMENTO.inc(endpoint=rota)
+            try:
+                response = await handler(request)
+            finally:
+                EM_ANDAMENTO.dec(endpoint=rota)
+            total_s = time.perf_counter() - inicio
+            REQUISICOES.inc(endpoint=rota, status=str(response.status_code))
+            REQUISICAO_SEGUNDOS.observar(total_s, endpoint=rota)
+            response.headers["Server-Timing"] = server_timing(
+                getattr(request.state, "medicao", None),
+                total_s,
+                getattr(request.state, "cache_hit", None),
+            )
+            return response
+
+        return medido
+
+    return decorador
+
+
+@medir_rota("/upload-pdf")
+async def upload_pdf(request):
+    """Mesmo contrato do /upload-pdf do Flask (ver pdf_parser_final.py)."""
+    # Fila cheia: recusa antes de ler o corpo da requisição
+    try:
+        servico.admissao.verificar_fila()
+    except AdmissaoRecusada as e:
+        return _recusa(e)
+
+    perfil = request.query_params.get("profile", "full")
+    try:
+        spool, filename, content_type, campos = await receber_pdf(
+            request, extras=("anterior", "anterior_hash")
+        )
+    except UploadInvalido as e:
+        return _json(e.payload, e.status)
+    if spool is None:
+        return _json({"error": "Nenhum arquivo PDF enviado."}, 400)
+
+    try:
+        logger.info(f"Processing file: {filename} ({spool.tamanho} bytes)")
+        if perfil not in servico.PERFIS_RESPOSTA:
+            return _json(servico.erro_de_perfil(perfil), 400)
+        pdf, tamanho = spool.caminho, spool.tamanho
+        sha256 = spool.sha256()
+        chave = chave_do_hash(sha256, servico.VERSAO_PARSER)
+        anterior_hash, anterior = campos.get("anterior_hash"), campos.get("anterior")
+        try:
+            if anterior_hash or anterior:
+                resultado, origem = await _no_executor(
+                    servico.carregar_anterior, anterior_hash, anterior
+                )
+                payload, status, hit, medicao = await _no_executor(
+                    servico.processar_diff,
+                    pdf,
+                    tamanho,
+                    sha256,
+                    filename,
+                    resultado,
+                    origem,
+                )
+            elif _quer_streaming(request):
+                linhas, hit, encerrar = await _no_executor(
+                    servico.preparar_streaming,
+                    pdf,
+                    filename,
+                    servico.extrair_matricula(filename),
+                    chave,
+                    tamanho,
+                )
+                request.state.cache_hit = hit
+                return StreamingResponse(
+                    _linhas_no_executor(linhas, encerrar),
+                    media_type=servico.MIMETYPE_NDJSON,
+                    headers={"X-Parse-Cache": "HIT" if hit else "MISS"},
+                )
+            else:
+                payload, status, hit, medicao = await _no_executor(
+                    servico.processar_upload,
+                    pdf,
+                    tamanho,
+                    chave,
+                    filename,
+                    perfil,
+                    com_trace=_quer_trace(request),
+                )
+        except AdmissaoRecusada as e:
+            return _recusa(e)
+        except servico.AnteriorInvalido as e:
+            return _json(e.payload, e.status)
+        except Exception as e:
+            payload, status = servico.erro_de_parse(e)
+            return _json(payload, status)
+    finally:
+        # No streaming o MuPDF já abriu o arquivo e mantém o próprio descritor
+        spool.close()
+
+    request.state.medicao, request.state.cache_hit = medicao, hit
+    headers = {}
+    if status == 200:
+        headers = {"X-Parse-Cache": "HIT" if hit else "MISS", "X-Parse-Hash": sha256}
+    return _json(payload, status, request, headers)
+
+
+@medir_rota("/metrics")
+async def metrics(request):
+    if not servico.METRICAS_ATIVAS:
+        return _json({"error": "Métricas desligadas."}, 404)
+    return Response(exposicao(), headers={"Content-Type": MIMETYPE_PROMETHEUS})
+
+
+@medir_rota("/cache/stats")
+async def cache_stats(request):
+    estatisticas = servico.cache_parse.estatisticas()
+    return _json({"versao_parser": servico.VERSAO_PARSER, **estatisticas})
+
+
+@asynccontextmanager
+async def ciclo_de_vida(_app):
+    global executor_parse
+    # O pool (se PDF_PARSER_POOL_WORKERS > 0) é forkado antes de o executor
+    # criar threads
+    iniciar_pool(servico.processar_pdf_medido)
+    executor_parse = ThreadPoolExecutor(
+        max_workers=max(1, ASGI_THREADS), thread_name_prefix="parse"
+    )
+    try:
+        yield
+    finally:
+        executor_parse.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/upload-pdf", upload_pdf, methods=["POST"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/cache/stats", cache_stats, methods=["GET"]),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+    ],
+    lifespan=ciclo_de_vida,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logger.info("Starting PDF parser service (ASGI) on port 3001")
+    uvicorn.run(app, port=3001)
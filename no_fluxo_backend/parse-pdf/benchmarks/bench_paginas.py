@@ -0,0 +1,90 @@
+"""
+Benchmark da extração de texto por página: serial x paralela por processos.
+
+Os históricos reais do repositório têm poucas páginas, então o script monta
+PDFs maiores concatenando os de test_historicos/historicos até o nº de
+páginas pedido e mede ``extrair_texto_paginas`` nos dois modos. Também
+confere que o texto final é idêntico.
+
+Uso (a partir de no_fluxo_backend/parse-pdf):
+    python benchmarks/bench_paginas.py --paginas 4 16 40 --workers 4
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+
+from pdf_parser_final import extrair_texto_paginas  # noqa: E402
+from pool_parser import _aquecer_worker, _contexto  # noqa: E402
+
+HISTORICOS = os.path.join(
+    AQUI, "..", "..", "..", "test_historicos", "historicos", "*.pdf"
+)
+
+
+def montar_pdf(paginas):
+    """PDF com ``paginas`` páginas copiadas, em ciclo, dos históricos reais."""
+    fontes = [fitz.open(caminho) for caminho in sorted(glob.glob(HISTORICOS))]
+    destino = fitz.open()
+    while destino.page_count < paginas:
+        for fonte in fontes:
+            faltam = paginas - destino.page_count
+            if faltam <= 0:
+                break
+            destino.insert_pdf(fonte, to_page=min(fonte.page_count, faltam) - 1)
+    dados = destino.tobytes()
+    destino.close()
+    for fonte in fontes:
+        fonte.close()
+    return dados
+
+
+def medir(pdf_bytes, executor, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        paginas = extrair_texto_paginas(pdf_bytes, executor=executor)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), "".join(f"{t}\n" for t in paginas if t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paginas", type=int, nargs="+", default=[4, 16, 40])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=_contexto(), initializer=_aquecer_worker
+    )
+    # primeira chamada sobe os workers; não entra na medição
+    executor.submit(_aquecer_worker).result()
+
+    print(f"{'paginas':>8} {'serial ms':>10} {'paralelo ms':>12} {'speedup':>8}")
+    try:
+        for paginas in args.paginas:
+            pdf_bytes = montar_pdf(paginas)
+            serial, texto_serial = medir(pdf_bytes, None, args.repeticoes)
+            paralelo, texto_paralelo = medir(pdf_bytes, executor, args.repeticoes)
+            if texto_serial != texto_paralelo:
+                sys.exit(f"texto divergente com {paginas} páginas")
+            print(
+                f"{paginas:>8} {serial:>10.1f} {paralelo:>12.1f} "
+                f"{serial / paralelo:>7.2f}x"
+            )
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmark das etapas do parser sobre históricos sintéticos.
+
+Gera PDFs com ``gerador_historico`` em vários tamanhos e layouts e mede, em
+separado, ``extract_structured_text`` (montagem do texto a partir dos dicts do
+PyMuPDF, já extraídos fora da medição) e ``extrair_dados_academicos`` (regex
+sobre o texto pronto). Cada par (cenário, etapa) roda num processo novo, então
+o pico de RSS reportado é o daquela etapa, não o do benchmark inteiro.
+
+Por etapa sai: p50, p95 e média em ms, páginas/s, disciplinas/s e pico de RSS.
+O resultado vai para um JSON com o commit e as versões; ``--comparar`` lê um
+JSON anterior, mostra a variação do p95 e sai com código 1 quando alguma etapa
+piorou mais que ``--tolerancia``.
+
+Uso (a partir de no_fluxo_backend/parse-pdf):
+    python benchmarks/bench_parser.py --saida bench.json
+    python benchmarks/bench_parser.py --disciplinas 40 500 --comparar bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+sys.path.insert(0, AQUI)
+
+ETAPAS = ("extract_structured_text", "extrair_dados_academicos")
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) com interpolação linear entre vizinhos."""
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    baixo = int(posicao)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+
+
+def _rss_pico_mb():
+    # ru_maxrss é KiB no Linux e bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir_etapa(layout, disciplinas, etapa, repeticoes, semente):
+    """
+    Roda no processo filho: gera o PDF, prepara a entrada da etapa e mede
+    ``repeticoes`` execuções (mais uma de aquecimento, descartada).
+    """
+    import logging
+
+    import fitz
+
+    logging.disable(logging.CRITICAL)
+    from gerador_historico import gerar_historico
+    from layout_spans import dict_da_pagina
+    from pdf_parser_final import extract_structured_text, extrair_dados_academicos
+
+    pdf_bytes, _ = gerar_historico(
+        layout=layout, disciplinas=disciplinas, semente=semente
+    )
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    dicts = [dict_da_pagina(page) for page in doc]
+    paginas = doc.page_count
+    doc.close()
+
+    if etapa == "extract_structured_text":
+
+        def executar():
+            return [extract_structured_text(d) for d in dicts]
+
+    else:
+        texto = "".join(f"{extract_structured_text(d)}\n" for d in dicts)
+
+        def executar():
+            return extrair_dados_academicos(texto)
+
+    executar()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        executar()
+        tempos.append(time.perf_counter() - inicio)
+
+    media = statistics.fmean(tempos)
+    return {
+        "layout": layout,
+        "disciplinas": disciplinas,
+        "paginas": paginas,
+        "bytes_pdf": len(pdf_bytes),
+        "etapa": etapa,
+        "repeticoes": repeticoes,
+        "ms_p50": round(percentil(tempos, 50) * 1000, 3),
+        "ms_p95": round(percentil(tempos, 95) * 1000, 3),
+        "ms_media": round(media * 1000, 3),
+        "paginas_por_s": round(paginas / media, 1),
+        "disciplinas_por_s": round(disciplinas / media, 1),
+        "rss_pico_mb": round(_rss_pico_mb(), 1),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=AQUI,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadados():
+    import fitz
+
+    from pdf_parser_final import VERSAO_PARSER
+
+    return {
+        "commit": _commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "versao_parser": VERSAO_PARSER,
+        "maquina": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _chave(r):
+    return (r["layout"], r["disciplinas"], r["etapa"])
+
+
+def comparar(base, atual, tolerancia):
+    """
+    Variação do p95 de cada etapa presente nos dois resultados. Devolve as
+    linhas formatadas e se alguma etapa piorou além da ``tolerancia``.
+    """
+    anteriores = {_chave(r): r for r in base["resultados"]}
+    linhas = []
+    regressao = False
+    for r in atual["resultados"]:
+        anterior = anteriores.get(_chave(r))
+        if anterior is None:
+            continue
+        variacao = r["ms_p95"] / anterior["ms_p95"] - 1
+        piorou = variacao > tolerancia
+        regressao = regressao or piorou
+        linhas.append(
+            f"{r['layout']:>7} {r['disciplinas']:>6} {r['etapa']:<25} "
+            f"{anterior['ms_p95']:>9.2f} {r['ms_p95']:>9.2f} {variacao:>+8.1%}"
+            f"{'  REGRESSÃO' if piorou else ''}"
+        )
+    return linhas, regressao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--disciplinas", type=int, nargs="+", default=[40, 150, 500])
+    parser.add_argument(
+        "--layouts", nargs="+", choices=["novo", "antigo"], default=["novo", "antigo"]
+    )
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=0.20,
+        help="piora relativa do p95 aceita no --comparar (padrão: 0.20)",
+    )
+    args = parser.parse_args()
+
+    # spawn: cada etapa começa com RSS limpo e sem herdar caches do pai
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+    print(
+        f"{'layout':>7} {'disc':>6} {'pág':>4} {'etapa':<25} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'pág/s':>9} {'disc/s':>10} {'RSS MB':>7}",
+        file=sys.stderr,
+    )
+    for layout in args.layouts:
+        for disciplinas in args.disciplinas:
+            for etapa in args.etapas:
+                with contexto.Pool(1) as pool:
+                    r = pool.apply(
+                        medir_etapa,
+                        (layout, disciplinas, etapa, args.repeticoes, args.semente),
+                    )
+                resultados.append(r)
+                print(
+                    f"{layout:>7} {disciplinas:>6} {r['paginas']:>4} {etapa:<25} "
+                    f"{r['ms_p50']:>9.2f} {r['ms_p95']:>9.2f} "
+                    f"{r['paginas_por_s']:>9.1f} {r['disciplinas_por_s']:>10.1f} "
+                    f"{r['rss_pico_mb']:>7.1f}",
+                    file=sys.stderr,
+                )
+
+    atual = {"meta": metadados(), "resultados": resultados}
+    conteudo = json.dumps(atual, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(conteudo + "\n")
+    else:
+        print(conteudo)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        linhas, regressao = comparar(base, atual, args.tolerancia)
+        print(
+            f"\np95 contra {base['meta'].get('commit')} "
+            f"(tolerância {args.tolerancia:.0%}):",
+            file=sys.stderr,
+        )
+        print(
+            f"{'layout':>7} {'disc':>6} {'etapa':<25} {'antes':>9} {'agora':>9} "
+            f"{'var':>8}",
+            file=sys.stderr,
+        )
+        for linha in linhas:
+            print(linha, file=sys.stderr)
+        if regressao:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
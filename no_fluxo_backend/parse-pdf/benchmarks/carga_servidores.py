@@ -0,0 +1,265 @@
+"""
+Teste de carga comparando o servidor Flask (``python pdf_parser_final.py``)
+com o modo ASGI (``uvicorn asgi_parser:app``) no /upload-pdf.
+
+Cada servidor sobe num processo próprio, com o cache de parse desligado
+(todo upload é parseado) e a fila da admissão do tamanho da carga. Em
+paralelo ao tráfego normal (``--clientes`` conexões enviando o PDF o mais
+rápido possível), ``--lentos`` clientes mandam
+o mesmo upload em pedaços espaçados ao longo de ``--lento-s`` segundos, como
+um celular em rede ruim. Por servidor sai: requisições/s, p50/p95/p99 da
+latência dos clientes rápidos, latência média dos lentos e contagem por
+status HTTP. O cliente HTTP é feito sobre ``asyncio`` puro, sem dependências.
+
+Uso (a partir de no_fluxo_backend/parse-pdf, com requirements_asgi.txt):
+    python benchmarks/carga_servidores.py
+    python benchmarks/carga_servidores.py --clientes 16 --lentos 8 --saida carga.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+PARSE_PDF = os.path.dirname(AQUI)
+sys.path.insert(0, PARSE_PDF)
+sys.path.insert(0, AQUI)
+
+from bench_parser import metadados, percentil  # noqa: E402
+
+FRONTEIRA = "----nofluxo-carga"
+PEDACO = 16 * 1024
+
+SERVIDORES = {
+    "flask": lambda porta: [
+        sys.executable,
+        "-c",
+        "import pdf_parser_final as m; m.iniciar_pool(m.processar_pdf_medido); "
+        f"m.app.run(port={porta})",
+    ],
+    "asgi": lambda porta: [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "asgi_parser:app",
+        "--port",
+        str(porta),
+        "--log-level",
+        "warning",
+    ],
+}
+
+
+def corpo_multipart(pdf_bytes, nome="historico_123456789.pdf"):
+    cabecalho = (
+        f"--{FRONTEIRA}\r\n"
+        f'Content-Disposition: form-data; name="pdf"; filename="{nome}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    return cabecalho + pdf_bytes + f"\r\n--{FRONTEIRA}--\r\n".encode()
+
+
+async def enviar(porta, corpo, atraso_por_pedaco=0.0):
+    """POST /upload-pdf; devolve ``(status, segundos)``. Status 0 = falha."""
+    inicio = time.perf_counter()
+    try:
+        leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+        escritor.write(
+            (
+                "POST /upload-pdf?profile=lean HTTP/1.1\r\n"
+                f"Host: 127.0.0.1:{porta}\r\n"
+                f"Content-Type: multipart/form-data; boundary={FRONTEIRA}\r\n"
+                f"Content-Length: {len(corpo)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+        )
+
+        async def escrever_corpo():
+            for i in range(0, len(corpo), PEDACO):
+                escritor.write(corpo[i : i + PEDACO])
+                await escritor.drain()
+                if atraso_por_pedaco:
+                    await asyncio.sleep(atraso_por_pedaco)
+
+        # O servidor pode responder (429) antes de ler o corpo inteiro: a
+        # resposta é lida enquanto o corpo ainda está sendo enviado
+        envio = asyncio.create_task(escrever_corpo())
+        try:
+            linha_status = await leitor.readline()
+            tamanho = None
+            while (linha := await leitor.readline()) not in (b"\r\n", b""):
+                nome, _, valor = linha.decode("latin-1").partition(":")
+                if nome.strip().lower() == "content-length":
+                    tamanho = int(valor)
+            # Com Content-Length não depende de o servidor fechar a conexão
+            if tamanho is None:
+                await leitor.read()
+            else:
+                await leitor.readexactly(tamanho)
+        finally:
+            envio.cancel()
+            escritor.close()
+        status = int(linha_status.split()[1])
+    except (OSError, IndexError, ValueError, asyncio.IncompleteReadError):
+        status = 0
+    return status, time.perf_counter() - inicio
+
+
+async def rodar_carga(porta, corpo, clientes, requisicoes, lentos, lento_s):
+    pedacos = max(1, -(-len(corpo) // PEDACO))
+    atraso = lento_s / pedacos
+    restantes = iter(range(requisicoes))
+    rapidas, lentas = [], []
+    terminou = asyncio.Event()
+
+    async def cliente_rapido():
+        for _ in restantes:
+            rapidas.append(await enviar(porta, corpo))
+
+    async def cliente_lento():
+        while not terminou.is_set():
+            lentas.append(await enviar(porta, corpo, atraso))
+
+    tarefas_lentas = [asyncio.create_task(cliente_lento()) for _ in range(lentos)]
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente_rapido() for _ in range(clientes)))
+    duracao = time.perf_counter() - inicio
+    terminou.set()
+    await asyncio.gather(*tarefas_lentas)
+    return rapidas, lentas, duracao
+
+
+def _esperar_porta(porta, processo, limite_s=30):
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError(f"servidor saiu com código {processo.returncode}")
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", porta)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"servidor não abriu a porta {porta}")
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_servidor(nome, corpo, args):
+    porta = _porta_livre()
+    # Fila da admissão do tamanho da carga: as requisições esperam vaga em vez
+    # de receber 429, e a comparação fica na latência
+    ambiente = {
+        **os.environ,
+        "PDF_PARSER_CACHE_ITENS": "0",
+        "PDF_PARSER_CACHE_DIR": "",
+        "PDF_PARSER_FILA_MAX": str(args.clientes + args.lentos),
+        "PDF_PARSER_FILA_ESPERA": "60",
+    }
+    processo = subprocess.Popen(
+        SERVIDORES[nome](porta),
+        cwd=PARSE_PDF,
+        env=ambiente,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _esperar_porta(porta, processo)
+        # aquecimento: primeira requisição paga imports e inicialização do MuPDF
+        asyncio.run(enviar(porta, corpo))
+        rapidas, lentas, duracao = asyncio.run(
+            rodar_carga(
+                porta,
+                corpo,
+                args.clientes,
+                args.requisicoes,
+                args.lentos,
+                args.lento_s,
+            )
+        )
+    finally:
+        processo.terminate()
+        processo.wait(10)
+
+    tempos = [t for s, t in rapidas if s == 200] or [0.0]
+    status = {}
+    for s, _ in rapidas + lentas:
+        status[str(s)] = status.get(str(s), 0) + 1
+    return {
+        "servidor": nome,
+        "requisicoes_por_s": round(len(rapidas) / duracao, 1),
+        "ms_p50": round(percentil(tempos, 50) * 1000, 1),
+        "ms_p95": round(percentil(tempos, 95) * 1000, 1),
+        "ms_p99": round(percentil(tempos, 99) * 1000, 1),
+        "lentos_concluidos": len(lentas),
+        "lentos_ms_media": (
+            round(statistics.fmean(t for _, t in lentas) * 1000, 1) if lentas else None
+        ),
+        "status": status,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--servidores",
+        nargs="+",
+        choices=list(SERVIDORES),
+        default=list(SERVIDORES),
+    )
+    parser.add_argument("--pdf", help="PDF enviado (padrão: histórico sintético)")
+    parser.add_argument("--disciplinas", type=int, default=150)
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--lentos", type=int, default=4)
+    parser.add_argument("--lento-s", type=float, default=5.0)
+    parser.add_argument("--saida", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            pdf_bytes = f.read()
+    else:
+        from gerador_historico import gerar_historico
+
+        pdf_bytes, _ = gerar_historico(disciplinas=args.disciplinas)
+    corpo = corpo_multipart(pdf_bytes)
+
+    print(
+        f"{'servidor':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'lentos':>7} {'lento ms':>9}  status",
+        file=sys.stderr,
+    )
+    resultados = []
+    for nome in args.servidores:
+        r = medir_servidor(nome, corpo, args)
+        resultados.append(r)
+        print(
+            f"{nome:>8} {r['requisicoes_por_s']:>8.1f} {r['ms_p50']:>9.1f} "
+            f"{r['ms_p95']:>9.1f} {r['ms_p99']:>9.1f} {r['lentos_concluidos']:>7} "
+            f"{r['lentos_ms_media'] or 0:>9.1f}  {r['status']}",
+            file=sys.stderr,
+        )
+
+    resultado = {
+        "meta": {**metadados(), "cenario": {**vars(args), "bytes_pdf": len(pdf_bytes)}},
+        "resultados": resultados,
+    }
+    conteudo = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(conteudo + "\n")
+    else:
+        print(conteudo)
+
+
+if __name__ == "__main__":
+    main()
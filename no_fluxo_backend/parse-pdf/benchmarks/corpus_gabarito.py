@@ -0,0 +1,283 @@
+"""
+Regressão e vazão do parser sobre o corpus real de test_historicos.
+
+Roda a extração (PyMuPDF posicional + ``extract_structured_text``, sem o
+cache de páginas) e ``extrair_dados_academicos`` em cada PDF de
+``test_historicos/historicos`` e compara com o gabarito guardado em
+``test_historicos/gabarito/<pdf>.json``: o texto linha a linha e os dados
+campo a campo. Cada diferença sai com o caminho do campo, por exemplo
+``dados.disciplinas[12].status: 'MATR' -> 'APR'``; itens inseridos ou
+removidos no meio de uma lista aparecem como tais, sem deslocar a comparação
+do resto.
+
+Junto da correção sai a vazão: ms da extração do texto e p50 de
+``extrair_dados_academicos`` (``--repeticoes`` execuções) por PDF, e no
+total páginas/s, PDFs/s e disciplinas/s. Sai com código 1 se algum PDF
+divergir do gabarito ou não tiver gabarito.
+
+Mudou a saída de propósito (correção de padrão, campo novo)? Confira as
+diferenças reportadas e regrave o gabarito com ``--gravar`` no mesmo commit.
+
+Uso (a partir de no_fluxo_backend/parse-pdf):
+    python benchmarks/corpus_gabarito.py
+    python benchmarks/corpus_gabarito.py --repeticoes 20 --saida corpus.json
+    python benchmarks/corpus_gabarito.py --gravar
+"""
+
+import argparse
+import difflib
+import glob
+import hashlib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+sys.path.insert(0, AQUI)
+
+from bench_parser import metadados, percentil  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(AQUI)))
+CORPUS_DIR = os.path.join(RAIZ, "test_historicos", "historicos")
+GABARITO_DIR = os.path.join(RAIZ, "test_historicos", "gabarito")
+
+
+def pdfs_do_corpus(diretorio=CORPUS_DIR):
+    return sorted(glob.glob(os.path.join(diretorio, "*.pdf")))
+
+
+def caminho_gabarito(pdf, diretorio=GABARITO_DIR):
+    return os.path.join(diretorio, os.path.basename(pdf) + ".json")
+
+
+def extrair_texto(pdf_bytes):
+    """
+    Texto do PDF como o ``processar_pdf`` monta, mas sempre extraído (sem o
+    cache de páginas) e no processo atual. Retorna ``(texto, paginas)``.
+    """
+    from layout_spans import dict_da_pagina
+    from pdf_parser_final import abrir_pdf, extract_structured_text
+
+    doc = abrir_pdf(pdf_bytes)
+    try:
+        paginas = [extract_structured_text(dict_da_pagina(page)) for page in doc]
+    finally:
+        doc.close()
+    return "".join(f"{texto}\n" for texto in paginas if texto), len(paginas)
+
+
+def saida_canonica(pdf_bytes, texto, dados):
+    """
+    Forma guardada no gabarito. O texto vai em linhas para que o diff aponte
+    a linha; os dados passam por JSON (tuplas viram listas, como na resposta
+    do /upload-pdf).
+    """
+    return {
+        "sha256": hashlib.sha256(pdf_bytes).hexdigest(),
+        "texto": texto.splitlines(),
+        "dados": json.loads(json.dumps(dados, ensure_ascii=False)),
+    }
+
+
+def _igual_em_json(item):
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def diferencas(esperado, obtido, caminho=""):
+    """
+    Diferenças de ``obtido`` para ``esperado`` como ``(caminho, esperado,
+    obtido)``. Dicts são comparados por chave; listas pelo alinhamento do
+    ``difflib``, então um item inserido vira uma diferença só (com
+    ``esperado`` ausente, ``None``) em vez de desalinhar os seguintes.
+    """
+    if isinstance(esperado, dict) and isinstance(obtido, dict):
+        for chave in sorted(set(esperado) | set(obtido), key=str):
+            sub = f"{caminho}.{chave}" if caminho else str(chave)
+            if chave not in obtido:
+                yield sub, esperado[chave], None
+            elif chave not in esperado:
+                yield sub, None, obtido[chave]
+            else:
+                yield from diferencas(esperado[chave], obtido[chave], sub)
+    elif isinstance(esperado, list) and isinstance(obtido, list):
+        antes = [_igual_em_json(item) for item in esperado]
+        depois = [_igual_em_json(item) for item in obtido]
+        blocos = difflib.SequenceMatcher(None, antes, depois, autojunk=False)
+        for op, i1, i2, j1, j2 in blocos.get_opcodes():
+            if op == "equal":
+                continue
+            pares = min(i2 - i1, j2 - j1) if op == "replace" else 0
+            for k in range(pares):
+                yield from diferencas(
+                    esperado[i1 + k], obtido[j1 + k], f"{caminho}[{j1 + k}]"
+                )
+            for i in range(i1 + pares, i2):
+                yield f"{caminho}[{i}]", esperado[i], None
+            for j in range(j1 + pares, j2):
+                yield f"{caminho}[{j}]", None, obtido[j]
+    elif esperado != obtido or type(esperado) is not type(obtido):
+        yield caminho, esperado, obtido
+
+
+def _contar_disciplinas(dados):
+    return sum(
+        1
+        for item in (dados or {}).get("disciplinas", [])
+        if item.get("tipo_dado") in ("Disciplina Regular", "Disciplina Pendente")
+    )
+
+
+def rodar_pdf(pdf, repeticoes):
+    """
+    Parse de um PDF do corpus: saída canônica e tempos (extração uma vez,
+    ``extrair_dados_academicos`` ``repeticoes`` vezes mais um aquecimento).
+    """
+    from pdf_parser_final import extrair_dados_academicos
+
+    with open(pdf, "rb") as f:
+        pdf_bytes = f.read()
+    inicio = time.perf_counter()
+    texto, paginas = extrair_texto(pdf_bytes)
+    extracao = time.perf_counter() - inicio
+
+    dados = extrair_dados_academicos(texto)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        extrair_dados_academicos(texto)
+        tempos.append(time.perf_counter() - inicio)
+    return saida_canonica(pdf_bytes, texto, dados), {
+        "paginas": paginas,
+        "disciplinas": _contar_disciplinas(dados),
+        "ms_extracao": round(extracao * 1000, 2),
+        "ms_dados_p50": round(percentil(tempos, 50) * 1000, 3),
+    }
+
+
+def gravar_gabarito(saida, destino):
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(saida, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def comparar_com_gabarito(saida, destino):
+    """Lista de diferenças para o gabarito; ``None`` se ele não existe."""
+    if not os.path.exists(destino):
+        return None
+    with open(destino, encoding="utf-8") as f:
+        return list(diferencas(json.load(f), saida))
+
+
+def _curto(valor, limite=80):
+    texto = "—" if valor is None else repr(valor)
+    return texto if len(texto) <= limite else texto[: limite - 1] + "…"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="diretório dos PDFs")
+    parser.add_argument("--gabarito", default=GABARITO_DIR)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument(
+        "--gravar", action="store_true", help="regrava o gabarito com a saída atual"
+    )
+    parser.add_argument(
+        "--max-diferencas",
+        type=int,
+        default=20,
+        help="diferenças mostradas por PDF (padrão: 20)",
+    )
+    parser.add_argument("--saida", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    pdfs = pdfs_do_corpus(args.corpus)
+    if not pdfs:
+        parser.error(f"nenhum PDF em {args.corpus}")
+
+    print(
+        f"{'arquivo':<40} {'pág':>4} {'disc':>5} {'extração ms':>12} "
+        f"{'dados p50 ms':>13}  gabarito",
+        file=sys.stderr,
+    )
+    resultados = []
+    falhou = False
+    for pdf in pdfs:
+        saida, tempos = rodar_pdf(pdf, args.repeticoes)
+        destino = caminho_gabarito(pdf, args.gabarito)
+        if args.gravar:
+            gravar_gabarito(saida, destino)
+            encontradas, situacao = [], "gravado"
+        else:
+            encontradas = comparar_com_gabarito(saida, destino)
+            if encontradas is None:
+                encontradas, situacao = [], "sem gabarito"
+                falhou = True
+            elif encontradas:
+                situacao = f"{len(encontradas)} diferença(s)"
+                falhou = True
+            else:
+                situacao = "ok"
+        nome = os.path.basename(pdf)
+        print(
+            f"{nome:<40} {tempos['paginas']:>4} {tempos['disciplinas']:>5} "
+            f"{tempos['ms_extracao']:>12.2f} {tempos['ms_dados_p50']:>13.3f}  "
+            f"{situacao}",
+            file=sys.stderr,
+        )
+        for caminho, antes, depois in encontradas[: args.max_diferencas]:
+            print(
+                f"    {caminho}: {_curto(antes)} -> {_curto(depois)}", file=sys.stderr
+            )
+        resultados.append(
+            {
+                "arquivo": nome,
+                **tempos,
+                "gabarito": situacao,
+                "diferencas": [
+                    {"campo": c, "esperado": a, "obtido": d} for c, a, d in encontradas
+                ],
+            }
+        )
+
+    extracao_s = sum(r["ms_extracao"] for r in resultados) / 1000
+    dados_s = sum(r["ms_dados_p50"] for r in resultados) / 1000
+    paginas = sum(r["paginas"] for r in resultados)
+    disciplinas = sum(r["disciplinas"] for r in resultados)
+    total = {
+        "pdfs": len(resultados),
+        "divergentes": sum(r["gabarito"] not in ("ok", "gravado") for r in resultados),
+        "extracao_paginas_por_s": round(paginas / extracao_s, 1),
+        "dados_pdfs_por_s": round(len(resultados) / dados_s, 1),
+        "dados_disciplinas_por_s": round(disciplinas / dados_s, 1),
+        "dados_ms_mediana": round(
+            statistics.median(r["ms_dados_p50"] for r in resultados), 3
+        ),
+    }
+    print(
+        f"\n{total['pdfs']} PDFs, {total['divergentes']} fora do gabarito | "
+        f"extração {total['extracao_paginas_por_s']} pág/s | "
+        f"extrair_dados_academicos {total['dados_pdfs_por_s']} PDFs/s, "
+        f"{total['dados_disciplinas_por_s']} disc/s",
+        file=sys.stderr,
+    )
+
+    if args.saida:
+        resultado = {
+            "meta": {**metadados(), "repeticoes": args.repeticoes},
+            "total": total,
+            "resultados": resultados,
+        }
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(json.dumps(resultado, ensure_ascii=False, indent=2) + "\n")
+    if falhou and not args.gravar:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+Gerador de históricos sintéticos no layout do SIGAA.
+
+Monta, com o próprio PyMuPDF, PDFs de tamanho arbitrário no mesmo formato
+posicional dos históricos reais (cada campo da tabela é um texto separado na
+mesma linha de base, como o SIGAA emite). Os dados são aleatórios mas
+determinísticos pela ``semente``, e o gerador devolve junto o que plantou no
+PDF para servir de gabarito em testes.
+
+Variantes:
+    layout="novo"    nome antes do ano/período e linha de docente (SIGAA 2024+)
+    layout="antigo"  ano/período antes do nome, sem docente (SIGAA até 2023)
+    travessao=True   menções vazias com en-dash (–) em vez de hífen
+    pendentes, equivalencias, suspensoes  seções opcionais
+
+Uso como script (a partir de no_fluxo_backend/parse-pdf):
+    python benchmarks/gerador_historico.py --disciplinas 500 --saida grande.pdf
+"""
+
+import argparse
+import random
+
+import fitz
+
+LARGURA, ALTURA = fitz.paper_size("a4")
+MARGEM_TOPO = 60
+MARGEM_BASE = 60
+FONTE = 7
+ENTRELINHA = 10
+
+CURSOS = [
+    ("ENGENHARIA DE SOFTWARE", "FCTE", "6360/1 - 2017.1"),
+    ("CIÊNCIA DA COMPUTAÇÃO", "CIC", "1856/1 - 2015.1"),
+    ("GESTÃO DE POLÍTICAS PÚBLICAS", "FACE", "8150/2 - 2019.2"),
+    ("ENGENHARIA ELETRÔNICA", "FCTE", "6424/1 - 2018.1"),
+]
+PREFIXOS = ["FGA", "CIC", "MAT", "IFD", "ENE", "ADM", "EST"]
+PALAVRAS = [
+    "ALGORITMOS",
+    "CÁLCULO",
+    "FÍSICA",
+    "ESTRUTURAS",
+    "DADOS",
+    "SISTEMAS",
+    "ENGENHARIA",
+    "SOFTWARE",
+    "REDES",
+    "COMPUTADORES",
+    "PROJETO",
+    "INTEGRADOR",
+    "QUALIDADE",
+    "MÉTODOS",
+    "GESTÃO",
+    "PRODUÇÃO",
+    "PROGRAMAÇÃO",
+    "PARADIGMAS",
+    "ELETRÔNICA",
+    "DIGITAL",
+    "ARQUITETURA",
+    "INTERAÇÃO",
+    "HUMANO",
+    "ESTATÍSTICA",
+    "ÁLGEBRA",
+    "LINEAR",
+    "TEORIA",
+    "PRÁTICA",
+]
+CONECTORES = ["DE", "E", "DA", "DO", "EM", "PARA"]
+NOMES = ["ANA", "CARLOS", "MARIA", "JOÃO", "LUIZA", "PAULO", "RENATA", "TIAGO"]
+SOBRENOMES = ["SILVA", "SOUZA", "LIMA", "COSTA", "ROCHA", "GOMES", "MEDEIROS"]
+TITULOS = ["Dr.", "Dra.", "MSc."]
+SIMBOLOS = ["", "", "", "*", "e", "#"]
+
+# (situação, menções possíveis); "-" vira en-dash com travessao=True
+SITUACOES = [
+    ("APR", ["SS", "MS", "MM"], 70),
+    ("REP", ["MI", "II"], 8),
+    ("REPF", ["SR"], 4),
+    ("CANC", ["-"], 3),
+    ("TRANC", ["-"], 5),
+]
+
+
+def _nome_disciplina(rng):
+    palavras = [rng.choice(PALAVRAS)]
+    for _ in range(rng.randint(0, 3)):
+        if rng.random() < 0.4:
+            palavras.append(rng.choice(CONECTORES))
+        palavras.append(rng.choice(PALAVRAS))
+    if rng.random() < 0.3:
+        palavras.append(str(rng.randint(1, 4)))
+    return " ".join(palavras)
+
+
+def _pessoa(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _periodos(quantidade, rng):
+    ano, semestre = 2015 + rng.randint(0, 5), 1
+    periodos = []
+    for _ in range(quantidade):
+        periodos.append(f"{ano}.{semestre}")
+        ano, semestre = (ano, 2) if semestre == 1 else (ano + 1, 1)
+    return periodos
+
+
+def gerar_dados(
+    disciplinas=40,
+    pendentes=10,
+    equivalencias=3,
+    suspensoes=(),
+    travessao=False,
+    semente=0,
+):
+    """Dados do histórico (o gabarito), sem desenhar nada."""
+    rng = random.Random(semente)
+    curso, unidade, curriculo = rng.choice(CURSOS)
+    por_periodo = 6
+    periodos = _periodos(max(1, -(-disciplinas // por_periodo)), rng)
+    vazio = "–" if travessao else "-"
+
+    codigos = rng.sample(range(1, 10000), disciplinas + pendentes + 2 * equivalencias)
+    codigos = [f"{rng.choice(PREFIXOS)}{n:04d}" for n in codigos]
+
+    cursadas = []
+    pesos = [peso for _, _, peso in SITUACOES]
+    for i in range(disciplinas):
+        ano_periodo = periodos[i // por_periodo]
+        if ano_periodo == periodos[-1]:
+            situacao, mencao = "MATR", vazio
+        else:
+            situacao, mencoes, _ = rng.choices(SITUACOES, weights=pesos)[0]
+            mencao = rng.choice(mencoes)
+            mencao = vazio if mencao == "-" else mencao
+        carga = rng.choice([30, 60, 60, 90])
+        cursadas.append(
+            {
+                "nome": _nome_disciplina(rng),
+                "ano_periodo": ano_periodo,
+                "turma": rng.choice(["01", "02", "03", "A", "AA", "05A"]),
+                "situacao": situacao,
+                "codigo": codigos[i],
+                "carga_horaria": carga,
+                "frequencia": rng.choice(["100,0", "93,0", "86,5", "75,0"]),
+                "mencao": mencao,
+                "simbolo": rng.choice(SIMBOLOS),
+                "professor": f"{rng.choice(TITULOS)} {_pessoa(rng)}",
+            }
+        )
+
+    base = disciplinas
+    lista_pendentes = [
+        {
+            "nome": _nome_disciplina(rng),
+            "carga_horaria": rng.choice([30, 60, 90]),
+            "codigo": codigos[base + i],
+            "matriculado": rng.random() < 0.15,
+        }
+        for i in range(pendentes)
+    ]
+    base += pendentes
+    lista_equivalencias = [
+        {
+            "cumpriu": codigos[base + 2 * i],
+            "nome_cumpriu": _nome_disciplina(rng),
+            "atraves_de": codigos[base + 2 * i + 1],
+            "nome_equivalente": _nome_disciplina(rng),
+            "ch": rng.choice([30, 60, 90]),
+        }
+        for i in range(equivalencias)
+    ]
+
+    return {
+        "matricula": f"{rng.randint(150000000, 259999999)}",
+        "nome_aluno": _pessoa(rng),
+        "curso": curso,
+        "unidade": unidade,
+        "curriculo": curriculo,
+        "matriz_curricular": curriculo.split(" - ")[1],
+        "ira": round(rng.uniform(2.0, 5.0), 4),
+        "mp": round(rng.uniform(2.0, 5.0), 4),
+        "suspensoes": list(suspensoes),
+        "disciplinas": cursadas,
+        "pendentes": lista_pendentes,
+        "equivalencias": lista_equivalencias,
+    }
+
+
+class _Paginador:
+    """
+    Escreve linhas de texto posicionais, quebrando página quando enche.
+
+    Usa ``TextWriter`` com a Helvetica embutida do MuPDF: ao contrário do
+    ``insert_text``, ela codifica caracteres fora do Latin-1 (o en-dash das
+    menções), e cada célula continua saindo como um span separado.
+    """
+
+    def __init__(self, doc, dados):
+        self.doc = doc
+        self.dados = dados
+        self.fonte = fitz.Font("helv")
+        self.escritores = []
+        self.y = 0
+        self.nova_pagina()
+
+    def nova_pagina(self):
+        page = self.doc.new_page(width=LARGURA, height=ALTURA)
+        self.escritores.append(fitz.TextWriter(page.rect))
+        self.y = MARGEM_TOPO
+        self.linha((40, "SIGAA - Sistema Integrado de Gestão de Atividades Acadêmicas"))
+        self.linha((40, "UnB - Universidade de Brasília"))
+        if len(self.escritores) > 1:
+            self.linha((40, "Nome:"))
+            self.linha((40, f"Matrícula: {self.dados['matricula']}"))
+            self.linha((40, self.dados["nome_aluno"]))
+
+    def cabe(self, linhas):
+        return self.y + linhas * ENTRELINHA <= ALTURA - MARGEM_BASE
+
+    def _escrever(self, escritor, x, y, texto):
+        escritor.append((x, y), texto, font=self.fonte, fontsize=FONTE)
+
+    def linha(self, *celulas):
+        """Uma linha de base com uma ou mais células ``(x, texto)``."""
+        if not self.cabe(1):
+            self.nova_pagina()
+        for x, texto in celulas:
+            if texto:
+                self._escrever(self.escritores[-1], x, self.y, texto)
+        self.y += ENTRELINHA
+
+    def finalizar(self):
+        """Rodapé com a numeração e grava o texto de todas as páginas."""
+        total = len(self.escritores)
+        for numero, (page, escritor) in enumerate(
+            zip(self.doc, self.escritores), start=1
+        ):
+            self._escrever(
+                escritor,
+                40,
+                ALTURA - 30,
+                "Para verificar a autenticidade deste documento entre em "
+                "https://sig.unb.br/sigaa/documentos/",
+            )
+            self._escrever(
+                escritor, LARGURA - 80, ALTURA - 30, f"Página {numero} de {total}"
+            )
+            escritor.write_text(page)
+
+
+def desenhar_pdf(dados, layout="novo"):
+    """Desenha ``dados`` (de ``gerar_dados``) e devolve os bytes do PDF."""
+    if layout not in ("novo", "antigo"):
+        raise ValueError(f"layout desconhecido: {layout}")
+    doc = fitz.open()
+    p = _Paginador(doc, dados)
+    p.linha((40, "Histórico Escolar - Emitido em: 01/01/2026 às 12:00"))
+    p.linha((40, "Dados Pessoais"))
+    p.linha((40, f"Matrícula:    {dados['matricula']}"))
+    p.linha((40, f"Nome:     {dados['nome_aluno']}"))
+    p.linha((40, "Dados do Vínculo do(a) Discente"))
+    p.linha((40, "Curso:"))
+    grau = "BACHARELADO" if layout == "novo" else "BACHAREL"
+    p.linha((40, f"{dados['curso']}/{dados['unidade']} - {grau} - DIURNO"))
+    p.linha((40, "Status:"))
+    p.linha((40, "ATIVO"))
+    p.linha((40, f"IRA: {dados['ira']:.4f}"), (200, f"MP: {dados['mp']:.4f}"))
+    p.linha((40, "Currículo:"))
+    p.linha((40, dados["curriculo"]))
+    p.linha((40, "Suspensões:"))
+    p.linha((40, ", ".join(dados["suspensoes"]) or "Nenhum"))
+    p.linha((40, "Componentes Curriculares Cursados/Cursando"))
+    p.linha(
+        (40, "Ano/Período"),
+        (90, "Componente Curricular"),
+        (330, "Turma"),
+        (360, "Situação"),
+        (400, "CH"),
+        (450, "Freq %"),
+        (490, "Nota"),
+    )
+
+    for d in dados["disciplinas"]:
+        linhas_bloco = 2 if layout == "novo" else 1
+        if not p.cabe(linhas_bloco):
+            p.nova_pagina()
+        cauda = [
+            (330, d["turma"]),
+            (360, d["situacao"]),
+            (400, d["codigo"]),
+            (440, str(d["carga_horaria"])),
+            (460, d["frequencia"]),
+            (495, d["mencao"]),
+            (520, d["simbolo"]),
+        ]
+        if layout == "novo":
+            p.linha((90, d["nome"]), (40, d["ano_periodo"]), *cauda)
+            p.linha((90, f"{d['professor']} ({d['carga_horaria']}h)"))
+        else:
+            p.linha((40, d["ano_periodo"]), (90, d["nome"]), *cauda)
+
+    p.linha((40, "Legenda"))
+    p.linha((40, "* Comp. Optativo"))
+    p.linha((40, "e Comp. Equivalente a Obrig."))
+
+    if dados["pendentes"]:
+        p.linha(
+            (
+                40,
+                f"Componentes Curriculares Obrigatórios Pendentes:{len(dados['pendentes'])}",
+            )
+        )
+        p.linha((40, "Componente Curricular"), (330, "CH"), (400, "Código"))
+        for pend in dados["pendentes"]:
+            p.linha(
+                (40, pend["nome"]),
+                (330, f"{pend['carga_horaria']} h"),
+                (400, pend["codigo"]),
+                (460, "Matriculado" if pend["matriculado"] else ""),
+            )
+
+    if dados["equivalencias"]:
+        p.linha((40, "Equivalências:"))
+        for eq in dados["equivalencias"]:
+            p.linha(
+                (
+                    40,
+                    f"Cumpriu {eq['cumpriu']} - {eq['nome_cumpriu']} ({eq['ch']}h) "
+                    f"através de {eq['atraves_de']} - {eq['nome_equivalente']} "
+                    f"({eq['ch']}h)",
+                )
+            )
+
+    p.finalizar()
+    # no_new_id: sem o /ID aleatório do trailer, a mesma semente gera bytes
+    # idênticos (e a mesma chave no cache do parser)
+    pdf_bytes = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return pdf_bytes
+
+
+def gerar_historico(layout="novo", **opcoes):
+    """
+    Atalho: ``(pdf_bytes, dados)`` com as opções de ``gerar_dados``
+    (disciplinas, pendentes, equivalencias, suspensoes, travessao, semente).
+    """
+    dados = gerar_dados(**opcoes)
+    return desenhar_pdf(dados, layout), dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--layout", choices=["novo", "antigo"], default="novo")
+    parser.add_argument("--disciplinas", type=int, default=40)
+    parser.add_argument("--pendentes", type=int, default=10)
+    parser.add_argument("--equivalencias", type=int, default=3)
+    parser.add_argument("--suspensoes", nargs="*", default=[])
+    parser.add_argument("--travessao", action="store_true")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="historico_sintetico.pdf")
+    args = parser.parse_args()
+
+    pdf_bytes, dados = gerar_historico(
+        layout=args.layout,
+        disciplinas=args.disciplinas,
+        pendentes=args.pendentes,
+        equivalencias=args.equivalencias,
+        suspensoes=args.suspensoes,
+        travessao=args.travessao,
+        semente=args.semente,
+    )
+    with open(args.saida, "wb") as f:
+        f.write(pdf_bytes)
+    paginas = fitz.open(stream=pdf_bytes, filetype="pdf").page_count
+    print(f"{args.saida}: {paginas} páginas, {len(dados['disciplinas'])} disciplinas")
+
+
+if __name__ == "__main__":
+    main()
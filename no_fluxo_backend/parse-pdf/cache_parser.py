@@ -0,0 +1,174 @@
+"""
+Cache de resultados de parse endereçado por conteúdo.
+
+Alunos reenviam o mesmo PDF do SIGAA várias vezes (erro de rede, troca de
+dispositivo, conferência do fluxograma). A chave é o SHA-256 dos bytes do PDF
+mais a versão do parser, então qualquer mudança em ``VERSAO_PARSER`` invalida
+o cache sem precisar apagar nada.
+
+Dois níveis:
+    - memória: LRU limitado por nº de itens, devolve o objeto já montado;
+    - disco (opcional): um JSON por chave, despejo por tamanho total (o
+      arquivo menos usado recentemente sai primeiro).
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_CACHE_ITENS    itens no LRU em memória; 0 desliga (padrão: 256)
+    PDF_PARSER_CACHE_DIR      diretório do nível em disco (padrão: desligado)
+    PDF_PARSER_CACHE_DISCO_MB limite do nível em disco, em MB (padrão: 512)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_ITENS = int(os.environ.get("PDF_PARSER_CACHE_ITENS", "256"))
+CACHE_DIR = os.environ.get("PDF_PARSER_CACHE_DIR") or None
+CACHE_DISCO_MB = int(os.environ.get("PDF_PARSER_CACHE_DISCO_MB", "512"))
+
+
+def chave_cache(pdf_bytes, versao):
+    """Chave do cache: ``<sha256 do PDF>-<versão do parser>``."""
+    return chave_do_hash(hashlib.sha256(pdf_bytes).hexdigest(), versao)
+
+
+def chave_do_hash(sha256, versao):
+    """Chave do cache a partir do SHA-256 já calculado (ex.: no spool do upload)."""
+    return f"{sha256}-{versao}"
+
+
+class CacheParser:
+    """
+    Cache LRU em memória com nível opcional em disco.
+
+    Os valores precisam ser serializáveis em JSON (o nível em disco grava
+    JSON). O objeto devolvido por ``obter`` é compartilhado entre requisições
+    e não deve ser alterado por quem o recebe.
+    """
+
+    def __init__(
+        self,
+        max_itens=CACHE_ITENS,
+        diretorio=CACHE_DIR,
+        max_bytes_disco=CACHE_DISCO_MB * 1024 * 1024,
+    ):
+        self.max_itens = max_itens
+        self.diretorio = diretorio
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self._bytes_disco = 0
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._bytes_disco = sum(
+                os.path.getsize(caminho) for caminho in self._arquivos_disco()
+            )
+
+    # --- nível em memória ---------------------------------------------------
+
+    def _guardar_memoria(self, chave, valor):
+        if self.max_itens <= 0:
+            return
+        self._memoria[chave] = valor
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_itens:
+            self._memoria.popitem(last=False)
+
+    # --- nível em disco -----------------------------------------------------
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave[:2], f"{chave}.json")
+
+    def _arquivos_disco(self):
+        for raiz, _dirs, arquivos in os.walk(self.diretorio):
+            for nome in arquivos:
+                if nome.endswith(".json"):
+                    yield os.path.join(raiz, nome)
+
+    def _ler_disco(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                valor = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # mtime marca o uso recente; o despejo remove os mais antigos primeiro
+        os.utime(caminho)
+        return valor
+
+    def _gravar_disco(self, chave, valor):
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(valor, f, ensure_ascii=False)
+        anterior = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        os.replace(temporario, caminho)
+        self._bytes_disco += os.path.getsize(caminho) - anterior
+        if self._bytes_disco > self.max_bytes_disco:
+            self._despejar_disco()
+
+    def _despejar_disco(self):
+        arquivos = sorted(self._arquivos_disco(), key=os.path.getmtime)
+        for caminho in arquivos:
+            if self._bytes_disco <= self.max_bytes_disco:
+                break
+            try:
+                tamanho = os.path.getsize(caminho)
+                os.remove(caminho)
+            except OSError:
+                continue
+            self._bytes_disco -= tamanho
+            logger.info(f"Parse cache: evicted {os.path.basename(caminho)}")
+
+    # --- API ------------------------------------------------------------------
+
+    def obter(self, chave):
+        """Valor guardado para ``chave`` ou ``None`` (conta hit/miss)."""
+        with self._lock:
+            valor = self._memoria.get(chave)
+            if valor is not None:
+                self._memoria.move_to_end(chave)
+                self.hits_memoria += 1
+                return valor
+            if self.diretorio:
+                valor = self._ler_disco(chave)
+                if valor is not None:
+                    self.hits_disco += 1
+                    self._guardar_memoria(chave, valor)
+                    return valor
+            self.misses += 1
+            return None
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._guardar_memoria(chave, valor)
+            if self.diretorio:
+                try:
+                    self._gravar_disco(chave, valor)
+                except OSError as e:
+                    logger.warning(f"Parse cache: could not write to disk: {e}")
+
+    def estatisticas(self):
+        with self._lock:
+            hits = self.hits_memoria + self.hits_disco
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "itens_memoria": len(self._memoria),
+                "max_itens_memoria": self.max_itens,
+                "disco_habilitado": bool(self.diretorio),
+                "bytes_disco": self._bytes_disco,
+                "max_bytes_disco": self.max_bytes_disco if self.diretorio else 0,
+            }
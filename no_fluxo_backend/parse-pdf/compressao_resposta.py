@@ -0,0 +1,77 @@
+"""
+Compressão negociada das respostas JSON do serviço parse-pdf.
+
+A resposta do /upload-pdf é texto muito repetitivo (chaves iguais em cada
+disciplina, ``full_text`` com o histórico inteiro) e comprime bem. O codec
+sai do ``Accept-Encoding`` do cliente: zstd quando o cliente aceita e o
+pacote ``zstandard`` está instalado, senão gzip (biblioteca padrão).
+
+Respostas em streaming (NDJSON) e menores que o limite saem sem compressão.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_COMPRESSAO_MIN_BYTES  tamanho mínimo para comprimir; 0 desliga
+                                     (padrão: 1024)
+    PDF_PARSER_GZIP_NIVEL            nível do gzip (padrão: 6)
+    PDF_PARSER_ZSTD_NIVEL            nível do zstd (padrão: 3)
+"""
+
+import gzip
+import os
+
+try:
+    import zstandard
+except ImportError:  # opcional: sem ele só gzip é oferecido
+    zstandard = None
+
+COMPRESSAO_MIN_BYTES = int(os.environ.get("PDF_PARSER_COMPRESSAO_MIN_BYTES", "1024"))
+GZIP_NIVEL = int(os.environ.get("PDF_PARSER_GZIP_NIVEL", "6"))
+ZSTD_NIVEL = int(os.environ.get("PDF_PARSER_ZSTD_NIVEL", "3"))
+
+# Em ordem de preferência do servidor (desempate quando o cliente aceita ambos)
+CODIFICACOES = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def comprimir(dados, codificacao):
+    """Comprime ``dados`` (bytes) com ``"gzip"`` ou ``"zstd"``."""
+    if codificacao == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_NIVEL).compress(dados)
+    return gzip.compress(dados, compresslevel=GZIP_NIVEL, mtime=0)
+
+
+def comprimir_resposta(response, accept_encodings, min_bytes=None):
+    """
+    Comprime o corpo de ``response`` no lugar quando vale a pena e o cliente
+    aceita; devolve a própria ``response`` (uso em ``after_request``).
+    """
+    min_bytes = COMPRESSAO_MIN_BYTES if min_bytes is None else min_bytes
+    if (
+        min_bytes <= 0
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not 200 <= response.status_code < 300
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    corpo, codificacao = comprimir_corpo(
+        response.get_data(), accept_encodings, min_bytes
+    )
+    if codificacao is not None:
+        response.set_data(corpo)
+        response.headers["Content-Encoding"] = codificacao
+    return response
+
+
+def comprimir_corpo(corpo, accept_encodings, min_bytes=None):
+    """
+    Negociação e compressão sem objeto de resposta (usada também pelo modo
+    ASGI). ``accept_encodings`` é o ``Accept`` do Werkzeug para o header
+    ``Accept-Encoding``. Devolve ``(corpo, codificacao)``; ``codificacao`` é
+    None quando o corpo sai como veio.
+    """
+    min_bytes = COMPRESSAO_MIN_BYTES if min_bytes is None else min_bytes
+    codificacao = accept_encodings.best_match(CODIFICACOES)
+    if min_bytes <= 0 or codificacao is None or len(corpo) < min_bytes:
+        return corpo, None
+    return comprimir(corpo, codificacao), codificacao
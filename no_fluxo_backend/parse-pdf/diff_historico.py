@@ -0,0 +1,197 @@
+"""
+Diferença entre dois parses do histórico do mesmo aluno.
+
+A cada semestre o aluno reenvia o histórico, e o novo difere do anterior em
+poucas linhas: disciplinas ``MATR`` que viram ``APR``/``REP``, as
+matriculadas do semestre novo, IRA e MP. Em vez do ``extracted_data``
+inteiro de novo, o modo diff do /upload-pdf devolve só o que mudou, no
+formato de ``diff_historicos``.
+
+As disciplinas são pareadas por identidade, não por posição:
+    - regulares por ``(codigo, ano_periodo)`` (a mesma disciplina cursada de
+      novo em outro período é outra linha do histórico);
+    - pendentes por ``codigo``.
+Repetições da mesma identidade (raras; ex.: duas turmas no mesmo período)
+são pareadas pela ordem em que aparecem.
+
+Sem dependências web, como o historico_parser.py.
+"""
+
+from collections import Counter
+
+TIPOS_DISCIPLINA = ("Disciplina Regular", "Disciplina Pendente")
+
+# Campos escalares do resultado comparados um a um
+CAMPOS_RESUMO = (
+    "curso",
+    "matriz_curricular",
+    "ira",
+    "media_ponderada",
+    "semestre_atual",
+    "numero_semestre",
+    "suspensoes",
+    "pendencias",
+)
+
+# Campos que identificam a disciplina e por isso não entram em ``alteradas``
+_CAMPOS_IDENTIDADE = ("tipo_dado", "codigo", "ano_periodo")
+
+
+def _ira_e_pendencias(disciplinas):
+    ira = pendencias = None
+    for item in disciplinas:
+        if not isinstance(item, dict):
+            continue
+        if "IRA" in item:
+            ira = item.get("valor")
+        elif item.get("tipo_dado") == "Pendencias":
+            pendencias = item.get("valores")
+    return ira, pendencias
+
+
+def normalizar_resultado(resultado):
+    """
+    Dados comparáveis de um resultado de parse: o ``dict`` de
+    ``extrair_dados_academicos`` (com ``disciplinas``) ou a resposta JSON do
+    /upload-pdf (com ``extracted_data``). ``ValueError`` se não for nenhum
+    dos dois.
+    """
+    if not isinstance(resultado, dict):
+        raise ValueError("O resultado anterior deve ser um objeto JSON.")
+    if isinstance(resultado.get("disciplinas"), list):
+        disciplinas = resultado["disciplinas"]
+        curso = resultado.get("curso")
+    elif isinstance(resultado.get("extracted_data"), list):
+        disciplinas = resultado["extracted_data"]
+        curso = resultado.get("curso_extraido")
+    else:
+        raise ValueError(
+            "O resultado anterior não tem 'extracted_data' (resposta do "
+            "/upload-pdf) nem 'disciplinas'."
+        )
+    ira, pendencias = _ira_e_pendencias(disciplinas)
+    resumo = {
+        "curso": curso,
+        "matriz_curricular": resultado.get("matriz_curricular"),
+        "ira": ira,
+        "media_ponderada": resultado.get("media_ponderada"),
+        "semestre_atual": resultado.get("semestre_atual"),
+        "numero_semestre": resultado.get("numero_semestre"),
+        "suspensoes": resultado.get("suspensoes"),
+        "pendencias": pendencias,
+    }
+    return {
+        "resumo": resumo,
+        "disciplinas": [
+            item
+            for item in disciplinas
+            if isinstance(item, dict) and item.get("tipo_dado") in TIPOS_DISCIPLINA
+        ],
+        "equivalencias": resultado.get("equivalencias")
+        or resultado.get("equivalencias_pdf")
+        or [],
+    }
+
+
+def identidade(disciplina):
+    """Chave de pareamento de uma disciplina (ver docstring do módulo)."""
+    if disciplina.get("tipo_dado") == "Disciplina Regular":
+        return (
+            "Disciplina Regular",
+            disciplina.get("codigo"),
+            disciplina.get("ano_periodo"),
+        )
+    return (disciplina.get("tipo_dado"), disciplina.get("codigo"))
+
+
+def _por_identidade(disciplinas):
+    """``{(identidade, ocorrência): disciplina}``, na ordem do histórico."""
+    vistas = Counter()
+    indexadas = {}
+    for disciplina in disciplinas:
+        chave = identidade(disciplina)
+        indexadas[(chave, vistas[chave])] = disciplina
+        vistas[chave] += 1
+    return indexadas
+
+
+def _referencia(disciplina):
+    """Campos que identificam a disciplina no diff (mais o nome, para exibir)."""
+    ref = {
+        campo: disciplina[campo]
+        for campo in _CAMPOS_IDENTIDADE
+        if disciplina.get(campo) not in (None, "")
+    }
+    ref["nome"] = disciplina.get("nome")
+    return ref
+
+
+def _mudancas(antes, depois, campos):
+    return {
+        campo: {"antes": antes.get(campo), "depois": depois.get(campo)}
+        for campo in campos
+        if antes.get(campo) != depois.get(campo)
+    }
+
+
+def _chave_equivalencia(eq):
+    return (eq.get("cumpriu"), eq.get("atraves_de"))
+
+
+def diff_historicos(anterior, atual):
+    """
+    Diferença de ``anterior`` para ``atual`` (ambos no formato aceito por
+    ``normalizar_resultado``):
+
+        {
+            "adicionadas": [disciplina completa, ...],
+            "alteradas": [{tipo_dado, codigo, ano_periodo, nome,
+                           "campos": {campo: {"antes", "depois"}}}, ...],
+            "removidas": [{tipo_dado, codigo, ano_periodo, nome}, ...],
+            "campos": {"ira": {"antes", "depois"}, ...},  # só os que mudaram
+            "equivalencias": {"adicionadas": [...], "removidas": [...]},
+            "sem_alteracoes": bool,
+        }
+    """
+    anterior = normalizar_resultado(anterior)
+    atual = normalizar_resultado(atual)
+
+    antes = _por_identidade(anterior["disciplinas"])
+    depois = _por_identidade(atual["disciplinas"])
+    adicionadas, alteradas = [], []
+    for chave, disciplina in depois.items():
+        anterior_disc = antes.get(chave)
+        if anterior_disc is None:
+            adicionadas.append(disciplina)
+            continue
+        campos = sorted(
+            (set(anterior_disc) | set(disciplina)) - set(_CAMPOS_IDENTIDADE)
+        )
+        mudancas = _mudancas(anterior_disc, disciplina, campos)
+        if mudancas:
+            alteradas.append({**_referencia(disciplina), "campos": mudancas})
+    removidas = [_referencia(d) for chave, d in antes.items() if chave not in depois]
+
+    eq_antes = {_chave_equivalencia(eq): eq for eq in anterior["equivalencias"]}
+    eq_depois = {_chave_equivalencia(eq): eq for eq in atual["equivalencias"]}
+    equivalencias = {
+        "adicionadas": [eq for k, eq in eq_depois.items() if k not in eq_antes],
+        "removidas": [eq for k, eq in eq_antes.items() if k not in eq_depois],
+    }
+
+    campos = _mudancas(anterior["resumo"], atual["resumo"], CAMPOS_RESUMO)
+    return {
+        "adicionadas": adicionadas,
+        "alteradas": alteradas,
+        "removidas": removidas,
+        "campos": campos,
+        "equivalencias": equivalencias,
+        "sem_alteracoes": not (
+            adicionadas
+            or alteradas
+            or removidas
+            or campos
+            or equivalencias["adicionadas"]
+            or equivalencias["removidas"]
+        ),
+    }
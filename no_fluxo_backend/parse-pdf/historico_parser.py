@@ -0,0 +1,1118 @@
+"""
+Núcleo do parse de históricos do SIGAA: texto -> dados acadêmicos.
+
+Padrões (``padrao_*``, compilados uma vez no import), limpeza de nomes,
+cabeçalho (curso, matriz, IRA/MP, suspensões), reconhecimento das disciplinas
+e montagem do resultado de ``extrair_dados_academicos``. Não depende de
+Flask, PyMuPDF nem NumPy: os serviços (pdf_parser_final.py,
+pdf_parser_ocr.py) e as ferramentas de lote (DBA/parse_pdf, benchmarks)
+importam daqui sem montar uma aplicação web. Quem produz o texto (PyMuPDF
+posicional, OCR) fica nos módulos de cada serviço.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+
+from metricas_parser import etapa
+from orcamento_parser import verificar_orcamento
+from trace_parser import trace, trace_ativo
+
+# Versão do parser: entra na chave do cache de resultados. Incremente sempre que
+# uma mudança nos padrões/extração alterar a saída para o mesmo PDF.
+VERSAO_PARSER = "1"
+
+# Padrões de Expressão Regular (Regex) - Refatorados para trabalhar no texto completo
+# --- Geral ---
+padrao_ira = re.compile(r"IRA[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
+padrao_mp = re.compile(r"MP[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
+padrao_curriculo = re.compile(r"(\d{4}[\./]\d+(?:\s*-\s*\d{4}\.\d)?)", re.MULTILINE)
+padrao_curso = re.compile(
+    r"Curso[:\s]+([A-ZÀ-Ÿ\s/\\-]+?)(?:\s+Status:|$)", re.IGNORECASE | re.MULTILINE
+)
+
+# --- Padrão alternativo para curso (formato novo) ---
+padrao_curso_alt = re.compile(
+    r"^([A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*)/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+# --- Padrão para curso no novo formato ---
+padrao_curso_novo = re.compile(
+    r"Curso:\s*\n([A-ZÀ-ÿ][A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*)/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+# --- Padrões para novo formato SIGAA com PyMuPDF ---
+# Captura nome da disciplina (linha separada) - mais flexível, incluindo hífens e outros caracteres.
+# Aplicado a uma linha por vez. A forma antiga,
+#   ^([A-ZÀ-ÿ][A-ZÀ-ÿ\s0-9\-]+(?:DE\s+[...]*)*(?:\s+[...]*)*)\s*$
+# aceita exatamente as mesmas linhas (``DE`` e espaços já estão na classe), mas
+# os grupos repetidos davam exponenciais jeitos de repartir a linha antes de
+# falhar: ~0,3 s numa linha de 42 caracteres "A B B ... B!". Com uma única
+# classe repetida o custo é linear no tamanho da linha.
+padrao_nome_disciplina = re.compile(r"^([A-ZÀ-ÿ][A-ZÀ-ÿ\s0-9\-]+)$", re.IGNORECASE)
+
+# Captura ano/período (cada campo em linha separada)
+padrao_ano_periodo = re.compile(r"^(\d{4}\.\d)$", re.MULTILINE)
+
+# Captura código da disciplina
+padrao_codigo_disciplina = re.compile(r"^([A-Z]{2,}\d{3,})$", re.MULTILINE)
+
+# Captura situação da disciplina
+padrao_situacao = re.compile(
+    r"^(MATR|APR|REP|REPF|REPMF|CANC|DISP|TRANC)$", re.MULTILINE
+)
+
+# Captura menção
+# D1: aceita hífen ASCII (-), en-dash (–, U+2013) e em-dash (—, U+2014).
+# PDFs do SIGAA gerados com auto-correção de hífens trocam o ASCII por unicode,
+# o que antes fazia o parser perder a disciplina inteira silenciosamente.
+padrao_mencao = re.compile(r"^(SS|MS|MM|MI|II|SR|[\-–—])$", re.MULTILINE)
+
+# Captura turma (letras e números)
+padrao_turma = re.compile(r"^([A-Z0-9]{1,3})$", re.MULTILINE)
+
+# Captura carga horária
+padrao_carga_horaria = re.compile(r"^(\d{1,3})$", re.MULTILINE)
+
+# Captura frequência
+padrao_frequencia = re.compile(r"^(\d{1,3}[,\.]\d+|--|\d{1,3})$", re.MULTILINE)
+
+# Captura informações do professor com carga horária
+padrao_professor = re.compile(
+    r"(?:Dr\.|Dra\.|MSc\.|Prof\.|Professor|Professora)?\s*([A-ZÀ-ÿ\s\.]+?)\s*\((\d+)h\)",
+    re.IGNORECASE,
+)
+
+# Padrão para símbolos especiais que indicam tipo de componente
+padrao_simbolos = re.compile(r"^([*&#e@§%]+)\s*$", re.MULTILINE)
+
+
+# --- Padrão para equivalências ---
+padrao_equivalencias = re.compile(
+    r"Cumpriu\s+([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)\s*através\s*de\s*([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+# --- Disciplinas pendentes (formato novo): ver encontrar_pendentes ---
+# Espaços no início da linha, nome (classe da forma antiga) e o que vem depois
+# do nome a partir do último espaço antes da carga horária
+padrao_espacos = re.compile(r"\s+")
+padrao_nome_pendente = re.compile(r"[A-ZÀ-Ÿ\s0-9]+", re.IGNORECASE)
+padrao_cauda_pendente = re.compile(
+    r"\s(\d+)\s*h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?",
+    re.IGNORECASE,
+)
+
+# --- Padrão específico para disciplinas pendentes SIGAA ---
+padrao_pendentes_sigaa = re.compile(
+    r"^\s+([A-ZÀ-Ÿ\sÇÃÕÁÉÍÓÚÂÊÎÔÛ0-9]+?)\s+(\d+)\s+h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?$",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+# --- Padrão para pendências (lista de status) ---
+padrao_pendencias = re.compile(
+    r"\b(APR|CANC|DISP|MATR|REP|REPF|REPMF|TRANC|CUMP)\b", re.IGNORECASE
+)
+
+# --- Padrão para matriz curricular específica do formato SIGAA ---
+padrao_matriz_sigaa = re.compile(
+    r"Ano/Período de Integralização[:\s]*(\d+/\d+)\s*-", re.MULTILINE | re.IGNORECASE
+)
+
+# --- Padrão para currículo no novo formato ---
+padrao_curriculo_novo = re.compile(
+    r"Currículo:\s*\n(\d+/\d+)\s*-\s*(\d{4}\.\d)", re.MULTILINE | re.IGNORECASE
+)
+
+# --- Padrão para suspensões ---
+padrao_suspensoes = re.compile(
+    r"Suspensões:\s*\n((?:\d{4}\.\d(?:\s*,\s*\d{4}\.\d)*)?)",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+
+def normalizar(s):
+    return (
+        unicodedata.normalize("NFKD", s)
+        .encode("ASCII", "ignore")
+        .decode("ASCII")
+        .upper()
+    )
+
+
+def extrair_curso(texto):
+    """
+    Extrai o nome do curso usando regex otimizado para formato PyMuPDF
+    """
+    # Tenta o padrão específico do novo formato estruturado
+    match_curso_novo = padrao_curso_novo.search(texto)
+    if match_curso_novo:
+        curso = match_curso_novo.group(1).strip()
+        trace("CURSO", "Curso extraído (padrão novo): %s", curso)
+        return curso
+
+    # Tenta o padrão alternativo (novo formato)
+    match_curso_alt = padrao_curso_alt.search(texto)
+    if match_curso_alt:
+        curso = match_curso_alt.group(1).strip()
+        trace("CURSO", "Curso extraído (padrão alternativo): %s", curso)
+        return curso
+
+    # Tenta o padrão original com regex
+    match_curso = padrao_curso.search(texto)
+    if match_curso:
+        curso = match_curso.group(1).strip()
+        # Limpa sufixos desnecessários como "/FCTE - BACHARELADO - DIURNO"
+        curso = re.split(r"/|-", curso)[0].strip()
+        trace("CURSO", "Curso extraído (padrão original): %s", curso)
+        return curso
+
+    # Fallback: busca linha por linha como antes (caso regex não funcione)
+    linhas = texto.splitlines()
+    for linha in linhas:
+        norm = normalizar(linha)
+        if re.match(r"^CURSO\s*[:\-]", norm):
+            curso = re.split(r"[:\-]", linha, maxsplit=1)[1].strip()
+            curso = re.split(r"/|-", curso)[0].strip()
+            trace("CURSO", "Curso extraído (fallback): %s", curso)
+            return curso
+
+        # Procura por linhas que parecem ser nomes de curso com o novo padrão
+        if re.match(
+            r"^[A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
+            linha,
+        ):
+            curso = linha.split("/")[0].strip()
+            trace("CURSO", "Curso extraído (busca direta): %s", curso)
+            return curso
+
+    trace("AVISO", "Curso não encontrado no PDF")
+    return None
+
+
+def limpar_nome_disciplina(nome):
+    """
+    Remove períodos e outros elementos desnecessários do nome da disciplina
+    """
+    if not nome:
+        return nome
+
+    nome_original = nome
+
+    # Remove padrões de período como "2023.1", "2024.2", etc.
+    nome_limpo = re.sub(r"^\d{4}\.\d\s*", "", nome)
+
+    # Remove outros padrões comuns que podem aparecer no início
+    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
+    nome_limpo = re.sub(r"^—\s*", "", nome_limpo)
+
+    # Remove apenas caracteres especiais do início e fim, preservando letras, números e espaços
+    nome_limpo = re.sub(r"^[^\w\s]+|[^\w\s]+$", "", nome_limpo)
+
+    # Remove espaços extras
+    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
+
+    # Debug: mostrar quando o nome foi alterado
+    if nome_original != nome_limpo:
+        trace("LIMPEZA", "Limpeza: %r -> %r", nome_original, nome_limpo)
+
+    return nome_limpo
+
+
+# Função para extrair suspensões
+def extrair_suspensoes(texto):
+    """
+    Extrai as suspensões do histórico escolar
+    Retorna uma lista com os períodos de suspensão
+    """
+    # Primeiro, tenta o padrão específico de suspensões
+    match_suspensoes = padrao_suspensoes.search(texto)
+    if match_suspensoes:
+        suspensoes_str = match_suspensoes.group(1)
+        if suspensoes_str and suspensoes_str.strip():
+            # Divide as suspensões por vírgula e limpa espaços
+            suspensoes = [s.strip() for s in suspensoes_str.split(",") if s.strip()]
+            trace("SUSPENSÕES", "Suspensões extraídas: %s", suspensoes)
+            return suspensoes
+
+    # Fallback: busca linha por linha
+    linhas = texto.splitlines()
+    for i, linha in enumerate(linhas):
+        norm = normalizar(linha)
+        if "SUSPENSOES" in norm or "SUSPENSÃO" in norm:
+            # Tenta extrair da mesma linha
+            suspensoes_na_linha = re.findall(r"\d{4}\.\d", linha)
+            if suspensoes_na_linha:
+                trace(
+                    "SUSPENSÕES",
+                    "Suspensões extraídas (mesma linha): %s",
+                    suspensoes_na_linha,
+                )
+                return suspensoes_na_linha
+
+            # Se não encontrar, tenta na próxima linha
+            if i + 1 < len(linhas):
+                prox = linhas[i + 1]
+                suspensoes_prox = re.findall(r"\d{4}\.\d", prox)
+                if suspensoes_prox:
+                    trace(
+                        "SUSPENSÕES",
+                        "Suspensões extraídas (linha seguinte): %s",
+                        suspensoes_prox,
+                    )
+                    return suspensoes_prox
+
+    trace("AVISO", "Suspensões não encontradas no PDF")
+    return []
+
+
+# Função para extrair matriz curricular
+def extrair_matriz_curricular(texto):
+    # Primeiro, tenta o padrão específico do novo formato estruturado
+    match_curriculo_novo = padrao_curriculo_novo.search(texto)
+    if match_curriculo_novo:
+        matriz = match_curriculo_novo.group(2)  # Pega a parte ano.período
+        trace("MATRIZ", "Matriz Curricular extraída (padrão novo): %s", matriz)
+        return matriz
+
+    linhas = texto.splitlines()
+
+    # Segundo, tenta encontrar o padrão específico "número/número - ano.período"
+    # que é o formato padrão da matriz curricular da UnB
+    padrao_matriz_especifico = re.compile(r"(\d+/\d+\s*-\s*(\d{4}\.\d))", re.MULTILINE)
+    match_especifico = padrao_matriz_especifico.search(texto)
+    if match_especifico:
+        matriz = match_especifico.group(2)  # Pega apenas a parte ano.período
+        trace("MATRIZ", "Matriz Curricular extraída (padrão específico): %s", matriz)
+        return matriz
+
+    # Debug: mostrar todas as linhas que contêm 'CURRICULO' ou 'INTEGRALIZAÇÃO'
+    # (varredura extra, só com trace ligado)
+    if trace_ativo():
+        for i, linha in enumerate(linhas):
+            norm = normalizar(linha)
+            if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
+                trace("DEBUG MATRIZ", "Linha %d: %r", i, linha)
+                if i + 1 < len(linhas):
+                    trace("DEBUG MATRIZ", "Próxima linha %d: %r", i + 1, linhas[i + 1])
+
+    # Procura por linhas relacionadas à integralização ou currículo
+    for i, linha in enumerate(linhas):
+        norm = normalizar(linha)
+        # Procura por 'CURRICULO' ou 'INTEGRALIZAÇÃO' na linha
+        if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
+            # Tenta extrair o padrão na mesma linha
+            match = re.search(r"(\d{4}[\./]\d)", linha)
+            if match:
+                matriz = match.group(1).replace("/", ".")
+                trace("MATRIZ", "Matriz Curricular extraída: %s", matriz)
+                return matriz
+            # Se não encontrar, tenta na próxima linha
+            if i + 1 < len(linhas):
+                prox = linhas[i + 1]
+                match_prox = re.search(r"(\d{4}[\./]\d)", prox)
+                if match_prox:
+                    matriz = match_prox.group(1).replace("/", ".")
+                    trace(
+                        "MATRIZ",
+                        "Matriz Curricular extraída (linha seguinte): %s",
+                        matriz,
+                    )
+                    return matriz
+
+    # Fallback: procura por linhas que contenham o padrão "número/número - ano.período"
+    # mesmo sem contexto específico
+    for linha in linhas:
+        match_fallback = re.search(r"\d+/\d+\s*-\s*(\d{4}\.\d)", linha)
+        if match_fallback:
+            matriz = match_fallback.group(1)
+            trace("MATRIZ", "Matriz Curricular extraída (fallback): %s", matriz)
+            return matriz
+
+    trace("AVISO", "Matriz Curricular não encontrada no PDF")
+    return None
+
+
+def extrair_semestre_atual(disciplinas):
+    """
+    Extrai o semestre atual baseado nas disciplinas com status MATR ou Matriculado
+    """
+    semestres_matriculados = []
+
+    # Procura por disciplinas com status de matrícula
+    for disc in disciplinas:
+        if isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Regular":
+            status = disc.get("status", "").upper()
+            ano_periodo = disc.get("ano_periodo", "")
+            if status in ["MATR"] and ano_periodo:
+                try:
+                    # Converte para float para comparação (ex: 2024.1 -> 2024.1)
+                    semestre_float = float(ano_periodo)
+                    semestres_matriculados.append(semestre_float)
+                except ValueError:
+                    continue
+        elif isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Pendente":
+            status = disc.get("status", "").upper()
+            observacao = disc.get("observacao", "").upper()
+            if status == "MATR" or "MATRICULADO" in observacao:
+                # Para disciplinas pendentes, usa o semestre atual
+                hoje = datetime.now()
+                semestre = 1 if hoje.month <= 6 else 2
+                semestre_atual = f"{hoje.year}.{semestre}"
+                try:
+                    semestres_matriculados.append(float(semestre_atual))
+                except ValueError:
+                    continue
+
+    # Retorna o semestre mais recente se houver algum
+    if semestres_matriculados:
+        semestre_atual = max(semestres_matriculados)
+        return f"{semestre_atual:.1f}"  # Formata como string (ex: 2024.1)
+
+    # Se não encontrar nenhum, retorna None
+    return None
+
+
+def calcular_numero_semestre(disciplinas):
+    """
+    Calcula o número do semestre baseado na quantidade de semestres onde houve conclusão de disciplinas
+    Considera semestres onde houve aprovação, dispensa, reprovação ou cumprimento (equivalência) de disciplinas
+    """
+    if not disciplinas:
+        return None
+
+    # Conjunto para armazenar semestres únicos onde o aluno concluiu disciplinas
+    semestres_cursados = set()
+
+    for disc in disciplinas:
+        if isinstance(disc, dict):
+            status = disc.get("status", "").upper()
+            ano_periodo = disc.get("ano_periodo", "")
+
+            # Considera apenas disciplinas efetivamente concluídas
+            # APR = Aprovado
+            # DISP = Dispensa (integralizada sem cursar)
+            # REP/REPF/REPMF = Reprovado (por nota, falta ou média/falta)
+            # CUMP = Cumpriu por equivalência
+            if (
+                status in ["APR", "DISP", "REP", "REPF", "REPMF", "CUMP"]
+                and ano_periodo
+                and ano_periodo.strip()
+            ):
+                try:
+                    semestres_cursados.add(ano_periodo)
+                except Exception:
+                    continue
+
+    # Debug: mostrar os semestres encontrados
+    trace(
+        "DEBUG",
+        "Semestres com disciplinas concluídas: %s",
+        sorted(semestres_cursados),
+    )
+
+    # Retorna o número de semestres únicos + 1 (para o semestre atual)
+    if semestres_cursados:
+        return len(semestres_cursados) + 1
+
+    return 1  # Se não encontrou nenhum semestre cursado, assume primeiro semestre
+
+
+# --- Tokenizador de linhas + máquina de estados para disciplinas ---
+# Cada linha é classificada UMA vez em um bitmask de classes (uma mesma linha
+# pode pertencer a várias: "60" é turma, carga horária e frequência; "MM" é
+# turma e menção). Os filtros baratos (tamanho, 1º caractere) só deixam passar
+# para o regex as linhas que podem casar, então o resultado é idêntico ao de
+# aplicar os padrao_* diretamente. Nome de disciplina é a exceção: o regex é
+# caro, então ele é avaliado sob demanda (e memoizado) apenas nas posições em
+# que o restante do bloco já casou.
+TOK_ANO_PERIODO = 1 << 0
+TOK_TURMA = 1 << 1
+TOK_SITUACAO = 1 << 2
+TOK_CODIGO = 1 << 3
+TOK_CARGA = 1 << 4
+TOK_FREQUENCIA = 1 << 5
+TOK_MENCAO = 1 << 6
+TOK_PROFESSOR = 1 << 7  # candidata: contém "h)", o regex fica para depois
+TOK_NOME = 1 << 8  # avaliado sob demanda, nunca aparece no bitmask
+
+# Sequências aceitas pela máquina de estados (uma linha por estado). A partir
+# da turma os dois formatos são iguais.
+_CAUDA_DISCIPLINA = (
+    TOK_TURMA,
+    TOK_SITUACAO,
+    TOK_CODIGO,
+    TOK_CARGA,
+    TOK_FREQUENCIA,
+    TOK_MENCAO,
+)
+ORDEM_ALTERNATIVA = (TOK_ANO_PERIODO, TOK_NOME) + _CAUDA_DISCIPLINA
+ORDEM_ORIGINAL = (TOK_NOME, TOK_ANO_PERIODO) + _CAUDA_DISCIPLINA
+
+# Linhas da máquina de estados entre duas consultas ao orçamento de CPU
+LINHAS_POR_VERIFICACAO = 512
+
+
+def classificar_linha(linha):
+    """Bitmask de classes de token de uma linha (já com ``strip()``)."""
+    if not linha:
+        return 0
+    tamanho = len(linha)
+    inicio = linha[0]
+    bits = 0
+    if tamanho == 6 and linha[4] == "." and padrao_ano_periodo.search(linha):
+        bits |= TOK_ANO_PERIODO
+    if tamanho <= 3:
+        if padrao_turma.search(linha):
+            bits |= TOK_TURMA
+        if padrao_carga_horaria.search(linha):
+            bits |= TOK_CARGA
+    if 3 <= tamanho <= 5 and padrao_situacao.search(linha):
+        bits |= TOK_SITUACAO
+    if tamanho >= 5 and "A" <= inicio <= "Z" and padrao_codigo_disciplina.search(linha):
+        bits |= TOK_CODIGO
+    if (inicio.isdigit() or inicio == "-") and padrao_frequencia.search(linha):
+        bits |= TOK_FREQUENCIA
+    if tamanho <= 2 and padrao_mencao.search(linha):
+        bits |= TOK_MENCAO
+    if "h)" in linha:
+        bits |= TOK_PROFESSOR
+    return bits
+
+
+def tokenizar_linhas(linhas):
+    """
+    Tokenização única: devolve ``(texto, tokens)`` com as linhas já sem
+    espaços nas pontas e o bitmask de classes de cada uma.
+    """
+    texto = [linha.strip() for linha in linhas]
+    return texto, [classificar_linha(linha) for linha in texto]
+
+
+def reconhecer_disciplinas(texto, tokens, inicio=0, limite=None):
+    """
+    Gera ``(indice, ordem, campos)`` para cada bloco de disciplina reconhecido
+    sobre a saída de ``tokenizar_linhas``; ``campos`` traz nome, ano_periodo,
+    turma, situacao, codigo, carga_h, freq e mencao.
+
+    A máquina de estados testa em cada posição as duas sequências
+    (``ORDEM_ALTERNATIVA`` e ``ORDEM_ORIGINAL``) consultando só os bitmasks;
+    ao reconhecer um bloco, salta as 8 linhas dele, senão avança uma linha —
+    exatamente a semântica da janela deslizante anterior, sem re-executar
+    regex nas linhas seguintes.
+
+    ``inicio``/``limite`` restringem as posições testadas (modo incremental);
+    as condições de fim de texto continuam usando o total de linhas.
+    """
+    total = len(texto)
+    fim = total if limite is None else min(limite, total)
+    nomes = {}
+
+    def nome_em(j):
+        if j not in nomes:
+            match = padrao_nome_disciplina.search(texto[j])
+            nomes[j] = match.group(1) if match else None
+        return nomes[j]
+
+    def casa(i, ordem):
+        # Classes baratas primeiro; o nome (regex caro) só no fim
+        for deslocamento, classe in enumerate(ordem):
+            if classe != TOK_NOME and not tokens[i + deslocamento] & classe:
+                return False
+        return nome_em(i + ordem.index(TOK_NOME)) is not None
+
+    i = inicio
+    verificar_em = i
+    while i < fim:
+        if i >= verificar_em:
+            verificar_orcamento("disciplinas")
+            verificar_em = i + LINHAS_POR_VERIFICACAO
+        if tokens[i] & TOK_ANO_PERIODO:
+            ordem = ORDEM_ALTERNATIVA if i + 7 < total else None
+            indice_nome, indice_ano = i + 1, i
+        else:
+            ordem = ORDEM_ORIGINAL if i + 8 < total else None
+            indice_nome, indice_ano = i, i + 1
+
+        if ordem is not None and casa(i, ordem):
+            yield i, ordem, {
+                "nome": nome_em(indice_nome),
+                "ano_periodo": texto[indice_ano],
+                "turma": texto[i + 2],
+                "situacao": texto[i + 3],
+                "codigo": texto[i + 4],
+                "carga_h": texto[i + 5],
+                "freq": texto[i + 6],
+                "mencao": texto[i + 7],
+            }
+            i += 8
+            continue
+
+        i += 1
+
+
+def processar_disciplina_encontrada(
+    nome,
+    ano_periodo,
+    turma,
+    situacao,
+    codigo,
+    carga_h,
+    freq,
+    mencao,
+    linhas,
+    start_idx,
+    disciplinas_list,
+    tokens=None,
+):
+    """
+    Processa uma disciplina encontrada e adiciona aos dados
+    Retorna True se processada com sucesso, False se ignorada
+    ``tokens`` (bitmasks de ``classificar_linha``) evita rodar o regex de
+    professor em linhas que não podem casar.
+    """
+
+    # Menções II, MI e SR são reprovação (escala de letra, não numérica) --
+    # a disciplina entra no histórico normalmente, com status forçado pra
+    # REP, independente do que a coluna "situação" do PDF trouxer.
+    if mencao.upper() in ["II", "MI", "SR"]:
+        trace(
+            "DISCIPLINAS",
+            "Menção %s (reprovado): %s - %.30s... (situação original: %s -> forçando REP)",
+            mencao,
+            codigo,
+            nome.strip(),
+            situacao,
+        )
+        situacao = "REP"
+
+    # Procurar símbolos e professor nas próximas linhas
+    simbolos = ""
+    professor = ""
+    carga_h_prof = ""
+
+    for j in range(start_idx, min(len(linhas), start_idx + 4)):
+        linha_extra = linhas[j].strip()
+
+        # Procurar por símbolos
+        match_simb = padrao_simbolos.search(linha_extra)
+        if match_simb:
+            simbolos = match_simb.group(1)
+            continue
+
+        # Procurar por professor
+        if tokens is not None and not tokens[j] & TOK_PROFESSOR:
+            continue
+        match_prof = padrao_professor.search(linha_extra)
+        if match_prof:
+            professor = match_prof.group(1)
+            carga_h_prof = match_prof.group(2)
+            break
+
+    # Usar a carga horária do professor se disponível, senão usar a da disciplina
+    carga_final = carga_h_prof if carga_h_prof else carga_h
+
+    disciplina_data = {
+        "tipo_dado": "Disciplina Regular",
+        "nome": limpar_nome_disciplina(nome.strip()),
+        "status": situacao,
+        "mencao": mencao if mencao != "-" else "-",
+        "creditos": (
+            int(int(carga_final) / 15) if carga_final and carga_final.isdigit() else 0
+        ),
+        "codigo": codigo,
+        "carga_horaria": (
+            int(carga_final) if carga_final and carga_final.isdigit() else 0
+        ),
+        "ano_periodo": ano_periodo,
+        "prefixo": simbolos,
+        "professor": limpar_nome_professor(professor.strip()) if professor else "",
+        "turma": turma,
+        "frequencia": freq if freq != "--" else None,
+        "nota": None,  # No novo formato, usa menção em vez de nota
+    }
+    disciplinas_list.append(disciplina_data)
+    trace(
+        "DISCIPLINAS",
+        "Disciplina: %s - %.30s... (Status: %s)",
+        codigo,
+        nome.strip(),
+        situacao,
+    )
+    return True
+
+
+# --- Impressão digital do layout (cabeçalho) ---
+# O cabeçalho do SIGAA (primeira página, até a tabela de componentes cursados)
+# traz cada campo numa linha de rótulo seguida do valor. Reconhecido esse
+# layout, cada campo sai de um único padrão aplicado só ao cabeçalho, e as
+# cadeias de tentativas de extrair_curso/extrair_matriz_curricular/
+# extrair_suspensoes (que varrem o texto inteiro, linha a linha com
+# normalizar) ficam para layout desconhecido ou campo fora do formato.
+FIM_CABECALHO = "Componentes Curriculares Cursados/Cursando"
+ROTULOS_CABECALHO = ("Curso:", "Currículo:", "Suspensões:")
+LAYOUT_SIGAA = "sigaa"
+
+
+def identificar_layout(texto):
+    """
+    Impressão digital do layout a partir do cabeçalho: ``(layout,
+    cabecalho)`` com ``layout`` = ``LAYOUT_SIGAA`` quando o texto antes de
+    ``FIM_CABECALHO`` tem as linhas de rótulo de ``ROTULOS_CABECALHO``, ou
+    ``(None, None)`` (layout desconhecido).
+    """
+    fim = texto.find(FIM_CABECALHO)
+    if fim < 0:
+        return None, None
+    cabecalho = texto[:fim]
+    rotulos = {linha.strip() for linha in cabecalho.splitlines()}
+    if not all(rotulo in rotulos for rotulo in ROTULOS_CABECALHO):
+        return None, None
+    return LAYOUT_SIGAA, cabecalho
+
+
+def _suspensoes_do_cabecalho(cabecalho):
+    """Suspensões pela linha após ``Suspensões:``; None fora do formato."""
+    match = padrao_suspensoes.search(cabecalho)
+    if not match:
+        return None
+    if match.group(1).strip():
+        return [s.strip() for s in match.group(1).split(",") if s.strip()]
+    seguinte = cabecalho[match.end() :].split("\n", 1)[0].strip()
+    return [] if seguinte == "Nenhum" else None
+
+
+def _numero(match):
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def extrair_cabecalho(texto):
+    """
+    Dados de cabeçalho do histórico: curso, matriz, suspensões, IRA e MP
+    (aceita vírgula ou ponto como separador decimal). No SIGAA todos ficam na
+    primeira página, então o modo streaming chama isto só com ela.
+
+    Com o layout reconhecido (``identificar_layout``) cada campo sai de um
+    padrão só, aplicado ao cabeçalho; o campo que não casar, e todos eles em
+    layout desconhecido, passam pelas funções de extração completas.
+    """
+    layout, cabecalho = identificar_layout(texto)
+    trace("LAYOUT", "Layout do cabeçalho: %s", layout or "desconhecido")
+    base = cabecalho if layout else texto
+
+    ira_match = padrao_ira.search(base) or (layout and padrao_ira.search(texto))
+    ira = _numero(ira_match)
+    trace("IRA", "Extraído: %s", ira)
+    mp = _numero(padrao_mp.search(base) or (layout and padrao_mp.search(texto)))
+    trace("MP", "Extraído: %s", mp)
+
+    curso = matriz = suspensoes = None
+    if layout:
+        match_curso = padrao_curso_novo.search(cabecalho)
+        if match_curso:
+            curso = match_curso.group(1).strip()
+            trace("CURSO", "Curso extraído (layout %s): %s", layout, curso)
+        match_matriz = padrao_curriculo_novo.search(cabecalho)
+        if match_matriz:
+            matriz = match_matriz.group(2)
+            trace(
+                "MATRIZ", "Matriz Curricular extraída (layout %s): %s", layout, matriz
+            )
+        suspensoes = _suspensoes_do_cabecalho(cabecalho)
+        if suspensoes is not None:
+            trace("SUSPENSÕES", "Suspensões (layout %s): %s", layout, suspensoes)
+
+    return {
+        "curso": curso if curso is not None else extrair_curso(texto),
+        "matriz_curricular": (
+            matriz if matriz is not None else extrair_matriz_curricular(texto)
+        ),
+        "suspensoes": (
+            suspensoes if suspensoes is not None else extrair_suspensoes(texto)
+        ),
+        "ira": ira,
+        "ira_texto": ira_match.group(1) if ira_match else None,
+        "media_ponderada": mp,
+    }
+
+
+def processar_disciplinas(
+    linhas, texto_linhas, tokens, disciplinas, inicio=0, limite=None
+):
+    """
+    Reconhece os blocos de disciplina em ``[inicio, limite)`` e adiciona cada
+    um, já processado, em ``disciplinas``. Retorna ``(proxima, encontradas,
+    ignoradas)``; ``proxima`` é a posição de onde continuar a varredura
+    quando chegarem mais linhas.
+    """
+    proxima = max(inicio, len(linhas) if limite is None else limite)
+    encontradas = 0
+    ignoradas = 0
+    for i, ordem, campos in reconhecer_disciplinas(
+        texto_linhas, tokens, inicio, limite
+    ):
+        formato = "alternativo" if ordem is ORDEM_ALTERNATIVA else "original"
+        trace(
+            "DEBUG",
+            "Disciplina encontrada (padrão %s) na linha %d: %.30s...",
+            formato,
+            i,
+            campos["nome"],
+        )
+        if not processar_disciplina_encontrada(
+            campos["nome"],
+            campos["ano_periodo"],
+            campos["turma"],
+            campos["situacao"],
+            campos["codigo"],
+            campos["carga_h"],
+            campos["freq"],
+            campos["mencao"],
+            linhas,
+            i + 8,
+            disciplinas,
+            tokens,
+        ):
+            ignoradas += 1
+        else:
+            encontradas += 1
+        proxima = max(proxima, i + 8)
+    return proxima, encontradas, ignoradas
+
+
+def _ultima_cauda(texto, inicio, fim):
+    """
+    Última sequência de espaços de ``texto[inicio:fim]`` seguida de carga
+    horária e código: ``(inicio_dos_espacos, fim_dos_espacos, match)`` ou None.
+    """
+    sequencias = [m.span() for m in padrao_espacos.finditer(texto, inicio, fim)]
+    for comeco, final in reversed(sequencias):
+        cauda = padrao_cauda_pendente.match(texto, final - 1)
+        if cauda:
+            return comeco, final, cauda
+    return None
+
+
+def encontrar_pendentes(texto):
+    """
+    Disciplinas pendentes do formato novo: ``[(nome, carga_h, codigo,
+    matriculado), ...]``, o mesmo que dava o ``findall`` (MULTILINE |
+    IGNORECASE) da forma antiga
+
+        ^\\s+([A-ZÀ-Ÿ\\s0-9]+(?:DE\\s+[A-ZÀ-Ÿ\\s0-9]*)*)\\s+(\\d+)\\s*h\\s+
+        ([A-Z]{2,}\\d{3,})(?:\\s+(Matriculado|Matriculado em Equivalente))?
+
+    em tempo linear. O grupo ``(?:DE\\s+...)*`` não muda o que o nome aceita
+    (D, E e espaço já estão na classe), só multiplicava as repartições
+    testadas: exponencial no número de "DE" numa linha sem cauda, e
+    quadrático em texto longo só com letras, dígitos e espaços (a classe
+    atravessa linhas), ~8 s em 26 KB.
+
+    Como a classe do nome inclui espaços e quebras de linha, o nome vai até a
+    **última** sequência de espaços do trecho contínuo da classe que é
+    seguida de ``<carga> h <código>`` (preferência do quantificador guloso).
+    A resposta depende só do trecho, então é calculada uma vez por trecho e
+    reaproveitada pelas linhas seguintes que começam dentro dele.
+    """
+    pendentes = []
+    total = len(texto)
+    espacos = (0, 0)  # última sequência de espaços do início de linha
+    trecho = (0, 0, None)  # último trecho do nome e a sua cauda
+    linha = 0
+    while linha < total:
+        if espacos[0] <= linha < espacos[1]:
+            nome_inicio = espacos[1]
+        else:
+            m = padrao_espacos.match(texto, linha)
+            if m:
+                espacos = m.span()
+            nome_inicio = m.end() if m else linha
+        encontrado = None
+        if nome_inicio > linha:
+            if not trecho[0] <= nome_inicio < trecho[1]:
+                m = padrao_nome_pendente.match(texto, nome_inicio)
+                fim = m.end() if m else nome_inicio
+                trecho = (nome_inicio, fim, _ultima_cauda(texto, nome_inicio, fim))
+            alvo = trecho[2]
+            if alvo and alvo[0] > nome_inicio:
+                encontrado = (nome_inicio, alvo[1] - 1, alvo[2])
+            elif nome_inicio - linha >= 3:
+                # Sem cauda depois do nome, resta a linha que começa pela carga
+                # horária: o "nome" é o penúltimo espaço do recuo
+                cauda = padrao_cauda_pendente.match(texto, nome_inicio - 1)
+                if cauda:
+                    encontrado = (nome_inicio - 2, nome_inicio - 1, cauda)
+        if encontrado:
+            inicio, fim, cauda = encontrado
+            carga_h, codigo, matriculado = cauda.groups(default="")
+            pendentes.append((texto[inicio:fim], carga_h, codigo, matriculado))
+            proxima = cauda.end()
+            if texto[proxima - 1] != "\n":
+                proxima = texto.find("\n", proxima) + 1 or total
+        else:
+            proxima = texto.find("\n", linha) + 1 or total
+        linha = proxima
+    return pendentes
+
+
+def montar_dados_academicos(texto_total, cabecalho, regulares):
+    """
+    Completa a extração a partir do cabeçalho e das disciplinas regulares já
+    reconhecidas: pendentes, equivalências, pendências e semestre, que
+    dependem do texto inteiro.
+    """
+    disciplinas = []
+
+    # Adicionar IRA como item se encontrado (valor_texto = como no PDF, sem arredondar na exibição)
+    if cabecalho["ira"]:
+        ira_item = {"IRA": "IRA", "valor": cabecalho["ira"]}
+        if cabecalho["ira_texto"] is not None:
+            ira_item["valor_texto"] = cabecalho["ira_texto"]
+        disciplinas.append(ira_item)
+
+    disciplinas.extend(regulares)
+
+    # Extrair disciplinas pendentes (formato novo)
+    verificar_orcamento("pendentes")
+    with etapa("pendentes"):
+        disciplinas_pendentes = encontrar_pendentes(texto_total)
+    trace(
+        "PENDENTES",
+        "Encontradas %d disciplinas pendentes (formato novo)",
+        len(disciplinas_pendentes),
+    )
+
+    for pend in disciplinas_pendentes:
+        nome, carga_h, codigo = pend[:3]
+        status_matricula = pend[3] if len(pend) > 3 else None
+
+        status = "MATR" if status_matricula else "PENDENTE"
+
+        disciplina_data = {
+            "tipo_dado": "Disciplina Pendente",
+            "nome": limpar_nome_disciplina(nome.strip()),
+            "status": status,
+            "mencao": "-",
+            "creditos": int(int(carga_h) / 15) if carga_h.isdigit() else 0,
+            "codigo": codigo,
+            "carga_horaria": int(carga_h) if carga_h.isdigit() else 0,
+            "ano_periodo": "",
+            "prefixo": "",
+            "observacao": status_matricula,
+        }
+        disciplinas.append(disciplina_data)
+        trace(
+            "PENDENTES",
+            "Pendente: %s - %.30s... (Status: %s)",
+            codigo,
+            nome.strip(),
+            status,
+        )
+
+    # Extrair equivalências
+    equivalencias = []
+    verificar_orcamento("equivalencias")
+    with etapa("equivalencias"):
+        equivalencias_match = padrao_equivalencias.findall(texto_total)
+    trace("EQUIVALENCIAS", "Encontradas %d equivalências", len(equivalencias_match))
+
+    for eq in equivalencias_match:
+        (
+            codigo_cumpriu,
+            nome_cumpriu,
+            ch_cumpriu,
+            codigo_equivalente,
+            nome_equivalente,
+            ch_equivalente,
+        ) = eq
+        equivalencias.append(
+            {
+                "cumpriu": codigo_cumpriu,
+                "nome_cumpriu": nome_cumpriu.strip(),
+                "atraves_de": codigo_equivalente,
+                "nome_equivalente": nome_equivalente.strip(),
+                "ch_cumpriu": ch_cumpriu,
+                "ch_equivalente": ch_equivalente,
+            }
+        )
+        trace(
+            "EQUIVALENCIAS", "Equivalência: %s ← %s", codigo_cumpriu, codigo_equivalente
+        )
+
+    # Extrair pendências (apenas contar ocorrências)
+    verificar_orcamento("pendencias")
+    pendencias = padrao_pendencias.findall(texto_total)
+    if pendencias:
+        # Contar ocorrências de cada status
+        contagem_pendencias = Counter(pendencias)
+        disciplinas.append(
+            {"tipo_dado": "Pendencias", "valores": dict(contagem_pendencias)}
+        )
+        trace("PENDENCIAS", "Encontradas: %s", dict(contagem_pendencias))
+
+    # Extrair o semestre atual
+    semestre_atual = extrair_semestre_atual(disciplinas)
+    trace("SEMESTRE", "Semestre atual extraído: %s", semestre_atual)
+
+    # Calcular o número do semestre baseado em semestres cursados
+    numero_semestre = calcular_numero_semestre(disciplinas)
+    trace("SEMESTRE", "Número do semestre calculado: %sº semestre", numero_semestre)
+
+    trace("FIM", "Extração concluída: %d itens extraídos", len(disciplinas))
+
+    return {
+        "disciplinas": disciplinas,
+        "equivalencias": equivalencias,
+        "curso": cabecalho["curso"],
+        "matriz_curricular": cabecalho["matriz_curricular"],
+        "media_ponderada": cabecalho["media_ponderada"],
+        "ira": cabecalho["ira"],
+        "semestre_atual": semestre_atual,
+        "numero_semestre": numero_semestre,
+        "suspensoes": cabecalho["suspensoes"],
+    }
+
+
+def extrair_dados_academicos(texto_total):
+    """
+    Extrai todos os dados acadêmicos do texto usando regex patterns otimizados
+    Funciona com ambos os formatos de histórico escolar
+
+    Nota: Ignora automaticamente disciplinas com menções II, MI e SR:
+    - II: Incomparável por Infrequência
+    - MI: Média Insuficiente
+    - SR: Sem Rendimento
+    """
+    trace("INICIO", "Iniciando extração com regex otimizado")
+
+    # Debug: mostrar alguns trechos do texto para identificar o formato
+    if trace_ativo():
+        trace("DEBUG", "Primeiras 500 chars do texto: %r", texto_total[:500])
+
+    # Extrair informações básicas
+    with etapa("cabecalho"):
+        cabecalho = extrair_cabecalho(texto_total)
+
+    verificar_orcamento("cabecalho")
+    trace("DISCIPLINAS", "Processando novo formato SIGAA com PyMuPDF...")
+
+    # Capturar dados de disciplinas linha por linha (novo formato estruturado):
+    # tokenização única + máquina de estados (ver reconhecer_disciplinas)
+    linhas = texto_total.splitlines()
+    trace("DEBUG", "Total de linhas a processar: %d", len(linhas))
+
+    regulares = []
+    with etapa("disciplinas"):
+        texto_linhas, tokens = tokenizar_linhas(linhas)
+        _, disciplinas_encontradas, disciplinas_ignoradas = processar_disciplinas(
+            linhas, texto_linhas, tokens, regulares
+        )
+
+    trace(
+        "DISCIPLINAS",
+        "Encontradas %d disciplinas regulares",
+        disciplinas_encontradas,
+    )
+    if disciplinas_ignoradas > 0:
+        trace(
+            "DISCIPLINAS",
+            "Ignoradas %d disciplinas com menções II, MI ou SR",
+            disciplinas_ignoradas,
+        )
+
+    return montar_dados_academicos(texto_total, cabecalho, regulares)
+
+
+class ExtracaoIncremental:
+    """
+    ``extrair_dados_academicos`` alimentado página a página (modo streaming).
+
+    ``adicionar_pagina`` devolve as disciplinas regulares cujo bloco já chegou
+    por inteiro; ``finalizar`` processa o resto e devolve o mesmo resultado
+    que ``extrair_dados_academicos`` daria sobre o texto completo.
+    """
+
+    # Linhas a partir do início de um bloco necessárias para decidir sobre ele:
+    # 8 do bloco + 4 de símbolos/professor (processar_disciplina_encontrada)
+    JANELA = 12
+
+    def __init__(self):
+        self.paginas = []
+        self.linhas = []
+        self.texto_linhas = []
+        self.tokens = []
+        self.regulares = []
+        self.proxima = 0
+
+    def adicionar_pagina(self, texto_pagina):
+        if texto_pagina:
+            self.paginas.append(texto_pagina)
+            # Mesmas linhas que texto_total.splitlines() daria para esta página
+            novas = (texto_pagina + "\n").splitlines()
+            texto, tokens = tokenizar_linhas(novas)
+            self.linhas.extend(novas)
+            self.texto_linhas.extend(texto)
+            self.tokens.extend(tokens)
+
+        antes = len(self.regulares)
+        limite = len(self.linhas) - self.JANELA + 1
+        if limite > self.proxima:
+            with etapa("disciplinas"):
+                self.proxima, _, _ = processar_disciplinas(
+                    self.linhas,
+                    self.texto_linhas,
+                    self.tokens,
+                    self.regulares,
+                    self.proxima,
+                    limite,
+                )
+        return self.regulares[antes:]
+
+    def finalizar(self):
+        """
+        Retorna ``(texto_total, novas, dados)``: ``novas`` são as disciplinas
+        reconhecidas só no fim do texto; ``dados`` é None sem camada de texto.
+        """
+        antes = len(self.regulares)
+        with etapa("disciplinas"):
+            processar_disciplinas(
+                self.linhas,
+                self.texto_linhas,
+                self.tokens,
+                self.regulares,
+                self.proxima,
+            )
+        texto_total = "".join(f"{texto}\n" for texto in self.paginas)
+        if not texto_total.strip():
+            return texto_total, [], None
+        with etapa("cabecalho"):
+            cabecalho = extrair_cabecalho(texto_total)
+        dados = montar_dados_academicos(texto_total, cabecalho, self.regulares)
+        return texto_total, self.regulares[antes:], dados
+
+
+def limpar_nome_professor(nome):
+    """
+    Limpa o nome do professor removendo títulos e formatação
+    """
+    if not nome:
+        return nome
+
+    # Remove títulos acadêmicos
+    nome_limpo = re.sub(
+        r"^(Dr\.|Dra\.|MSc\.|Prof\.|Professor|Professora)\s*",
+        "",
+        nome,
+        flags=re.IGNORECASE,
+    )
+
+    # Remove caracteres especiais no final
+    nome_limpo = re.sub(r"[^A-ZÀ-Ÿa-zà-ÿ\s]+$", "", nome_limpo)
+
+    # Remove espaços extras
+    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
+
+    return nome_limpo
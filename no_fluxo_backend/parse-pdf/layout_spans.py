@@ -0,0 +1,95 @@
+"""
+Montagem das linhas de texto de uma página a partir dos spans do PyMuPDF.
+
+Em vez de um dict Python por span e de um ``sort`` com lambda por linha, os
+spans com texto são achatados uma vez em arrays (x0, x1, linha) e ordenados,
+agrupados e espaçados em bloco com NumPy. Só os textos ficam numa lista
+Python, indexada pela posição no array.
+
+Regras de montagem (as mesmas do parser desde a primeira versão):
+    - spans só com espaços são ignorados;
+    - dentro da linha, spans em ordem de X; entre dois spans com mais de 10pt
+      de distância entram ``distância / 6`` espaços (mínimo 1, máximo 10);
+    - a distância é medida a partir do fim real do span anterior (bbox x1);
+    - linhas ordenadas pelo Y do topo, mantendo a ordem do PDF nos empates.
+"""
+
+import fitz
+import numpy as np
+
+# Texto sem blocos de imagem: o parser nunca usa as imagens, e com
+# TEXT_PRESERVE_IMAGES o MuPDF ainda decodifica e copia cada uma para o dict.
+FLAGS_SOMENTE_TEXTO = fitz.TEXTFLAGS_TEXT
+
+DISTANCIA_MINIMA = 10  # pontos entre spans para inserir espaço
+PONTOS_POR_ESPACO = 6
+MAX_ESPACOS = 10
+
+
+def dict_da_pagina(page):
+    """``get_text("dict")`` da página sem extrair imagens."""
+    return page.get_text("dict", flags=FLAGS_SOMENTE_TEXTO)
+
+
+def coletar_spans(text_dict):
+    """
+    Achata os spans com texto do dict do PyMuPDF.
+
+    Retorna ``(textos, x0, x1, linha, y_linhas)``: ``linha[i]`` é o índice da
+    linha do span ``i`` e ``y_linhas[n]`` é o topo da linha ``n``.
+    """
+    textos = []
+    x0 = []
+    x1 = []
+    linha = []
+    y_linhas = []
+    for block in text_dict.get("blocks", ()):
+        for line in block.get("lines", ()):
+            n = len(y_linhas)
+            y_linhas.append(line["bbox"][1])
+            for span in line.get("spans", ()):
+                texto = span.get("text")
+                if texto and texto.strip():
+                    bbox = span["bbox"]
+                    textos.append(texto)
+                    x0.append(bbox[0])
+                    x1.append(bbox[2])
+                    linha.append(n)
+    return (
+        textos,
+        np.asarray(x0, dtype=np.float64),
+        np.asarray(x1, dtype=np.float64),
+        np.asarray(linha, dtype=np.int64),
+        np.asarray(y_linhas, dtype=np.float64),
+    )
+
+
+def montar_linhas(textos, x0, x1, linha, y_linhas):
+    """Texto da página, uma linha por linha do PDF, de cima para baixo."""
+    if not textos:
+        return ""
+
+    # Por linha e, dentro dela, por X. lexsort é estável: spans com o mesmo
+    # X mantêm a ordem do PDF.
+    ordem = np.lexsort((x0, linha))
+    linha = linha[ordem]
+    inicio_linha = np.empty(len(ordem), dtype=bool)
+    inicio_linha[0] = True
+    np.not_equal(linha[1:], linha[:-1], out=inicio_linha[1:])
+
+    distancia = np.zeros(len(ordem))
+    distancia[1:] = x0[ordem][1:] - x1[ordem][:-1]
+    espacos = np.clip(distancia // PONTOS_POR_ESPACO, 1, MAX_ESPACOS).astype(np.int64)
+    espacos[(distancia <= DISTANCIA_MINIMA) | inicio_linha] = 0
+
+    pedacos = [
+        " " * n + textos[i] if n else textos[i]
+        for i, n in zip(ordem.tolist(), espacos.tolist())
+    ]
+    inicios = np.flatnonzero(inicio_linha).tolist()
+    fins = inicios[1:] + [len(pedacos)]
+    linhas = ["".join(pedacos[a:b]).strip() for a, b in zip(inicios, fins)]
+
+    # Topo de cada linha montada; argsort estável preserva a ordem do PDF
+    y = y_linhas[linha[inicio_linha]]
+    return "\n".join(linhas[i] for i in np.argsort(y, kind="stable").tolist())
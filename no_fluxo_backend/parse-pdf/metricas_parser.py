@@ -0,0 +1,336 @@
+"""
+Métricas do serviço parse-pdf no formato texto do Prometheus (``/metrics``).
+
+Dois níveis:
+    - por requisição, ``medir_parse()`` liga (via ContextVar) uma
+      ``MedicaoParse`` que soma o tempo de cada etapa do parse marcada com
+      ``etapa(nome)``; desligado, ``etapa`` só lê a ContextVar. A medição é
+      picklável, então volta dos workers do pool junto com o resultado, e vira
+      o header ``Server-Timing`` da resposta;
+    - no processo, histogramas/contadores/medidores acumulados em memória e
+      expostos por ``exposicao()``. Só o processo principal registra neles
+      (a partir das medições devolvidas), então o pool não perde amostras.
+
+Cada processo do servidor tem os próprios contadores: com vários processos
+(gunicorn -w N) o Prometheus deve raspar cada um.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_METRICAS  0 desliga o /metrics e o Server-Timing (padrão: 1)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICAS_ATIVAS = os.environ.get("PDF_PARSER_METRICAS", "1") != "0"
+
+MIMETYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# Etapas do parse, na ordem do pipeline (também a ordem no Server-Timing)
+ETAPAS = (
+    "fitz_open",
+    "hash_pagina",
+    "get_text",
+    "extract_structured_text",
+    "extracao_paralela",
+    "cabecalho",
+    "disciplinas",
+    "pendentes",
+    "equivalencias",
+)
+
+BUCKETS_SEGUNDOS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BUCKETS_PAGINAS = (1, 2, 4, 8, 16, 32, 64)
+BUCKETS_BYTES = (16384, 65536, 262144, 1048576, 4194304, 10485760)
+BUCKETS_DISCIPLINAS = (5, 10, 25, 50, 100, 200, 500)
+
+_medicao_atual = contextvars.ContextVar("metricas_parser", default=None)
+
+
+class MedicaoParse:
+    """
+    Tempo acumulado por etapa (em segundos), páginas e consultas ao cache de
+    páginas (ver cache_paginas.py) de um parse.
+    """
+
+    def __init__(self):
+        self.etapas = {}
+        self.paginas = 0
+        self.cache_paginas = {"hit": 0, "miss": 0}
+
+    def somar(self, nome, segundos):
+        self.etapas[nome] = self.etapas.get(nome, 0.0) + segundos
+
+
+@contextmanager
+def medir_parse(medicao=None):
+    """
+    Liga a medição por etapa no contexto atual e entrega a ``MedicaoParse``
+    (uma nova, ou ``medicao`` para continuar somando nela).
+    """
+    atual = MedicaoParse() if medicao is None else medicao
+    token = _medicao_atual.set(atual)
+    try:
+        yield atual
+    finally:
+        _medicao_atual.reset(token)
+
+
+@contextmanager
+def etapa(nome):
+    """Soma a duração do bloco na etapa ``nome`` da medição atual, se houver."""
+    atual = _medicao_atual.get()
+    if atual is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        atual.somar(nome, time.perf_counter() - inicio)
+
+
+def contar_paginas(paginas):
+    atual = _medicao_atual.get()
+    if atual is not None:
+        atual.paginas += paginas
+
+
+def contar_pagina_em_cache(hit):
+    atual = _medicao_atual.get()
+    if atual is not None:
+        atual.cache_paginas["hit" if hit else "miss"] += 1
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    pares = ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores))
+    return "{" + pares + "}"
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        return tuple(rotulos.get(n, "") for n in self.rotulos)
+
+    def linhas(self):
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for chave, valor in itens:
+            yield from self._amostras(chave, valor)
+
+    def _amostras(self, chave, valor):
+        yield f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(valor)}"
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def dec(self, valor=1, **rotulos):
+        self.inc(-valor, **rotulos)
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            atual = self._valores.get(chave)
+            if atual is None:
+                atual = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    atual[0][i] += 1
+                    break
+            atual[1] += valor
+            atual[2] += 1
+
+    def _amostras(self, chave, valor):
+        contagens, soma, total = valor
+        acumulado = 0
+        nomes = self.rotulos + ("le",)
+        for limite, contagem in zip(self.buckets, contagens):
+            acumulado += contagem
+            rotulos = _rotulos(nomes, chave + (_numero(limite),))
+            yield f"{self.nome}_bucket{rotulos} {acumulado}"
+        yield f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(soma)}"
+        yield f"{self.nome}_count{_rotulos(self.rotulos, chave)} {total}"
+
+
+ETAPA_SEGUNDOS = Histograma(
+    "pdf_parser_stage_duration_seconds",
+    "Tempo de cada etapa do parse por requisição.",
+    ("stage",),
+)
+REQUISICAO_SEGUNDOS = Histograma(
+    "pdf_parser_request_duration_seconds",
+    "Tempo total da requisição até a resposta (sem o corpo em streaming).",
+    ("endpoint",),
+)
+REQUISICOES = Contador(
+    "pdf_parser_requests_total",
+    "Requisições atendidas, por rota e status HTTP.",
+    ("endpoint", "status"),
+)
+EM_ANDAMENTO = Medidor(
+    "pdf_parser_requests_in_flight",
+    "Requisições sendo atendidas agora.",
+    ("endpoint",),
+)
+PAGINAS = Histograma(
+    "pdf_parser_pages_per_request",
+    "Páginas por PDF processado (só parses fora do cache).",
+    buckets=BUCKETS_PAGINAS,
+)
+BYTES = Histograma(
+    "pdf_parser_request_bytes",
+    "Tamanho dos PDFs recebidos.",
+    buckets=BUCKETS_BYTES,
+)
+DISCIPLINAS = Histograma(
+    "pdf_parser_disciplines_per_request",
+    "Disciplinas regulares extraídas por PDF.",
+    buckets=BUCKETS_DISCIPLINAS,
+)
+CACHE = Contador(
+    "pdf_parser_cache_requests_total",
+    "Consultas ao cache de parse, por resultado.",
+    ("result",),
+)
+CACHE_PAGINAS = Contador(
+    "pdf_parser_page_cache_requests_total",
+    "Consultas ao cache de texto por página, por resultado.",
+    ("result",),
+)
+
+PARSES_EM_ANDAMENTO = Medidor(
+    "pdf_parser_parses_in_flight",
+    "Parses ocupando uma vaga da admissão agora.",
+)
+FILA_ADMISSAO = Medidor(
+    "pdf_parser_admission_queue_depth",
+    "Requisições esperando uma vaga de parse.",
+)
+ESPERA_ADMISSAO = Histograma(
+    "pdf_parser_admission_wait_seconds",
+    "Tempo de espera na fila até conseguir uma vaga de parse.",
+)
+RECUSAS = Contador(
+    "pdf_parser_admission_rejections_total",
+    "Requisições recusadas pela admissão, por motivo.",
+    ("reason",),
+)
+
+REGISTRO = (
+    ETAPA_SEGUNDOS,
+    REQUISICAO_SEGUNDOS,
+    REQUISICOES,
+    EM_ANDAMENTO,
+    PAGINAS,
+    BYTES,
+    DISCIPLINAS,
+    CACHE,
+    CACHE_PAGINAS,
+    PARSES_EM_ANDAMENTO,
+    FILA_ADMISSAO,
+    ESPERA_ADMISSAO,
+    RECUSAS,
+)
+
+
+def registrar_parse(medicao, tamanho_bytes, disciplinas, hit):
+    """
+    Registra um parse concluído: ``medicao`` é a ``MedicaoParse`` dele (None
+    em cache hit), ``disciplinas`` o nº de disciplinas regulares (ou None).
+    """
+    if not METRICAS_ATIVAS:
+        return
+    CACHE.inc(result="hit" if hit else "miss")
+    BYTES.observar(tamanho_bytes)
+    if disciplinas is not None:
+        DISCIPLINAS.observar(disciplinas)
+    if medicao is not None:
+        if medicao.paginas:
+            PAGINAS.observar(medicao.paginas)
+        for resultado, quantidade in medicao.cache_paginas.items():
+            if quantidade:
+                CACHE_PAGINAS.inc(quantidade, result=resultado)
+        for nome, segundos in medicao.etapas.items():
+            ETAPA_SEGUNDOS.observar(segundos, stage=nome)
+
+
+def server_timing(medicao=None, total_s=None, hit=None):
+    """Valor do header ``Server-Timing`` (durações em ms)."""
+    partes = []
+    if hit is not None:
+        partes.append(f'cache;desc="{"hit" if hit else "miss"}"')
+    if medicao is not None:
+        ordem = sorted(
+            medicao.etapas,
+            key=lambda n: ETAPAS.index(n) if n in ETAPAS else len(ETAPAS),
+        )
+        partes.extend(f"{n};dur={medicao.etapas[n] * 1000:.2f}" for n in ordem)
+    if total_s is not None:
+        partes.append(f"total;dur={total_s * 1000:.2f}")
+    return ", ".join(partes)
+
+
+def exposicao():
+    """Todas as métricas no formato texto do Prometheus."""
+    return "\n".join(linha for m in REGISTRO for linha in m.linhas()) + "\n"
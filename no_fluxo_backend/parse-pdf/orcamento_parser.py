@@ -0,0 +1,88 @@
+"""
+Orçamento de CPU por parse.
+
+Um PDF malformado (linhas enormes só de maiúsculas, texto repetido) não pode
+prender um núcleo por segundos. ``limitar_cpu()`` liga (via ContextVar, como
+``medir_parse``) um ``OrcamentoCPU`` para o parse da requisição, e o parse
+chama ``verificar_orcamento(onde)`` em pontos regulares: a cada página
+extraída, a cada bloco de linhas da máquina de estados das disciplinas e
+entre as etapas do texto completo. Estourado o orçamento, sai
+``OrcamentoExcedido``, que a rota devolve como 422.
+
+O tempo contado é o de CPU da thread que faz o parse (``time.thread_time``),
+somado entre blocos: espera de E/S ou por uma vaga não conta, e o streaming,
+que pode retomar em outra thread a cada página, soma cada trecho na thread
+em que rodou. A verificação é cooperativa, entre chamadas de regex: não
+interrompe uma chamada em andamento. Por isso os padrões que degeneravam em
+entradas adversariais (nome de disciplina e pendentes, ver
+historico_parser.py) passaram a ser lineares no tamanho da entrada.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_CPU_MAX_S  segundos de CPU por parse; 0 desliga (padrão: 5)
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+CPU_MAX_S = float(os.environ.get("PDF_PARSER_CPU_MAX_S", "5"))
+
+_orcamento_atual = contextvars.ContextVar("orcamento_parser", default=None)
+
+
+class OrcamentoExcedido(Exception):
+    """O parse passou de ``limite_s`` segundos de CPU (detectado em ``onde``)."""
+
+    def __init__(self, limite_s, onde):
+        super().__init__(limite_s, onde)
+        self.limite_s = limite_s
+        self.onde = onde
+
+    def __str__(self):
+        return (
+            f"parse excedeu o orçamento de {self.limite_s:g} s de CPU "
+            f"(em {self.onde})"
+        )
+
+
+class OrcamentoCPU:
+    """Segundos de CPU gastos por um parse, somados entre os blocos ligados."""
+
+    def __init__(self, limite_s=None):
+        self.limite_s = CPU_MAX_S if limite_s is None else limite_s
+        self.gasto_s = 0.0
+        self._inicio = None
+
+    def _gasto(self):
+        if self._inicio is None:
+            return self.gasto_s
+        return self.gasto_s + time.thread_time() - self._inicio
+
+    def verificar(self, onde):
+        if self.limite_s > 0 and self._gasto() > self.limite_s:
+            raise OrcamentoExcedido(self.limite_s, onde)
+
+
+@contextmanager
+def limitar_cpu(orcamento=None):
+    """
+    Liga o orçamento no contexto atual e entrega o ``OrcamentoCPU`` (um novo,
+    ou ``orcamento`` para continuar somando nele, como no streaming).
+    """
+    atual = OrcamentoCPU() if orcamento is None else orcamento
+    token = _orcamento_atual.set(atual)
+    atual._inicio = time.thread_time()
+    try:
+        yield atual
+    finally:
+        atual.gasto_s = atual._gasto()
+        atual._inicio = None
+        _orcamento_atual.reset(token)
+
+
+def verificar_orcamento(onde):
+    """``OrcamentoExcedido`` se o parse atual já passou do orçamento."""
+    atual = _orcamento_atual.get()
+    if atual is not None:
+        atual.verificar(onde)
@@ -1,11 +1,88 @@
 import fitz  # PyMuPDF
-import re
+import json
+import os
+import queue
 import logging
+import re
 import sys
-from flask import Flask, request, jsonify
+import threading
+import time
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import unicodedata
-from datetime import datetime
+import zipfile
+from admissao_parser import AdmissaoRecusada, ControleAdmissao
+from cache_paginas import CachePaginas, hash_da_pagina
+from cache_parser import CacheParser, chave_cache, chave_do_hash
+from compressao_resposta import comprimir_resposta
+from diff_historico import diff_historicos, normalizar_resultado
+from layout_spans import coletar_spans, dict_da_pagina, montar_linhas
+from metricas_parser import (
+    EM_ANDAMENTO,
+    METRICAS_ATIVAS,
+    MIMETYPE_PROMETHEUS,
+    REQUISICAO_SEGUNDOS,
+    REQUISICOES,
+    MedicaoParse,
+    contar_pagina_em_cache,
+    contar_paginas,
+    etapa,
+    exposicao,
+    medir_parse,
+    registrar_parse,
+    server_timing,
+)
+from orcamento_parser import (
+    OrcamentoCPU,
+    OrcamentoExcedido,
+    limitar_cpu,
+    verificar_orcamento,
+)
+from pool_parser import (
+    PAGE_MIN_PAGES,
+    POOL_TIMEOUT,
+    PoolTimeoutError,
+    iniciar_pool,
+    obter_pool,
+    obter_pool_lote,
+    obter_pool_paginas,
+)
+from spool_upload import RequisicaoSpool, spool_de
+from trace_parser import capturar_trace, registrar_resumo
+
+# Parse texto -> dados (sem dependências web): ver historico_parser.py. Os
+# nomes do núcleo continuam importáveis daqui para os scripts e testes
+# existentes.
+from historico_parser import (  # noqa: F401
+    ORDEM_ALTERNATIVA,
+    ORDEM_ORIGINAL,
+    TOK_ANO_PERIODO,
+    TOK_CARGA,
+    TOK_CODIGO,
+    TOK_FREQUENCIA,
+    TOK_MENCAO,
+    TOK_NOME,
+    TOK_PROFESSOR,
+    TOK_SITUACAO,
+    TOK_TURMA,
+    VERSAO_PARSER,
+    ExtracaoIncremental,
+    calcular_numero_semestre,
+    classificar_linha,
+    extrair_cabecalho,
+    extrair_curso,
+    extrair_dados_academicos,
+    extrair_matriz_curricular,
+    extrair_semestre_atual,
+    extrair_suspensoes,
+    limpar_nome_disciplina,
+    limpar_nome_professor,
+    montar_dados_academicos,
+    normalizar,
+    processar_disciplina_encontrada,
+    processar_disciplinas,
+    reconhecer_disciplinas,
+    tokenizar_linhas,
+)
 
 # Configurar encoding UTF-8 para o console
 if sys.platform.startswith("win"):
@@ -23,912 +100,781 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Arquivos do multipart vão para um spool em disco com o SHA-256 calculado na
+# gravação (ver spool_upload.py)
+app.request_class = RequisicaoSpool
 # D4: limite explícito de upload para não consumir RAM inteira em PDF gigante.
 # 10MB cobre histórico SIGAA completo (~500 disciplinas) com folga.
 app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024
 CORS(app)
 
 
+ERRO_MUITO_GRANDE = {
+    "error": "Arquivo muito grande. O limite é 10MB.",
+    "limit_mb": 10,
+}
+
+
 @app.errorhandler(413)
 def too_large(_e):
-    return (
-        jsonify(
-            {
-                "error": "Arquivo muito grande. O limite é 10MB.",
-                "limit_mb": 10,
-            }
-        ),
-        413,
-    )
+    return jsonify(ERRO_MUITO_GRANDE), 413
 
 
 # Request logging middleware
 @app.before_request
 def log_request_info():
-    logger.info("=" * 50)
-    logger.info(f"Request Method: {request.method}")
-    logger.info(f"Request URL: {request.url}")
-    logger.info(f"Request Headers: {dict(request.headers)}")
-    logger.info(
-        f'Request Files: {request.files.keys() if request.files else "No files"}'
+    # Uma linha por requisição; headers só em DEBUG (volume no coletor de logs
+    # e cookies/tokens em texto puro)
+    logger.info(f"{request.method} {request.path}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Request Headers: {dict(request.headers)}")
+
+
+def _rota():
+    # Regra da rota (e não o path) para não criar uma série por URL inválida
+    return request.url_rule.rule if request.url_rule is not None else "outra"
+
+
+@app.before_request
+def iniciar_metricas():
+    if METRICAS_ATIVAS:
+        g.inicio_requisicao = time.perf_counter()
+        EM_ANDAMENTO.inc(endpoint=_rota())
+
+
+@app.after_request
+def registrar_metricas(response):
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is None:
+        return response
+    total_s = time.perf_counter() - inicio
+    rota = _rota()
+    REQUISICOES.inc(endpoint=rota, status=str(response.status_code))
+    REQUISICAO_SEGUNDOS.observar(total_s, endpoint=rota)
+    response.headers["Server-Timing"] = server_timing(
+        g.get("medicao"), total_s, g.get("cache_hit")
     )
-    logger.info("=" * 50)
+    return response
+
+
+@app.teardown_request
+def encerrar_metricas(_exc):
+    if METRICAS_ATIVAS:
+        EM_ANDAMENTO.dec(endpoint=_rota())
 
 
 # --- Configuração do Tesseract ---
 tesseract_path = "C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
 logger.info(f"Using Tesseract path: {tesseract_path}")
 
-# Padrões de Expressão Regular (Regex) - Refatorados para trabalhar no texto completo
-# --- Geral ---
-padrao_ira = re.compile(r"IRA[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
-padrao_mp = re.compile(r"MP[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
-padrao_curriculo = re.compile(r"(\d{4}[\./]\d+(?:\s*-\s*\d{4}\.\d)?)", re.MULTILINE)
-padrao_curso = re.compile(
-    r"Curso[:\s]+([A-ZÀ-Ÿ\s/\\-]+?)(?:\s+Status:|$)", re.IGNORECASE | re.MULTILINE
-)
+# Cache de resultados por SHA-256 do PDF (ver cache_parser.py)
+cache_parse = CacheParser()
 
-# --- Padrão alternativo para curso (formato novo) ---
-padrao_curso_alt = re.compile(
-    r"^([A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*)/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
-    re.MULTILINE | re.IGNORECASE,
-)
+# Texto estruturado por hash de página, reaproveitado entre PDFs diferentes
+# (ver cache_paginas.py). Com o pool, cada worker tem o seu em memória.
+cache_paginas = CachePaginas(versao=VERSAO_PARSER)
 
-# --- Padrão para curso no novo formato ---
-padrao_curso_novo = re.compile(
-    r"Curso:\s*\n([A-ZÀ-ÿ][A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*)/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
-    re.MULTILINE | re.IGNORECASE,
-)
+# Vagas de parse e fila de espera do /upload-pdf (ver admissao_parser.py)
+admissao = ControleAdmissao()
 
-# --- Padrões para novo formato SIGAA com PyMuPDF ---
-# Captura nome da disciplina (linha separada) - mais flexível, incluindo hífens e outros caracteres
-padrao_nome_disciplina = re.compile(
-    r"^([A-ZÀ-ÿ][A-ZÀ-ÿ\s0-9\-]+(?:DE\s+[A-ZÀ-ÿ\s0-9\-]*)*(?:\s+[A-ZÀ-ÿ\s0-9\-]*)*)\s*$",
-    re.MULTILINE | re.IGNORECASE,
-)
 
-# Captura ano/período (cada campo em linha separada)
-padrao_ano_periodo = re.compile(r"^(\d{4}\.\d)$", re.MULTILINE)
+def extract_structured_text(text_dict):
+    """
+    Extrai texto estruturado de um dicionário de texto do PyMuPDF
+    Organiza os spans de texto por posição para formar linhas coerentes
+    (montagem em arrays: ver layout_spans.py)
+    """
+    if not text_dict or "blocks" not in text_dict:
+        return ""
+    return montar_linhas(*coletar_spans(text_dict))
 
-# Captura código da disciplina
-padrao_codigo_disciplina = re.compile(r"^([A-Z]{2,}\d{3,})$", re.MULTILINE)
 
-# Captura situação da disciplina
-padrao_situacao = re.compile(
-    r"^(MATR|APR|REP|REPF|REPMF|CANC|DISP|TRANC)$", re.MULTILINE
-)
-
-# Captura menção
-# D1: aceita hífen ASCII (-), en-dash (–, U+2013) e em-dash (—, U+2014).
-# PDFs do SIGAA gerados com auto-correção de hífens trocam o ASCII por unicode,
-# o que antes fazia o parser perder a disciplina inteira silenciosamente.
-padrao_mencao = re.compile(r"^(SS|MS|MM|MI|II|SR|[\-–—])$", re.MULTILINE)
+def abrir_pdf(pdf):
+    """
+    Abre o PDF a partir dos bytes ou do caminho de um arquivo (o spool do
+    upload, ver spool_upload.py). Pelo caminho o MuPDF lê do arquivo sem uma
+    cópia do PDF em ``bytes``.
+    """
+    if isinstance(pdf, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf, filetype="pdf")
+    try:
+        return fitz.open(pdf, filetype="pdf")
+    except fitz.FileDataError as e:
+        # A mensagem do MuPDF traz o caminho do spool, que não vai ao cliente
+        raise type(e)(str(e).replace(os.fspath(pdf), "<upload>")) from None
 
-# Captura turma (letras e números)
-padrao_turma = re.compile(r"^([A-Z0-9]{1,3})$", re.MULTILINE)
 
-# Captura carga horária
-padrao_carga_horaria = re.compile(r"^(\d{1,3})$", re.MULTILINE)
+def paginas_do_pdf(pdf):
+    """Nº de páginas, lido só do xref (pré-checagem antes de ocupar uma vaga)."""
+    doc = abrir_pdf(pdf)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
 
-# Captura frequência
-padrao_frequencia = re.compile(r"^(\d{1,3}[,\.]\d+|--|\d{1,3})$", re.MULTILINE)
 
-# Captura informações do professor com carga horária
-padrao_professor = re.compile(
-    r"(?:Dr\.|Dra\.|MSc\.|Prof\.|Professor|Professora)?\s*([A-ZÀ-ÿ\s\.]+?)\s*\((\d+)h\)",
-    re.IGNORECASE,
-)
+def texto_da_pagina(doc, page_num, memo):
+    """
+    Texto estruturado da página ``page_num``, do cache de páginas quando a
+    mesma página (pelo hash do conteúdo) já foi extraída de outro PDF.
+    ``memo`` é o ``dict`` do ``hash_da_pagina`` para este documento.
+    """
+    hash_pagina = None
+    if cache_paginas.ativo:
+        with etapa("hash_pagina"):
+            hash_pagina = hash_da_pagina(doc, page_num, memo)
+        texto = cache_paginas.obter(hash_pagina)
+        contar_pagina_em_cache(texto is not None)
+        if texto is not None:
+            return texto
+    with etapa("get_text"):
+        text_dict = dict_da_pagina(doc[page_num])
+    with etapa("extract_structured_text"):
+        texto = extract_structured_text(text_dict)
+    if hash_pagina is not None:
+        cache_paginas.guardar(hash_pagina, texto)
+    verificar_orcamento(f"página {page_num + 1}")
+    return texto
+
+
+def _extrair_faixa_paginas(pdf, inicio, fim):
+    """
+    Extrai o texto estruturado das páginas ``[inicio, fim)``. Cada chamada
+    abre o próprio handle do documento (handles do MuPDF não são
+    compartilháveis entre processos).
+    """
+    doc = abrir_pdf(pdf)
+    memo = {}
+    try:
+        return [texto_da_pagina(doc, page_num, memo) for page_num in range(inicio, fim)]
+    finally:
+        doc.close()
 
-# Padrão para símbolos especiais que indicam tipo de componente
-padrao_simbolos = re.compile(r"^([*&#e@§%]+)\s*$", re.MULTILINE)
 
+def extrair_texto_paginas(pdf, executor=None):
+    """
+    Texto estruturado de cada página, na ordem das páginas. ``pdf`` são os
+    bytes ou o caminho do arquivo.
 
-# --- Padrão para equivalências ---
-padrao_equivalencias = re.compile(
-    r"Cumpriu\s+([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)\s*através\s*de\s*([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)",
-    re.MULTILINE | re.IGNORECASE,
-)
+    Com ``PDF_PARSER_PAGE_WORKERS`` > 0 e PDFs a partir de
+    ``PDF_PARSER_PAGE_MIN_PAGES`` páginas, as páginas são divididas em faixas
+    contíguas e extraídas em processos separados; ``executor`` permite forçar
+    um executor específico (usado no benchmark).
+    """
+    with etapa("fitz_open"):
+        doc = abrir_pdf(pdf)
+    total = doc.page_count
+    logger.info(f"PDF has {total} pages")
+    contar_paginas(total)
+
+    if executor is None and total >= PAGE_MIN_PAGES:
+        executor = obter_pool_paginas()
+    if executor is None or total < 2:
+        memo = {}
+        try:
+            return [texto_da_pagina(doc, page_num, memo) for page_num in range(total)]
+        finally:
+            doc.close()
+    doc.close()
+
+    # Nos processos de extração as etapas não são medidas separadamente
+    with etapa("extracao_paralela"):
+        partes = min(executor._max_workers, total)
+        limites = [total * k // partes for k in range(partes + 1)]
+        futuros = [
+            executor.submit(_extrair_faixa_paginas, pdf, inicio, fim)
+            for inicio, fim in zip(limites, limites[1:])
+        ]
+        return [texto for futuro in futuros for texto in futuro.result()]
+
+
+def processar_pdf(pdf, incluir_texto=True):
+    """
+    Pipeline completo de parse: PyMuPDF posicional + extração por regex.
+    Roda inline na rota ou dentro de um worker do pool (precisa ser função de
+    módulo para ser picklável); ``pdf`` são os bytes ou o caminho do arquivo,
+    e com o caminho só ele atravessa o pool. Retorna ``(texto_total, dados_extraidos)``;
+    ``dados_extraidos`` é None quando o PDF não tem camada de texto.
+    Com ``incluir_texto=False`` o texto completo é descartado ao fim do parse
+    (``texto_total`` volta None) e não atravessa o pool nem vai para o cache.
+    O parse inteiro roda sob o orçamento de CPU (ver orcamento_parser.py).
+    """
+    with limitar_cpu():
+        # Tentar extração de texto com PyMuPDF usando posicionamento
+        logger.info("Attempting text extraction with PyMuPDF positional extraction")
+        paginas = extrair_texto_paginas(pdf)
 
-# --- Padrão para disciplinas pendentes (formato novo) ---
-padrao_pendentes_novo = re.compile(
-    r"^\s+([A-ZÀ-Ÿ\s0-9]+(?:DE\s+[A-ZÀ-Ÿ\s0-9]*)*)\s+(\d+)\s*h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?",
-    re.MULTILINE | re.IGNORECASE,
-)
+        # Junta na ordem das páginas de uma vez (sem += repetido de string)
+        texto_total = "".join(f"{texto}\n" for texto in paginas if texto)
+        logger.info(
+            f"Extracted {len(texto_total)} characters from {len(paginas)} pages"
+        )
 
-# --- Padrão específico para disciplinas pendentes SIGAA ---
-padrao_pendentes_sigaa = re.compile(
-    r"^\s+([A-ZÀ-Ÿ\sÇÃÕÁÉÍÓÚÂÊÎÔÛ0-9]+?)\s+(\d+)\s+h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?$",
-    re.MULTILINE | re.IGNORECASE,
-)
+        if not texto_total.strip():
+            return texto_total, None
 
-# --- Padrão para pendências (lista de status) ---
-padrao_pendencias = re.compile(
-    r"\b(APR|CANC|DISP|MATR|REP|REPF|REPMF|TRANC|CUMP)\b", re.IGNORECASE
-)
+        # Extrair dados acadêmicos usando regex otimizado
+        dados_extraidos = extrair_dados_academicos(texto_total)
+    return (texto_total if incluir_texto else None), dados_extraidos
 
-# --- Padrão para matriz curricular específica do formato SIGAA ---
-padrao_matriz_sigaa = re.compile(
-    r"Ano/Período de Integralização[:\s]*(\d+/\d+)\s*-", re.MULTILINE | re.IGNORECASE
-)
 
-# --- Padrão para currículo no novo formato ---
-padrao_curriculo_novo = re.compile(
-    r"Currículo:\s*\n(\d+/\d+)\s*-\s*(\d{4}\.\d)", re.MULTILINE | re.IGNORECASE
-)
+def processar_pdf_medido(pdf, incluir_texto=True):
+    """
+    ``processar_pdf`` com medição por etapa: retorna ``(texto_total,
+    dados_extraidos, medicao)``. É a função dos pools de processos, para que
+    os tempos medidos no worker voltem ao processo principal.
+    """
+    with medir_parse() as medicao:
+        texto_total, dados_extraidos = processar_pdf(pdf, incluir_texto)
+    return texto_total, dados_extraidos, medicao
 
-# --- Padrão para suspensões ---
-padrao_suspensoes = re.compile(
-    r"Suspensões:\s*\n((?:\d{4}\.\d(?:\s*,\s*\d{4}\.\d)*)?)",
-    re.MULTILINE | re.IGNORECASE,
-)
 
+def contar_regulares(dados_extraidos):
+    if dados_extraidos is None:
+        return None
+    return sum(
+        1
+        for item in dados_extraidos["disciplinas"]
+        if item.get("tipo_dado") == "Disciplina Regular"
+    )
 
-def extract_structured_text(text_dict):
-    """
-    Extrai texto estruturado de um dicionário de texto do PyMuPDF
-    Organiza os spans de texto por posição para formar linhas coerentes
-    """
-    if not text_dict or "blocks" not in text_dict:
-        return ""
 
-    lines = []
+def extrair_matricula(filename):
+    """Tenta extrair a matrícula do nome do arquivo (``historico_<matricula>.pdf``)."""
+    matricula = "desconhecida"
+    if "_" in filename:
+        try:
+            matricula = filename.split("_", 1)[1].split(".")[0]
+            logger.info(f"Extracted matricula: {matricula}")
+        except IndexError:
+            logger.warning("Could not extract matricula from filename")
+    return matricula
 
-    for block in text_dict["blocks"]:
-        if "lines" not in block:
-            continue
 
-        for line in block["lines"]:
-            if "spans" not in line:
-                continue
+def parse_com_cache(pdf, incluir_texto=True, chave=None):
+    """
+    Resolve o parse de um PDF consultando o cache antes de despachar para o
+    pool (ou rodar inline). ``pdf`` são os bytes ou o caminho do arquivo; com
+    o caminho, ``chave`` (do hash calculado no spool) é obrigatória. Retorna
+    ``(texto_total, dados_extraidos, hit, medicao)``; ``texto_total`` é None
+    quando ``incluir_texto`` é falso e ``medicao`` (tempos por etapa, ver
+    metricas_parser.py) é None no hit.
+    """
+    # Reenvio do mesmo PDF: devolve o resultado guardado sem reabrir o PDF.
+    # Entradas gravadas pelo perfil lean não têm full_text e só servem a ele.
+    if chave is None:
+        chave = chave_cache(pdf, VERSAO_PARSER)
+    em_cache = cache_parse.obter(chave)
+    if em_cache is not None and (
+        em_cache["full_text"] is not None or not incluir_texto
+    ):
+        logger.info(f"Parse cache hit: {chave[:12]}")
+        return em_cache["full_text"], em_cache["dados"], True, None
+
+    # Fora do cache o parse precisa de uma vaga da admissão. Com o pool
+    # ligado ele roda em um worker pré-forkado; a rota só recebe, despacha e
+    # serializa.
+    admissao.verificar_paginas(paginas_do_pdf(pdf))
+    with admissao.vaga():
+        pool = obter_pool()
+        if pool is not None:
+            logger.info("Dispatching PDF parse to process pool")
+            texto_total, dados_extraidos, medicao = pool.executar(pdf, incluir_texto)
+        else:
+            texto_total, dados_extraidos, medicao = processar_pdf_medido(
+                pdf, incluir_texto
+            )
+    guardar_no_cache(chave, texto_total, dados_extraidos)
+    return texto_total, dados_extraidos, False, medicao
+
+
+def guardar_no_cache(chave, texto_total, dados_extraidos):
+    if dados_extraidos is not None:
+        cache_parse.guardar(chave, {"full_text": texto_total, "dados": dados_extraidos})
+
+
+ERRO_SEM_TEXTO = {
+    "error": "Nenhuma informação textual pôde ser extraída do PDF via PyMuPDF. O PDF pode ser uma imagem de baixa qualidade, estar vazio ou corrompido. Se for um PDF escaneado, use a variante OCR (pdf_parser_ocr.py) que executa Tesseract sobre as páginas.",
+    "hint": "ocr_fallback_available",
+    "ocr_endpoint": "pdf_parser_ocr.py",
+}
+
+
+# Perfis de resposta do /upload-pdf (?profile=): "full" é o formato original;
+# "lean" omite full_text (o cliente Svelte não o exibe); "debug" é o full com
+# diagnósticos do parse.
+PERFIS_RESPOSTA = ("full", "lean", "debug")
+
+
+def montar_resposta(filename, matricula, texto_total, dados_extraidos, perfil="full"):
+    """Payload de sucesso do /upload-pdf (mantendo a estrutura original)."""
+    resposta = {
+        "message": "PDF processado com sucesso!",
+        "filename": filename,
+        "matricula": matricula,
+        "curso_extraido": dados_extraidos["curso"],
+        "matriz_curricular": dados_extraidos["matriz_curricular"],
+        "media_ponderada": dados_extraidos["media_ponderada"],
+        "frequencia_geral": None,  # Mantido para compatibilidade
+        "full_text": texto_total,
+        "extracted_data": dados_extraidos["disciplinas"],
+        "equivalencias_pdf": dados_extraidos["equivalencias"],
+        "semestre_atual": dados_extraidos["semestre_atual"],
+        "numero_semestre": dados_extraidos["numero_semestre"],
+        "suspensoes": dados_extraidos["suspensoes"],
+    }
+    if perfil == "lean":
+        del resposta["full_text"]
+    return resposta
 
-            # Coletar todos os spans da linha ordenados por posição X
-            spans = []
-            for span in line["spans"]:
-                if "text" in span and span["text"].strip():
-                    spans.append(
-                        {
-                            "text": span["text"],
-                            "x": span["bbox"][0],  # posição X
-                            "y": span["bbox"][1],  # posição Y
-                            "font": span.get("font", ""),
-                            "size": span.get("size", 0),
-                        }
-                    )
 
-            # Ordenar spans por posição X (da esquerda para direita)
-            spans.sort(key=lambda s: s["x"])
+def diagnostico_parse(tamanho_bytes, texto_total, dados_extraidos, hit, tempo_ms):
+    """Bloco ``debug`` do perfil debug."""
+    tipos = {}
+    for item in dados_extraidos["disciplinas"]:
+        tipo = item.get("tipo_dado", "IRA")
+        tipos[tipo] = tipos.get(tipo, 0) + 1
+    return {
+        "versao_parser": VERSAO_PARSER,
+        "cache": "HIT" if hit else "MISS",
+        "tempo_parse_ms": round(tempo_ms, 1),
+        "tamanho_pdf_bytes": tamanho_bytes,
+        "caracteres_full_text": len(texto_total),
+        "linhas_full_text": texto_total.count("\n"),
+        "itens_por_tipo": tipos,
+    }
 
-            # Combinar spans em uma linha, adicionando espaços quando necessário
-            line_text = ""
-            last_x = 0
 
-            for span in spans:
-                text = span["text"]
-                x = span["x"]
+def quer_trace():
+    """Trace pedido por ``?trace=1`` ou pelo header ``X-Parse-Trace: 1``."""
+    valor = request.args.get("trace") or request.headers.get("X-Parse-Trace", "")
+    return valor.lower() in ("1", "true", "on")
 
-                # Adicionar espaçamento baseado na distância entre spans
-                if line_text and x > last_x + 10:  # 10 pontos de distância mínima
-                    # Calcular número aproximado de espaços baseado na distância
-                    spaces_needed = max(
-                        1, int((x - last_x) / 6)
-                    )  # ~6 pontos por espaço
-                    line_text += " " * min(spaces_needed, 10)  # máximo 10 espaços
 
-                line_text += text
-                last_x = x + len(text) * 6  # estimativa da largura do texto
+def erro_de_parse(e):
+    """
+    Converte uma exceção do parse em ``(payload, status)``.
 
-            if line_text.strip():
-                lines.append((line["bbox"][1], line_text.strip()))  # (Y position, text)
+    D13 (Crítico): handler único que SEMPRE retorna response — antes, o segundo
+    `except Exception` era código morto e o primeiro só retornava no `if`,
+    fazendo a view devolver None e o Werkzeug servir a página de debug com
+    stack trace + paths absolutos. Agora separa erros conhecidos do PyMuPDF
+    (400 — PDF inválido) dos demais (500 — mensagem genérica, stack só no log).
+    """
+    import traceback
 
-    # Ordenar linhas por posição Y (de cima para baixo)
-    lines.sort(key=lambda l: l[0])
+    if isinstance(e, PoolTimeoutError):
+        logger.error(f"PDF parse timed out in process pool: {e}")
+        return (
+            {
+                "error": "O processamento do PDF excedeu o tempo limite. Tente novamente em instantes.",
+                "timeout_s": POOL_TIMEOUT,
+            },
+            504,
+        )
 
-    # Combinar todas as linhas
-    return "\n".join([line[1] for line in lines])
+    if isinstance(e, OrcamentoExcedido):
+        logger.warning(f"PDF parse aborted: {e}")
+        return (
+            {
+                "error": "O PDF exigiu processamento demais e foi recusado. "
+                "Verifique se é o histórico emitido pelo SIGAA.",
+                "limite_cpu_s": e.limite_s,
+                "etapa": e.onde,
+            },
+            422,
+        )
 
+    # PyMuPDF >= 1.24 expõe as exceções no módulo ``pymupdf`` em vez de ``fitz``
+    tipo = str(type(e))
+    is_pdf_error = "fitz" in tipo or "pymupdf" in tipo or "mupdf" in str(e).lower()
+    if is_pdf_error:
+        logger.error(f"PDF read error: {e}")
+        return (
+            {
+                "error": "Erro ao ler o PDF. Certifique-se de que o arquivo é um PDF válido e não está corrompido.",
+                "detail": str(e),
+            },
+            400,
+        )
 
-def normalizar(s):
+    logger.error(f"Unexpected error processing PDF: {e}")
+    # format_exception (e não format_exc) porque no lote a exceção chega pelo
+    # error_callback do pool, fora de um bloco except
+    logger.error("".join(traceback.format_exception(type(e), e, e.__traceback__)))
     return (
-        unicodedata.normalize("NFKD", s)
-        .encode("ASCII", "ignore")
-        .decode("ASCII")
-        .upper()
+        {
+            "error": "Ocorreu um erro interno ao processar o PDF. A equipe foi notificada.",
+        },
+        500,
     )
 
 
-def extrair_curso(texto):
-    """
-    Extrai o nome do curso usando regex otimizado para formato PyMuPDF
-    """
-    # Tenta o padrão específico do novo formato estruturado
-    match_curso_novo = padrao_curso_novo.search(texto)
-    if match_curso_novo:
-        curso = match_curso_novo.group(1).strip()
-        print(f"[CURSO] Curso extraído (padrão novo): {curso}")
-        return curso
-
-    # Tenta o padrão alternativo (novo formato)
-    match_curso_alt = padrao_curso_alt.search(texto)
-    if match_curso_alt:
-        curso = match_curso_alt.group(1).strip()
-        print(f"[CURSO] Curso extraído (padrão alternativo): {curso}")
-        return curso
-
-    # Tenta o padrão original com regex
-    match_curso = padrao_curso.search(texto)
-    if match_curso:
-        curso = match_curso.group(1).strip()
-        # Limpa sufixos desnecessários como "/FCTE - BACHARELADO - DIURNO"
-        curso = re.split(r"/|-", curso)[0].strip()
-        print(f"[CURSO] Curso extraído (padrão original): {curso}")
-        return curso
-
-    # Fallback: busca linha por linha como antes (caso regex não funcione)
-    linhas = texto.splitlines()
-    for linha in linhas:
-        norm = normalizar(linha)
-        if re.match(r"^CURSO\s*[:\-]", norm):
-            curso = re.split(r"[:\-]", linha, maxsplit=1)[1].strip()
-            curso = re.split(r"/|-", curso)[0].strip()
-            print(f"[CURSO] Curso extraído (fallback): {curso}")
-            return curso
-
-        # Procura por linhas que parecem ser nomes de curso com o novo padrão
-        if re.match(
-            r"^[A-ZÀ-ÿ\s\-]+(?:DE\s+[A-ZÀ-ÿ\s\-]+)*/[A-Z]+ - [A-ZÀ-ÿ\s\-]+ - [A-ZÀ-ÿ]+",
-            linha,
-        ):
-            curso = linha.split("/")[0].strip()
-            print(f"[CURSO] Curso extraído (busca direta): {curso}")
-            return curso
-
-    print("[AVISO] Curso não encontrado no PDF")
-    return None
-
-
-def limpar_nome_disciplina(nome):
-    """
-    Remove períodos e outros elementos desnecessários do nome da disciplina
-    """
-    if not nome:
-        return nome
-
-    nome_original = nome
+MIMETYPE_NDJSON = "application/x-ndjson"
 
-    # Remove padrões de período como "2023.1", "2024.2", etc.
-    nome_limpo = re.sub(r"^\d{4}\.\d\s*", "", nome)
 
-    # Remove outros padrões comuns que podem aparecer no início
-    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
-    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
+def _linha_ndjson(obj):
+    return json.dumps(obj, ensure_ascii=False) + "\n"
 
-    # Remove apenas caracteres especiais do início e fim, preservando letras, números e espaços
-    nome_limpo = re.sub(r"^[^\w\s]+|[^\w\s]+$", "", nome_limpo)
 
-    # Remove espaços extras
-    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
+def quer_streaming():
+    """O cliente pediu o modo streaming (``Accept: application/x-ndjson``)?"""
+    melhor = request.accept_mimetypes.best_match(["application/json", MIMETYPE_NDJSON])
+    return melhor == MIMETYPE_NDJSON
 
-    # Debug: mostrar quando o nome foi alterado
-    if nome_original != nome_limpo:
-        print(f"[LIMPEZA] Limpeza: '{nome_original}' -> '{nome_limpo}'")
 
-    return nome_limpo
+def evento_cabecalho(filename, matricula, cabecalho):
+    return {
+        "tipo": "cabecalho",
+        "filename": filename,
+        "matricula": matricula,
+        "curso_extraido": cabecalho["curso"],
+        "matriz_curricular": cabecalho["matriz_curricular"],
+        "ira": cabecalho["ira"],
+        "media_ponderada": cabecalho["media_ponderada"],
+        "suspensoes": cabecalho["suspensoes"],
+    }
 
 
-# Função para extrair suspensões
-def extrair_suspensoes(texto):
-    """
-    Extrai as suspensões do histórico escolar
-    Retorna uma lista com os períodos de suspensão
-    """
-    # Primeiro, tenta o padrão específico de suspensões
-    match_suspensoes = padrao_suspensoes.search(texto)
-    if match_suspensoes:
-        suspensoes_str = match_suspensoes.group(1)
-        if suspensoes_str and suspensoes_str.strip():
-            # Divide as suspensões por vírgula e limpa espaços
-            suspensoes = [s.strip() for s in suspensoes_str.split(",") if s.strip()]
-            print(f"[SUSPENSÕES] Suspensões extraídas: {suspensoes}")
-            return suspensoes
-
-    # Fallback: busca linha por linha
-    linhas = texto.splitlines()
-    for i, linha in enumerate(linhas):
-        norm = normalizar(linha)
-        if "SUSPENSOES" in norm or "SUSPENSÃO" in norm:
-            # Tenta extrair da mesma linha
-            suspensoes_na_linha = re.findall(r"\d{4}\.\d", linha)
-            if suspensoes_na_linha:
-                print(
-                    f"[SUSPENSÕES] Suspensões extraídas (mesma linha): {suspensoes_na_linha}"
-                )
-                return suspensoes_na_linha
-
-            # Se não encontrar, tenta na próxima linha
-            if i + 1 < len(linhas):
-                prox = linhas[i + 1]
-                suspensoes_prox = re.findall(r"\d{4}\.\d", prox)
-                if suspensoes_prox:
-                    print(
-                        f"[SUSPENSÕES] Suspensões extraídas (linha seguinte): {suspensoes_prox}"
-                    )
-                    return suspensoes_prox
-
-    print("[AVISO] Suspensões não encontradas no PDF")
-    return []
-
-
-# Função para extrair matriz curricular
-def extrair_matriz_curricular(texto):
-    # Primeiro, tenta o padrão específico do novo formato estruturado
-    match_curriculo_novo = padrao_curriculo_novo.search(texto)
-    if match_curriculo_novo:
-        matriz = match_curriculo_novo.group(2)  # Pega a parte ano.período
-        print(f"[MATRIZ] Matriz Curricular extraída (padrão novo): {matriz}")
-        return matriz
-
-    linhas = texto.splitlines()
-
-    # Segundo, tenta encontrar o padrão específico "número/número - ano.período"
-    # que é o formato padrão da matriz curricular da UnB
-    padrao_matriz_especifico = re.compile(r"(\d+/\d+\s*-\s*(\d{4}\.\d))", re.MULTILINE)
-    match_especifico = padrao_matriz_especifico.search(texto)
-    if match_especifico:
-        matriz = match_especifico.group(2)  # Pega apenas a parte ano.período
-        print(f"[MATRIZ] Matriz Curricular extraída (padrão específico): {matriz}")
-        return matriz
-
-    # Debug: mostrar todas as linhas que contêm 'CURRICULO' ou 'INTEGRALIZAÇÃO'
-    for i, linha in enumerate(linhas):
-        norm = normalizar(linha)
-        if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
-            print(f"[DEBUG MATRIZ] Linha {i}: {repr(linha)}")
-            if i + 1 < len(linhas):
-                print(f"[DEBUG MATRIZ] Próxima linha {i+1}: {repr(linhas[i+1])}")
-
-    # Procura por linhas relacionadas à integralização ou currículo
-    for i, linha in enumerate(linhas):
-        norm = normalizar(linha)
-        # Procura por 'CURRICULO' ou 'INTEGRALIZAÇÃO' na linha
-        if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
-            # Tenta extrair o padrão na mesma linha
-            match = re.search(r"(\d{4}[\./]\d)", linha)
-            if match:
-                matriz = match.group(1).replace("/", ".")
-                print(f"[MATRIZ] Matriz Curricular extraída: {matriz}")
-                return matriz
-            # Se não encontrar, tenta na próxima linha
-            if i + 1 < len(linhas):
-                prox = linhas[i + 1]
-                match_prox = re.search(r"(\d{4}[\./]\d)", prox)
-                if match_prox:
-                    matriz = match_prox.group(1).replace("/", ".")
-                    print(
-                        f"[MATRIZ] Matriz Curricular extraída (linha seguinte): {matriz}"
-                    )
-                    return matriz
+def evento_fim(dados_extraidos):
+    itens = dados_extraidos["disciplinas"]
+    pendencias = [i["valores"] for i in itens if i.get("tipo_dado") == "Pendencias"]
+    return {
+        "tipo": "fim",
+        "disciplinas_pendentes": [
+            i for i in itens if i.get("tipo_dado") == "Disciplina Pendente"
+        ],
+        "pendencias": pendencias[0] if pendencias else {},
+        "equivalencias_pdf": dados_extraidos["equivalencias"],
+        "semestre_atual": dados_extraidos["semestre_atual"],
+        "numero_semestre": dados_extraidos["numero_semestre"],
+    }
 
-    # Fallback: procura por linhas que contenham o padrão "número/número - ano.período"
-    # mesmo sem contexto específico
-    for linha in linhas:
-        match_fallback = re.search(r"\d+/\d+\s*-\s*(\d{4}\.\d)", linha)
-        if match_fallback:
-            matriz = match_fallback.group(1)
-            print(f"[MATRIZ] Matriz Curricular extraída (fallback): {matriz}")
-            return matriz
 
-    print("[AVISO] Matriz Curricular não encontrada no PDF")
-    return None
+def eventos_do_cache(filename, matricula, dados_extraidos):
+    """Replay de um resultado em cache na mesma sequência do modo streaming."""
+    yield evento_cabecalho(filename, matricula, dados_extraidos)
+    yield {
+        "tipo": "disciplinas",
+        "pagina": None,
+        "disciplinas": [
+            i
+            for i in dados_extraidos["disciplinas"]
+            if i.get("tipo_dado") == "Disciplina Regular"
+        ],
+    }
+    yield evento_fim(dados_extraidos)
 
 
-def extrair_semestre_atual(disciplinas):
+def eventos_do_pdf(doc, filename, matricula, chave, tamanho_bytes=0):
     """
-    Extrai o semestre atual baseado nas disciplinas com status MATR ou Matriculado
+    Parse página a página: o cabeçalho sai assim que a primeira página com
+    texto é extraída, as disciplinas à medida que são reconhecidas e o resto
+    (que depende do texto inteiro) no evento ``fim``.
     """
-    semestres_matriculados = []
-
-    # Procura por disciplinas com status de matrícula
-    for disc in disciplinas:
-        if isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Regular":
-            status = disc.get("status", "").upper()
-            ano_periodo = disc.get("ano_periodo", "")
-            if status in ["MATR"] and ano_periodo:
-                try:
-                    # Converte para float para comparação (ex: 2024.1 -> 2024.1)
-                    semestre_float = float(ano_periodo)
-                    semestres_matriculados.append(semestre_float)
-                except ValueError:
-                    continue
-        elif isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Pendente":
-            status = disc.get("status", "").upper()
-            observacao = disc.get("observacao", "").upper()
-            if status == "MATR" or "MATRICULADO" in observacao:
-                # Para disciplinas pendentes, usa o semestre atual
-                hoje = datetime.now()
-                semestre = 1 if hoje.month <= 6 else 2
-                semestre_atual = f"{hoje.year}.{semestre}"
-                try:
-                    semestres_matriculados.append(float(semestre_atual))
-                except ValueError:
-                    continue
-
-    # Retorna o semestre mais recente se houver algum
-    if semestres_matriculados:
-        semestre_atual = max(semestres_matriculados)
-        return f"{semestre_atual:.1f}"  # Formata como string (ex: 2024.1)
-
-    # Se não encontrar nenhum, retorna None
-    return None
-
-
-def calcular_numero_semestre(disciplinas):
+    extracao = ExtracaoIncremental()
+    # A medição e o orçamento de CPU só ficam ligados nos trechos de parse,
+    # nunca através de um yield
+    medicao = MedicaoParse()
+    orcamento = OrcamentoCPU()
+    cabecalho = None
+    pagina = 0
+    for pagina, page in enumerate(doc, start=1):
+        with medir_parse(medicao), limitar_cpu(orcamento):
+            with etapa("get_text"):
+                text_dict = dict_da_pagina(page)
+            with etapa("extract_structured_text"):
+                texto_pagina = extract_structured_text(text_dict)
+            verificar_orcamento(f"página {pagina}")
+            novas = extracao.adicionar_pagina(texto_pagina)
+        if cabecalho is None and texto_pagina.strip():
+            cabecalho = evento_cabecalho(
+                filename, matricula, extrair_cabecalho(texto_pagina)
+            )
+            yield cabecalho
+        if novas:
+            yield {"tipo": "disciplinas", "pagina": pagina, "disciplinas": novas}
+
+    with medir_parse(medicao), limitar_cpu(orcamento):
+        texto_total, novas, dados_extraidos = extracao.finalizar()
+    medicao.paginas = pagina
+    registrar_parse(
+        medicao, tamanho_bytes, contar_regulares(dados_extraidos), hit=False
+    )
+    if dados_extraidos is None:
+        yield {"tipo": "erro", "status": 422, **ERRO_SEM_TEXTO}
+        return
+    guardar_no_cache(chave, texto_total, dados_extraidos)
+
+    if novas:
+        yield {"tipo": "disciplinas", "pagina": pagina, "disciplinas": novas}
+    # Se o texto completo mudou algum campo do cabeçalho (ex.: matriz quebrada
+    # entre páginas), reenvia o cabeçalho definitivo antes do fim
+    definitivo = evento_cabecalho(filename, matricula, dados_extraidos)
+    if definitivo != cabecalho:
+        yield definitivo
+    yield evento_fim(dados_extraidos)
+
+
+def preparar_streaming(pdf, filename, matricula, chave, tamanho_bytes):
     """
-    Calcula o número do semestre baseado na quantidade de semestres onde houve conclusão de disciplinas
-    Considera semestres onde houve aprovação, dispensa, reprovação ou cumprimento (equivalência) de disciplinas
+    Linhas NDJSON do /upload-pdf em modo streaming, sem depender do framework
+    (Flask aqui, ASGI em asgi_parser.py). O PDF é aberto e a vaga da admissão
+    ocupada antes de a resposta começar, então PDF inválido ainda devolve 400
+    normal e a admissão ainda recusa com 429/503; erros no meio do parse viram
+    uma linha ``{"tipo": "erro", ...}``.
+
+    Retorna ``(linhas, hit, encerrar)``. ``encerrar`` fecha o documento e
+    libera a vaga; o gerador chama no fim, mas quem monta a resposta também
+    deve chamar quando ela for fechada, porque um gerador que nunca começou
+    não roda o próprio ``finally``. Pode ser chamado mais de uma vez.
     """
-    if not disciplinas:
-        return None
+    em_cache = cache_parse.obter(chave)
+    if em_cache is not None:
+        registrar_parse(
+            None, tamanho_bytes, contar_regulares(em_cache["dados"]), hit=True
+        )
+        eventos = eventos_do_cache(filename, matricula, em_cache["dados"])
+        doc = None
+    else:
+        doc = abrir_pdf(pdf)
+        try:
+            admissao.verificar_paginas(doc.page_count)
+            # A vaga fica ocupada até o fim do stream (o parse roda nele)
+            entrada = admissao.entrar()
+        except AdmissaoRecusada:
+            doc.close()
+            raise
+        eventos = eventos_do_pdf(doc, filename, matricula, chave, tamanho_bytes)
+
+    pendente = threading.Lock()
+
+    def encerrar():
+        if doc is not None and pendente.acquire(blocking=False):
+            doc.close()
+            admissao.sair(entrada)
+
+    def gerar():
+        try:
+            for evento in eventos:
+                yield _linha_ndjson(evento)
+        except Exception as e:
+            payload, status = erro_de_parse(e)
+            yield _linha_ndjson({"tipo": "erro", "status": status, **payload})
+        finally:
+            encerrar()
+
+    return gerar(), em_cache is not None, encerrar
 
-    # Conjunto para armazenar semestres únicos onde o aluno concluiu disciplinas
-    semestres_cursados = set()
-
-    for disc in disciplinas:
-        if isinstance(disc, dict):
-            status = disc.get("status", "").upper()
-            ano_periodo = disc.get("ano_periodo", "")
-
-            # Considera apenas disciplinas efetivamente concluídas
-            # APR = Aprovado
-            # DISP = Dispensa (integralizada sem cursar)
-            # REP/REPF/REPMF = Reprovado (por nota, falta ou média/falta)
-            # CUMP = Cumpriu por equivalência
-            if (
-                status in ["APR", "DISP", "REP", "REPF", "REPMF", "CUMP"]
-                and ano_periodo
-                and ano_periodo.strip()
-            ):
-                try:
-                    semestres_cursados.add(ano_periodo)
-                except Exception:
-                    continue
-
-    # Debug: mostrar os semestres encontrados
-    semestres_ordenados = sorted(list(semestres_cursados))
-    print(f"[DEBUG] Semestres com disciplinas concluídas: {semestres_ordenados}")
-
-    # Retorna o número de semestres únicos + 1 (para o semestre atual)
-    if semestres_cursados:
-        return len(semestres_cursados) + 1
-
-    return 1  # Se não encontrou nenhum semestre cursado, assume primeiro semestre
-
-
-def processar_disciplina_encontrada(
-    nome,
-    ano_periodo,
-    turma,
-    situacao,
-    codigo,
-    carga_h,
-    freq,
-    mencao,
-    linhas,
-    start_idx,
-    disciplinas_list,
-):
+
+def resposta_streaming(pdf, filename, matricula, chave, tamanho_bytes):
     """
-    Processa uma disciplina encontrada e adiciona aos dados
-    Retorna True se processada com sucesso, False se ignorada
+    Resposta NDJSON do /upload-pdf (ver ``preparar_streaming``). Roda sempre
+    na thread da requisição (o pool devolve o resultado só no fim, sem
+    páginas parciais).
     """
+    linhas, hit, encerrar = preparar_streaming(
+        pdf, filename, matricula, chave, tamanho_bytes
+    )
+    response = Response(linhas, mimetype=MIMETYPE_NDJSON)
+    response.call_on_close(encerrar)
+    response.headers["X-Parse-Cache"] = "HIT" if hit else "MISS"
+    g.cache_hit = hit
+    return response
 
-    # Menções II, MI e SR são reprovação (escala de letra, não numérica) --
-    # a disciplina entra no histórico normalmente, com status forçado pra
-    # REP, independente do que a coluna "situação" do PDF trouxer.
-    if mencao.upper() in ["II", "MI", "SR"]:
-        print(
-            f"  -> Menção {mencao} (reprovado): {codigo} - {nome.strip()[:30]}... "
-            f"(situação original: {situacao} -> forçando REP)"
-        )
-        situacao = "REP"
-
-    # Procurar símbolos e professor nas próximas linhas
-    simbolos = ""
-    professor = ""
-    carga_h_prof = ""
 
-    for j in range(start_idx, min(len(linhas), start_idx + 4)):
-        linha_extra = linhas[j].strip()
+def payload_recusa(e):
+    """Corpo da resposta a uma ``AdmissaoRecusada``."""
+    payload = {"error": e.mensagem, "motivo": e.motivo}
+    if e.retry_after is not None:
+        payload["retry_after_s"] = e.retry_after
+    return payload
 
-        # Procurar por símbolos
-        match_simb = padrao_simbolos.search(linha_extra)
-        if match_simb:
-            simbolos = match_simb.group(1)
-            continue
 
-        # Procurar por professor
-        match_prof = padrao_professor.search(linha_extra)
-        if match_prof:
-            professor = match_prof.group(1)
-            carga_h_prof = match_prof.group(2)
-            break
-
-    # Usar a carga horária do professor se disponível, senão usar a da disciplina
-    carga_final = carga_h_prof if carga_h_prof else carga_h
-
-    disciplina_data = {
-        "tipo_dado": "Disciplina Regular",
-        "nome": limpar_nome_disciplina(nome.strip()),
-        "status": situacao,
-        "mencao": mencao if mencao != "-" else "-",
-        "creditos": (
-            int(int(carga_final) / 15) if carga_final and carga_final.isdigit() else 0
-        ),
-        "codigo": codigo,
-        "carga_horaria": (
-            int(carga_final) if carga_final and carga_final.isdigit() else 0
-        ),
-        "ano_periodo": ano_periodo,
-        "prefixo": simbolos,
-        "professor": limpar_nome_professor(professor.strip()) if professor else "",
-        "turma": turma,
-        "frequencia": freq if freq != "--" else None,
-        "nota": None,  # No novo formato, usa menção em vez de nota
-    }
-    disciplinas_list.append(disciplina_data)
-    print(f"  -> Disciplina: {codigo} - {nome.strip()[:30]}... (Status: {situacao})")
-    return True
+def resposta_recusada(e):
+    """Resposta de uma ``AdmissaoRecusada`` (429/503 com Retry-After, ou 413)."""
+    response = jsonify(payload_recusa(e))
+    response.status_code = e.status
+    if e.retry_after is not None:
+        response.headers["Retry-After"] = str(e.retry_after)
+    return response
 
 
-def extrair_dados_academicos(texto_total):
+def processar_upload(pdf, tamanho, chave, filename, perfil="full", com_trace=False):
     """
-    Extrai todos os dados acadêmicos do texto usando regex patterns otimizados
-    Funciona com ambos os formatos de histórico escolar
-
-    Nota: Ignora automaticamente disciplinas com menções II, MI e SR:
-    - II: Incomparável por Infrequência
-    - MI: Média Insuficiente
-    - SR: Sem Rendimento
+    Parse de um upload do /upload-pdf no modo JSON, sem depender do framework
+    (Flask aqui, ASGI em asgi_parser.py). ``pdf`` é o caminho do spool (ou os
+    bytes), ``chave`` a chave do cache. Retorna ``(payload, status, hit,
+    medicao)``; ``hit``/``medicao`` são None quando o parse falhou.
+    ``AdmissaoRecusada`` sobe para quem chamou, que responde com
+    ``resposta_recusada``/``payload_recusa``.
     """
-    print("\n=== INICIANDO EXTRAÇÃO COM REGEX OTIMIZADO ===")
-
-    # Debug: mostrar alguns trechos do texto para identificar o formato
-    print("[DEBUG] Primeiras 500 chars do texto:")
-    print(repr(texto_total[:500]))
-    print("[DEBUG] Procurando por padrões de disciplinas...")
-
-    # Extrair informações básicas
-    curso = extrair_curso(texto_total)
-    matriz_curricular = extrair_matriz_curricular(texto_total)
-    suspensoes = extrair_suspensoes(texto_total)
-
-    # Extrair IRA e MP (aceita vírgula ou ponto como separador decimal)
-    ira_match = padrao_ira.search(texto_total)
-    ira = None
-    if ira_match:
-        ira_str = ira_match.group(1).replace(",", ".")
-        ira = float(ira_str)
-    print(f"[IRA] Extraído: {ira}")
-
-    mp_match = padrao_mp.search(texto_total)
-    mp = None
-    if mp_match:
-        mp_str = mp_match.group(1).replace(",", ".")
-        mp = float(mp_str)
-    print(f"[MP] Extraído: {mp}")
-
-    disciplinas = []
-
-    # Adicionar IRA como item se encontrado (valor_texto = como no PDF, sem arredondar na exibição)
-    if ira:
-        ira_item = {"IRA": "IRA", "valor": ira}
-        if ira_match:
-            ira_item["valor_texto"] = ira_match.group(1)
-        disciplinas.append(ira_item)
-
-    # Extrair disciplinas usando processamento linha por linha (mais eficiente)
-    disciplinas_encontradas = 0
-    disciplinas_ignoradas = 0
-
-    print("[DISCIPLINAS] Processando novo formato SIGAA com PyMuPDF...")
-
-    # Capturar dados de disciplinas linha por linha (novo formato estruturado)
-    linhas = texto_total.splitlines()
-    print(f"[DEBUG] Total de linhas a processar: {len(linhas)}")
-
-    i = 0
-    while i < len(linhas):
-        if i % 100 == 0:  # Progress indicator every 100 lines
-            print(f"[DEBUG] Processadas {i}/{len(linhas)} linhas...")
-
-        linha = linhas[i].strip()
-
-        # Primeiro, verificar se a linha atual é ano/período (padrão alternativo)
-        ano_periodo_match = padrao_ano_periodo.search(linha)
-        if ano_periodo_match and i + 7 < len(linhas):
-            ano_periodo = ano_periodo_match.group(1)
-
-            # Verificar se a próxima linha é nome da disciplina
-            nome_match = padrao_nome_disciplina.search(linhas[i + 1].strip())
-            if nome_match:
-                nome = nome_match.group(1)
-                print(
-                    f"[DEBUG] Disciplina encontrada (padrão alternativo) na linha {i}: {repr(linha)} -> {repr(linhas[i+1])}"
-                )
-
-                # Verificar o restante do padrão
-                try:
-                    # Linha i+2: turma
-                    turma_match = padrao_turma.search(linhas[i + 2].strip())
-                    if not turma_match:
-                        i += 1
-                        continue
-                    turma = turma_match.group(1)
-
-                    # Linha i+3: situação
-                    situacao_match = padrao_situacao.search(linhas[i + 3].strip())
-                    if not situacao_match:
-                        i += 1
-                        continue
-                    situacao = situacao_match.group(1)
-
-                    # Linha i+4: código
-                    codigo_match = padrao_codigo_disciplina.search(
-                        linhas[i + 4].strip()
-                    )
-                    if not codigo_match:
-                        i += 1
-                        continue
-                    codigo = codigo_match.group(1)
-
-                    # Linha i+5: carga horária
-                    carga_match = padrao_carga_horaria.search(linhas[i + 5].strip())
-                    if not carga_match:
-                        i += 1
-                        continue
-                    carga_h = carga_match.group(1)
-
-                    # Linha i+6: frequência
-                    freq_match = padrao_frequencia.search(linhas[i + 6].strip())
-                    if not freq_match:
-                        i += 1
-                        continue
-                    freq = freq_match.group(1)
-
-                    # Linha i+7: menção
-                    mencao_match = padrao_mencao.search(linhas[i + 7].strip())
-                    if not mencao_match:
-                        i += 1
-                        continue
-                    mencao = mencao_match.group(1)
-
-                    # Processar disciplina encontrada
-                    if not processar_disciplina_encontrada(
-                        nome,
-                        ano_periodo,
-                        turma,
-                        situacao,
-                        codigo,
-                        carga_h,
-                        freq,
-                        mencao,
-                        linhas,
-                        i + 8,
-                        disciplinas,
-                    ):
-                        disciplinas_ignoradas += 1
-                    else:
-                        disciplinas_encontradas += 1
-
-                    i += 8
-                    continue
-
-                except (IndexError, AttributeError):
-                    pass
-
-        # Segundo, procurar por nome da disciplina (padrão original)
-        match_nome = padrao_nome_disciplina.search(linha)
-        if match_nome and i + 8 < len(linhas):  # Verificar se há linhas suficientes
-            nome = match_nome.group(1)
-
-            # Verificar se as próximas linhas seguem o padrão esperado
-            try:
-                # Linha i+1: ano/período
-                ano_periodo_match = padrao_ano_periodo.search(linhas[i + 1].strip())
-                if not ano_periodo_match:
-                    i += 1
-                    continue
-                ano_periodo = ano_periodo_match.group(1)
-
-                # Linha i+2: turma
-                turma_match = padrao_turma.search(linhas[i + 2].strip())
-                if not turma_match:
-                    i += 1
-                    continue
-                turma = turma_match.group(1)
-
-                # Linha i+3: situação
-                situacao_match = padrao_situacao.search(linhas[i + 3].strip())
-                if not situacao_match:
-                    i += 1
-                    continue
-                situacao = situacao_match.group(1)
-
-                print(
-                    f"[DEBUG] Disciplina encontrada (padrão original) na linha {i}: {nome[:30]}..."
+    matricula = extrair_matricula(filename)
+    try:
+        inicio = time.perf_counter()
+        trace_parse = None
+        if com_trace:
+            # Trace pedido: parse inline e sem consultar o cache, para que a
+            # resposta traga as decisões deste parse
+            admissao.verificar_paginas(paginas_do_pdf(pdf))
+            with admissao.vaga(), capturar_trace() as trace_parse:
+                texto_total, dados_extraidos, medicao = processar_pdf_medido(
+                    pdf, incluir_texto=perfil != "lean"
                 )
+            guardar_no_cache(chave, texto_total, dados_extraidos)
+            hit = False
+        else:
+            texto_total, dados_extraidos, hit, medicao = parse_com_cache(
+                pdf, incluir_texto=perfil != "lean", chave=chave
+            )
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        registrar_parse(medicao, tamanho, contar_regulares(dados_extraidos), hit)
 
-                # Linha i+4: código
-                codigo_match = padrao_codigo_disciplina.search(linhas[i + 4].strip())
-                if not codigo_match:
-                    i += 1
-                    continue
-                codigo = codigo_match.group(1)
-
-                # Linha i+5: carga horária
-                carga_match = padrao_carga_horaria.search(linhas[i + 5].strip())
-                if not carga_match:
-                    i += 1
-                    continue
-                carga_h = carga_match.group(1)
-
-                # Linha i+6: frequência
-                freq_match = padrao_frequencia.search(linhas[i + 6].strip())
-                if not freq_match:
-                    i += 1
-                    continue
-                freq = freq_match.group(1)
-
-                # Linha i+7: menção
-                mencao_match = padrao_mencao.search(linhas[i + 7].strip())
-                if not mencao_match:
-                    i += 1
-                    continue
-                mencao = mencao_match.group(1)
-
-                # Processar disciplina encontrada
-                if not processar_disciplina_encontrada(
-                    nome,
-                    ano_periodo,
-                    turma,
-                    situacao,
-                    codigo,
-                    carga_h,
-                    freq,
-                    mencao,
-                    linhas,
-                    i + 8,
-                    disciplinas,
-                ):
-                    disciplinas_ignoradas += 1
-                else:
-                    disciplinas_encontradas += 1
-
-                # Pular para depois desta disciplina completa
-                i += 8
-                continue
-
-            except (IndexError, AttributeError):
-                # Se houver erro ao processar, continuar para próxima linha
-                pass
+        if dados_extraidos is None:
+            logger.info("No text extracted with PyMuPDF, attempting OCR")
 
-        i += 1
+            logger.error("OCR extraction failed, not available")
+            return ERRO_SEM_TEXTO, 422, hit, medicao
+        else:
+            logger.info("Successfully extracted text using PyMuPDF")
 
-    print(f"[DISCIPLINAS] Encontradas {disciplinas_encontradas} disciplinas regulares")
-    if disciplinas_ignoradas > 0:
-        print(
-            f"[DISCIPLINAS] Ignoradas {disciplinas_ignoradas} disciplinas com menções II, MI ou SR"
+        # Retorna os dados extraídos em formato JSON (mantendo a estrutura original)
+        logger.info("PDF processing completed successfully")
+        response_data = montar_resposta(
+            filename, matricula, texto_total, dados_extraidos, perfil
         )
-
-    # Extrair disciplinas pendentes (formato novo)
-    disciplinas_pendentes = padrao_pendentes_novo.findall(texto_total)
-    print(
-        f"[PENDENTES] Encontradas {len(disciplinas_pendentes)} disciplinas pendentes (formato novo)"
-    )
-
-    for pend in disciplinas_pendentes:
-        nome, carga_h, codigo = pend[:3]
-        status_matricula = pend[3] if len(pend) > 3 else None
-
-        status = "MATR" if status_matricula else "PENDENTE"
-
-        disciplina_data = {
-            "tipo_dado": "Disciplina Pendente",
-            "nome": limpar_nome_disciplina(nome.strip()),
-            "status": status,
-            "mencao": "-",
-            "creditos": int(int(carga_h) / 15) if carga_h.isdigit() else 0,
-            "codigo": codigo,
-            "carga_horaria": int(carga_h) if carga_h.isdigit() else 0,
-            "ano_periodo": "",
-            "prefixo": "",
-            "observacao": status_matricula,
-        }
-        disciplinas.append(disciplina_data)
-        print(f"  -> Pendente: {codigo} - {nome.strip()[:30]}... (Status: {status})")
-
-    # Extrair equivalências
-    equivalencias = []
-    equivalencias_match = padrao_equivalencias.findall(texto_total)
-    print(f"[EQUIVALENCIAS] Encontradas {len(equivalencias_match)} equivalências")
-
-    for eq in equivalencias_match:
-        (
-            codigo_cumpriu,
-            nome_cumpriu,
-            ch_cumpriu,
-            codigo_equivalente,
-            nome_equivalente,
-            ch_equivalente,
-        ) = eq
-        equivalencias.append(
+        if perfil == "debug":
+            response_data["debug"] = diagnostico_parse(
+                tamanho, texto_total, dados_extraidos, hit, tempo_ms
+            )
+        if trace_parse is not None:
+            response_data["trace"] = trace_parse.como_dict()
+        registrar_resumo(
             {
-                "cumpriu": codigo_cumpriu,
-                "nome_cumpriu": nome_cumpriu.strip(),
-                "atraves_de": codigo_equivalente,
-                "nome_equivalente": nome_equivalente.strip(),
-                "ch_cumpriu": ch_cumpriu,
-                "ch_equivalente": ch_equivalente,
+                "filename": filename,
+                "perfil": perfil,
+                "cache": "HIT" if hit else "MISS",
+                "tempo_ms": round(tempo_ms, 1),
+                "tamanho_pdf_bytes": tamanho,
+                "itens": len(dados_extraidos["disciplinas"]),
+                "equivalencias": len(dados_extraidos["equivalencias"]),
             }
         )
-        print(f"  -> Equivalência: {codigo_cumpriu} ← {codigo_equivalente}")
+        logger.info(
+            f'Sending response with {len(dados_extraidos["disciplinas"])} extracted items'
+        )
+        return response_data, 200, hit, medicao
 
-    # Extrair pendências (apenas contar ocorrências)
-    pendencias = padrao_pendencias.findall(texto_total)
-    if pendencias:
-        # Contar ocorrências de cada status
-        from collections import Counter
+    except AdmissaoRecusada:
+        raise
+    except Exception as e:
+        payload, status = erro_de_parse(e)
+        return payload, status, None, None
 
-        contagem_pendencias = Counter(pendencias)
-        disciplinas.append(
-            {"tipo_dado": "Pendencias", "valores": dict(contagem_pendencias)}
-        )
-        print(f"[PENDENCIAS] Encontradas: {dict(contagem_pendencias)}")
 
-    # Extrair o semestre atual
-    semestre_atual = extrair_semestre_atual(disciplinas)
-    print(f"[SEMESTRE] Semestre atual extraído: {semestre_atual}")
+class AnteriorInvalido(Exception):
+    """Resultado anterior do modo diff recusado (``status`` HTTP)."""
 
-    # Calcular o número do semestre baseado em semestres cursados
-    numero_semestre = calcular_numero_semestre(disciplinas)
-    print(f"[SEMESTRE] Número do semestre calculado: {numero_semestre}º semestre")
+    def __init__(self, payload, status):
+        super().__init__(payload["error"])
+        self.payload = payload
+        self.status = status
 
-    print(f"=== EXTRAÇÃO CONCLUÍDA: {len(disciplinas)} itens extraídos ===\n")
 
-    return {
-        "disciplinas": disciplinas,
-        "equivalencias": equivalencias,
-        "curso": curso,
-        "matriz_curricular": matriz_curricular,
-        "media_ponderada": mp,
-        "ira": ira,
-        "semestre_atual": semestre_atual,
-        "numero_semestre": numero_semestre,
-        "suspensoes": suspensoes,
-    }
+def carregar_anterior(anterior_hash=None, anterior=None):
+    """
+    Resultado anterior do modo diff: pelo SHA-256 do PDF anterior (procurado
+    no cache de resultados) ou pelo JSON do resultado (resposta do
+    /upload-pdf). Retorna ``(resultado, origem)``; ``AnteriorInvalido`` com
+    400 (formato) ou 409 (hash fora do cache: o cliente reenvia com o JSON).
+    """
+    if anterior_hash:
+        anterior_hash = anterior_hash.strip().lower()
+        if not re.fullmatch(r"[0-9a-f]{64}", anterior_hash):
+            raise AnteriorInvalido(
+                {"error": "anterior_hash deve ser o SHA-256 (hex) do PDF anterior."},
+                400,
+            )
+        em_cache = cache_parse.obter(chave_do_hash(anterior_hash, VERSAO_PARSER))
+        if em_cache is None:
+            raise AnteriorInvalido(
+                {
+                    "error": "O resultado anterior não está mais no cache. Envie o resultado anterior no campo 'anterior'.",
+                    "motivo": "anterior_fora_do_cache",
+                },
+                409,
+            )
+        return em_cache["dados"], "hash"
+    try:
+        resultado = json.loads(anterior)
+        normalizar_resultado(resultado)
+    except ValueError as e:
+        detalhe = (
+            str(e) if not isinstance(e, json.JSONDecodeError) else "JSON inválido."
+        )
+        raise AnteriorInvalido(
+            {"error": f"Resultado anterior inválido: {detalhe}"}, 400
+        ) from None
+    return resultado, "resultado"
 
 
-def limpar_nome_professor(nome):
+def processar_diff(pdf, tamanho, sha256, filename, anterior, origem):
     """
-    Limpa o nome do professor removendo títulos e formatação
+    Modo diff do /upload-pdf: parse do PDF novo (cache de resultados e de
+    páginas valendo normalmente) e diferença para ``anterior`` (ver
+    diff_historico.py). Mesmo retorno de ``processar_upload``.
     """
-    if not nome:
-        return nome
-
-    # Remove títulos acadêmicos
-    nome_limpo = re.sub(
-        r"^(Dr\.|Dra\.|MSc\.|Prof\.|Professor|Professora)\s*",
-        "",
-        nome,
-        flags=re.IGNORECASE,
-    )
+    try:
+        _texto, dados_extraidos, hit, medicao = parse_com_cache(
+            pdf, incluir_texto=False, chave=chave_do_hash(sha256, VERSAO_PARSER)
+        )
+        registrar_parse(medicao, tamanho, contar_regulares(dados_extraidos), hit)
+        if dados_extraidos is None:
+            return ERRO_SEM_TEXTO, 422, hit, medicao
+        diff = diff_historicos(anterior, dados_extraidos)
+        logger.info(
+            f"Diff against previous result ({origem}): "
+            f"+{len(diff['adicionadas'])} ~{len(diff['alteradas'])} "
+            f"-{len(diff['removidas'])}"
+        )
+        payload = {
+            "message": "Diferença calculada com sucesso!",
+            "filename": filename,
+            "matricula": extrair_matricula(filename),
+            "hash_pdf": sha256,
+            "anterior": origem,
+            "diff": diff,
+        }
+        return payload, 200, hit, medicao
+    except AdmissaoRecusada:
+        raise
+    except Exception as e:
+        payload, status = erro_de_parse(e)
+        return payload, status, None, None
 
-    # Remove caracteres especiais no final
-    nome_limpo = re.sub(r"[^A-ZÀ-Ÿa-zà-ÿ\s]+$", "", nome_limpo)
 
-    # Remove espaços extras
-    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
+def erro_de_perfil(perfil):
+    return {
+        "error": f"Perfil de resposta inválido: {perfil}.",
+        "perfis": list(PERFIS_RESPOSTA),
+    }
+
+
+@app.after_request
+def comprimir(response):
+    # gzip/zstd negociado pelo Accept-Encoding (ver compressao_resposta.py)
+    return comprimir_resposta(response, request.accept_encodings)
 
-    return nome_limpo
+
+def campos_do_diff():
+    """
+    ``(anterior_hash, anterior)`` do multipart: o SHA-256 do PDF anterior e/ou
+    o JSON do resultado anterior (campo de texto ou arquivo).
+    """
+    anterior = request.form.get("anterior")
+    if anterior is None and "anterior" in request.files:
+        anterior = request.files["anterior"].read().decode("utf-8", "replace")
+    return request.form.get("anterior_hash"), anterior
 
 
 @app.route("/upload-pdf", methods=["POST"])
@@ -940,6 +886,12 @@ def upload_pdf():
     """
     logger.info("Received PDF upload request")
 
+    # Fila cheia: recusa antes de ler (e gravar) o corpo da requisição
+    try:
+        admissao.verificar_fila()
+    except AdmissaoRecusada as e:
+        return resposta_recusada(e)
+
     if "pdf" not in request.files:
         logger.error("No PDF file in request")
         return jsonify({"error": "Nenhum arquivo PDF enviado."}), 400
@@ -948,123 +900,207 @@ def upload_pdf():
     filename = pdf_file.filename
     logger.info(f"Processing file: {filename}")
     logger.info(f"File content type: {pdf_file.content_type}")
-    logger.info(f"File size: {len(pdf_file.read())} bytes")
-    pdf_file.seek(0)  # Reset file pointer after reading size
-
-    # Tenta extrair a matrícula do nome do arquivo
-    matricula = "desconhecida"
-    if "_" in filename:
-        try:
-            matricula = filename.split("_", 1)[1].split(".")[0]
-            logger.info(f"Extracted matricula: {matricula}")
-        except IndexError:
-            logger.warning("Could not extract matricula from filename")
-
-    texto_total = ""
+    # Tamanho e SHA-256 já saem da gravação do spool, sem reler o arquivo
+    spool = spool_de(pdf_file)
+    logger.info(f"File size: {spool.tamanho} bytes")
+
+    perfil = request.args.get("profile", "full")
+    if perfil not in PERFIS_RESPOSTA:
+        return jsonify(erro_de_perfil(perfil)), 400
+
+    pdf, tamanho = spool.caminho, spool.tamanho
+    sha256 = spool.sha256()
+    chave = chave_do_hash(sha256, VERSAO_PARSER)
+    anterior_hash, anterior = campos_do_diff()
     try:
-        # Tentar extração de texto com PyMuPDF usando posicionamento
-        logger.info("Attempting text extraction with PyMuPDF positional extraction")
-        pdf_bytes = pdf_file.read()
-        pdf_file.seek(0)
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-        logger.info(f"PDF has {doc.page_count} pages")
-
-        # Extrair texto de todas as páginas usando posicionamento
-        for page_num in range(doc.page_count):
-            logger.info(f"Processing page {page_num + 1}")
-            page = doc[page_num]
+        if anterior_hash or anterior:
+            resultado, origem = carregar_anterior(anterior_hash, anterior)
+            payload, status, hit, medicao = processar_diff(
+                pdf, tamanho, sha256, filename, resultado, origem
+            )
+        elif quer_streaming():
+            logger.info("Streaming NDJSON response")
+            return resposta_streaming(
+                pdf, filename, extrair_matricula(filename), chave, tamanho
+            )
+        else:
+            payload, status, hit, medicao = processar_upload(
+                pdf, tamanho, chave, filename, perfil, com_trace=quer_trace()
+            )
+    except AdmissaoRecusada as e:
+        return resposta_recusada(e)
+    except AnteriorInvalido as e:
+        return jsonify(e.payload), e.status
+    except Exception as e:
+        payload, status = erro_de_parse(e)
+        return jsonify(payload), status
 
-            # Extrair texto com informações de posição
-            text_dict = page.get_text("dict")
-            page_text = extract_structured_text(text_dict)
+    g.medicao, g.cache_hit = medicao, hit
+    response = jsonify(payload)
+    response.status_code = status
+    if status == 200:
+        response.headers["X-Parse-Cache"] = "HIT" if hit else "MISS"
+        response.headers["X-Parse-Hash"] = sha256
+    return response
 
-            if page_text:
-                texto_total += page_text + "\n"
-                logger.info(
-                    f"Extracted {len(page_text)} characters from page {page_num + 1}"
-                )
 
-        doc.close()
+# Limites do /upload-pdf-batch (o MAX_CONTENT_LENGTH já limita o corpo inteiro;
+# estes protegem contra ZIPs que descompactam para muito mais que isso).
+LOTE_MAX_ARQUIVOS = 200
+LOTE_MAX_BYTES_POR_PDF = 10 * 1024 * 1024
 
-        if not texto_total.strip():
-            logger.info("No text extracted with PyMuPDF, attempting OCR")
 
-            logger.error("OCR extraction failed, not available")
-            return (
-                jsonify(
-                    {
-                        "error": "Nenhuma informação textual pôde ser extraída do PDF via PyMuPDF. O PDF pode ser uma imagem de baixa qualidade, estar vazio ou corrompido. Se for um PDF escaneado, use a variante OCR (pdf_parser_ocr.py) que executa Tesseract sobre as páginas.",
-                        "hint": "ocr_fallback_available",
-                        "ocr_endpoint": "pdf_parser_ocr.py",
-                    }
-                ),
-                422,
-            )
+def coletar_arquivos_lote(arquivos_enviados):
+    """
+    Normaliza os arquivos do multipart em ``[(nome, pdf_bytes, erro)]``.
+    Aceita PDFs soltos e ZIPs (os PDFs de dentro viram itens do lote). Itens
+    inválidos entram com ``pdf_bytes=None`` e a mensagem em ``erro`` para que
+    só aquele arquivo falhe.
+    """
+    itens = []
+    for arquivo in arquivos_enviados:
+        nome = arquivo.filename or "sem_nome.pdf"
+        if nome.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(arquivo.stream) as zf:
+                    for info in zf.infolist():
+                        interno = info.filename
+                        if info.is_dir() or not interno.lower().endswith(".pdf"):
+                            continue
+                        if "__MACOSX" in interno.split("/"):
+                            continue
+                        if info.file_size > LOTE_MAX_BYTES_POR_PDF:
+                            itens.append((interno, None, "PDF excede 10MB no ZIP."))
+                            continue
+                        itens.append((interno, zf.read(info), None))
+            except zipfile.BadZipFile:
+                itens.append((nome, None, "ZIP inválido ou corrompido."))
         else:
-            logger.info("Successfully extracted text using PyMuPDF")
+            itens.append((nome, arquivo.read(), None))
+    return itens
 
-        print("\n--- Texto Completo Extraído (Primeiras 500 chars) ---")
-        print(texto_total[:500] + "..." if len(texto_total) > 500 else texto_total)
-        print("----------------------------------------------------\n")
 
-        # Extrair dados acadêmicos usando regex otimizado
-        dados_extraidos = extrair_dados_academicos(texto_total)
+def processar_lote(itens):
+    """
+    Gera uma linha NDJSON por arquivo, na ordem em que cada parse termina.
+    Os PDFs são distribuídos entre os workers do pool de lote; resultados em
+    cache e arquivos inválidos saem imediatamente. Cada linha carrega
+    ``index``/``filename``/``status`` e, em caso de sucesso, o mesmo payload
+    do /upload-pdf.
+    """
+    fila = queue.Queue()
+    chaves = {}
+    pool = None
 
-        # Retorna os dados extraídos em formato JSON (mantendo a estrutura original)
-        logger.info("PDF processing completed successfully")
-        response_data = {
-            "message": "PDF processado com sucesso!",
-            "filename": filename,
-            "matricula": matricula,
-            "curso_extraido": dados_extraidos["curso"],
-            "matriz_curricular": dados_extraidos["matriz_curricular"],
-            "media_ponderada": dados_extraidos["media_ponderada"],
-            "frequencia_geral": None,  # Mantido para compatibilidade
-            "full_text": texto_total,
-            "extracted_data": dados_extraidos["disciplinas"],
-            "equivalencias_pdf": dados_extraidos["equivalencias"],
-            "semestre_atual": dados_extraidos["semestre_atual"],
-            "numero_semestre": dados_extraidos["numero_semestre"],
-            "suspensoes": dados_extraidos["suspensoes"],
-        }
-        logger.info(
-            f'Sending response with {len(dados_extraidos["disciplinas"])} extracted items'
+    for indice, (nome, pdf_bytes, erro) in enumerate(itens):
+        if erro is not None:
+            fila.put((indice, None, ({"error": erro}, 400)))
+            continue
+        chave = chave_cache(pdf_bytes, VERSAO_PARSER)
+        em_cache = cache_parse.obter(chave)
+        if em_cache is not None and em_cache["full_text"] is not None:
+            fila.put((indice, (em_cache["full_text"], em_cache["dados"], None), None))
+            continue
+        chaves[indice] = chave
+        if pool is None:
+            pool = obter_pool_lote(processar_pdf_medido)
+        pool.submeter(
+            pdf_bytes,
+            callback=lambda resultado, i=indice: fila.put((i, resultado, None)),
+            error_callback=lambda e, i=indice: fila.put((i, None, erro_de_parse(e))),
         )
-        return jsonify(response_data)
 
-    except Exception as e:
-        # D13 (Crítico): handler único que SEMPRE retorna response — antes, o segundo
-        # `except Exception` era código morto e o primeiro só retornava no `if`,
-        # fazendo a view devolver None e o Werkzeug servir a página de debug com
-        # stack trace + paths absolutos. Agora separa erros conhecidos do PyMuPDF
-        # (400 — PDF inválido) dos demais (500 — mensagem genérica, stack só no log).
-        import traceback
-
-        is_pdf_error = "fitz" in str(type(e)) or "mupdf" in str(e).lower()
-        if is_pdf_error:
-            logger.error(f"PDF read error: {e}")
-            return (
-                jsonify(
-                    {
-                        "error": "Erro ao ler o PDF. Certifique-se de que o arquivo é um PDF válido e não está corrompido.",
-                        "detail": str(e),
-                    }
-                ),
-                400,
+    emitidos = set()
+    for _ in range(len(itens)):
+        try:
+            indice, resultado, falha = fila.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            # Nenhum job terminou dentro do timeout: encerra os restantes
+            payload, status = erro_de_parse(PoolTimeoutError("lote"))
+            for indice in range(len(itens)):
+                if indice not in emitidos:
+                    yield _linha_ndjson(
+                        {
+                            "index": indice,
+                            "filename": itens[indice][0],
+                            "status": status,
+                            **payload,
+                        }
+                    )
+            return
+
+        emitidos.add(indice)
+        nome = itens[indice][0]
+        if falha is None:
+            texto_total, dados_extraidos, medicao = resultado
+            registrar_parse(
+                medicao,
+                len(itens[indice][1]),
+                contar_regulares(dados_extraidos),
+                hit=indice not in chaves,
             )
+            if dados_extraidos is None:
+                falha = (ERRO_SEM_TEXTO, 422)
+            else:
+                if indice in chaves:
+                    guardar_no_cache(chaves[indice], texto_total, dados_extraidos)
+                payload = montar_resposta(
+                    nome, extrair_matricula(nome), texto_total, dados_extraidos
+                )
+                yield _linha_ndjson(
+                    {"index": indice, "filename": nome, "status": 200, **payload}
+                )
+                continue
+
+        payload, status = falha
+        yield _linha_ndjson(
+            {"index": indice, "filename": nome, "status": status, **payload}
+        )
+
 
-        logger.error(f"Unexpected error processing PDF: {e}")
-        logger.error(traceback.format_exc())
+@app.route("/upload-pdf-batch", methods=["POST"])
+def upload_pdf_batch():
+    """
+    Processa vários históricos de uma vez (PDFs no campo ``pdfs`` e/ou ZIPs).
+    Responde em NDJSON, uma linha por arquivo assim que ele fica pronto; um
+    arquivo com erro não derruba o lote.
+    """
+    arquivos = request.files.getlist("pdfs") + request.files.getlist("pdf")
+    if not arquivos:
+        logger.error("No files in batch request")
+        return jsonify({"error": "Nenhum arquivo PDF ou ZIP enviado."}), 400
+
+    itens = coletar_arquivos_lote(arquivos)
+    if not itens:
+        return jsonify({"error": "Nenhum PDF encontrado nos arquivos enviados."}), 400
+    if len(itens) > LOTE_MAX_ARQUIVOS:
         return (
             jsonify(
                 {
-                    "error": "Ocorreu um erro interno ao processar o PDF. A equipe foi notificada.",
+                    "error": f"Lote excede o limite de {LOTE_MAX_ARQUIVOS} arquivos.",
+                    "limit": LOTE_MAX_ARQUIVOS,
                 }
             ),
-            500,
+            413,
         )
 
+    logger.info(f"Processing batch with {len(itens)} files")
+    return Response(processar_lote(itens), mimetype="application/x-ndjson")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas no formato texto do Prometheus (ver metricas_parser.py)."""
+    if not METRICAS_ATIVAS:
+        return jsonify({"error": "Métricas desligadas."}), 404
+    return Response(exposicao(), mimetype=MIMETYPE_PROMETHEUS)
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Contadores de hit/miss e ocupação do cache de parse."""
+    return jsonify({"versao_parser": VERSAO_PARSER, **cache_parse.estatisticas()})
+
 
 if __name__ == "__main__":
     # D13: nunca rodar com debug=True por default — o reloader/console do Werkzeug
@@ -1073,5 +1109,8 @@ if __name__ == "__main__":
     import os as _os
 
     debug_mode = _os.environ.get("FLASK_DEBUG", "0") == "1"
+    # Pre-fork: o pool (se PDF_PARSER_POOL_WORKERS > 0) nasce antes do servidor
+    # abrir as threads de requisição.
+    iniciar_pool(processar_pdf_medido)
     logger.info(f"Starting PDF parser service on port 3001 (debug={debug_mode})")
     app.run(debug=debug_mode, port=3001)
@@ -8,8 +8,12 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from PIL import Image
 import pytesseract
-import unicodedata
-from datetime import datetime
+from historico_parser import (
+    extrair_cabecalho,
+    limpar_nome_disciplina,
+    limpar_nome_professor,
+    montar_dados_academicos,
+)
 
 # Configurar encoding UTF-8 para o console
 if sys.platform.startswith("win"):
@@ -76,20 +80,9 @@ except Exception:
     if not tesseract_found:
         logger.error("Tesseract not found! Please install tesseract-ocr")
 
-# Padrões de Expressão Regular (Regex) - Copiados do arquivo original
-# --- Geral ---
-padrao_ira = re.compile(r"IRA[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
-padrao_mp = re.compile(r"MP[:\s]+(\d+[\.,]\d+)", re.IGNORECASE)
-padrao_curriculo = re.compile(r"(\d{4}[\./]\d+(?:\s*-\s*\d{4}\.\d)?)", re.MULTILINE)
-padrao_curso = re.compile(
-    r"Curso[:\s]+([A-ZÀ-Ÿ\s/\\-]+?)(?:\s+Status:|$)", re.IGNORECASE | re.MULTILINE
-)
-
-# --- Padrão alternativo para curso (formato novo) ---
-padrao_curso_alt = re.compile(
-    r"^([A-ZÀ-Ÿ\s\-]+(?:DE\s+[A-ZÀ-Ÿ\s\-]+)*)/[A-Z]+ - [A-ZÀ-Ÿ\s\-]+ - [A-ZÀ-Ÿ]+",
-    re.MULTILINE | re.IGNORECASE,
-)
+# Padrões gerais, cabeçalho, pendentes/equivalências e limpeza de nomes vêm
+# do núcleo compartilhado (historico_parser.py); aqui ficam só os padrões do
+# texto linear que o Tesseract produz (disciplina em duas linhas).
 
 # --- Padrão para formato específico do SIGAA (linha única) ---
 padrao_disciplina_sigaa = re.compile(
@@ -129,253 +122,6 @@ padrao_disciplina_cump = re.compile(
     re.MULTILINE | re.IGNORECASE,
 )
 
-# --- Padrão para equivalências ---
-padrao_equivalencias = re.compile(
-    r"Cumpriu\s+([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)\s*através\s*de\s*([A-Z]{2,}\d{3,})\s*-\s*([A-ZÀ-Ÿ\s0-9]+?)\s*\((\d+)h\)",
-    re.MULTILINE | re.IGNORECASE,
-)
-
-# --- Padrão para disciplinas pendentes (formato novo) ---
-padrao_pendentes_novo = re.compile(
-    r"^\s+([A-ZÀ-Ÿ\s0-9]+(?:DE\s+[A-ZÀ-Ÿ\s0-9]*)*)\s+(\d+)\s*h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?",
-    re.MULTILINE | re.IGNORECASE,
-)
-
-# --- Padrão específico para disciplinas pendentes SIGAA ---
-padrao_pendentes_sigaa = re.compile(
-    r"^\s+([A-ZÀ-Ÿ\sÇÃÕÁÉÍÓÚÂÊÎÔÛ0-9]+?)\s+(\d+)\s+h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?$",
-    re.MULTILINE | re.IGNORECASE,
-)
-
-# --- Padrão para pendências (lista de status) ---
-padrao_pendencias = re.compile(
-    r"\b(APR|CANC|DISP|MATR|REP|REPF|REPMF|TRANC|CUMP)\b", re.IGNORECASE
-)
-
-# --- Padrão para matriz curricular específica do formato SIGAA ---
-padrao_matriz_sigaa = re.compile(
-    r"Ano/Período de Integralização[:\s]*(\d+/\d+)\s*-", re.MULTILINE | re.IGNORECASE
-)
-
-
-def normalizar(s):
-    return (
-        unicodedata.normalize("NFKD", s)
-        .encode("ASCII", "ignore")
-        .decode("ASCII")
-        .upper()
-    )
-
-
-def extrair_curso(texto):
-    """
-    Extrai o nome do curso usando regex otimizado - funciona com ambos os formatos
-    """
-    # Tenta o padrão original com regex
-    match_curso = padrao_curso.search(texto)
-    if match_curso:
-        curso = match_curso.group(1).strip()
-        # Limpa sufixos desnecessários como "/FCTE - BACHARELADO - DIURNO"
-        curso = re.split(r"/|-", curso)[0].strip()
-        print(f"[CURSO] Curso extraído (padrão original): {curso}")
-        return curso
-
-    # Tenta o padrão alternativo (novo formato)
-    match_curso_alt = padrao_curso_alt.search(texto)
-    if match_curso_alt:
-        curso = match_curso_alt.group(1).strip()
-        print(f"[CURSO] Curso extraído (padrão alternativo): {curso}")
-        return curso
-
-    # Fallback: busca linha por linha como antes (caso regex não funcione)
-    linhas = texto.splitlines()
-    for linha in linhas:
-        norm = normalizar(linha)
-        if re.match(r"^CURSO\s*[:\-]", norm):
-            curso = re.split(r"[:\-]", linha, maxsplit=1)[1].strip()
-            curso = re.split(r"/|-", curso)[0].strip()
-            print(f"[CURSO] Curso extraído (fallback): {curso}")
-            return curso
-
-        # Procura por linhas que parecem ser nomes de curso
-        if re.match(
-            r"^[A-ZÀ-Ÿ\s\-]+(?:DE\s+[A-ZÀ-Ÿ\s\-]+)*/[A-Z]+ - [A-ZÀ-Ÿ\s\-]+ - [A-ZÀ-Ÿ]+",
-            linha,
-        ):
-            curso = linha.split("/")[0].strip()
-            print(f"[CURSO] Curso extraído (busca direta): {curso}")
-            return curso
-
-    print("[AVISO] Curso não encontrado no PDF")
-    return None
-
-
-def limpar_nome_disciplina(nome):
-    """
-    Remove períodos e outros elementos desnecessários do nome da disciplina
-    """
-    if not nome:
-        return nome
-
-    nome_original = nome
-
-    # Remove padrões de período como "2023.1", "2024.2", etc.
-    nome_limpo = re.sub(r"^\d{4}\.\d\s*", "", nome)
-
-    # Remove outros padrões comuns que podem aparecer no início
-    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
-    nome_limpo = re.sub(r"^--\s*", "", nome_limpo)
-
-    # Remove apenas caracteres especiais do início e fim, preservando letras, números e espaços
-    nome_limpo = re.sub(r"^[^\w\s]+|[^\w\s]+$", "", nome_limpo)
-
-    # Remove espaços extras
-    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
-
-    # Debug: mostrar quando o nome foi alterado
-    if nome_original != nome_limpo:
-        print(f"[LIMPEZA] Limpeza: '{nome_original}' -> '{nome_limpo}'")
-
-    return nome_limpo
-
-
-# Função para extrair matriz curricular
-def extrair_matriz_curricular(texto):
-    linhas = texto.splitlines()
-
-    # Primeiro, tenta encontrar o padrão específico "número/número - ano.período"
-    # que é o formato padrão da matriz curricular da UnB
-    padrao_matriz_especifico = re.compile(r"(\d+/\d+\s*-\s*(\d{4}\.\d))", re.MULTILINE)
-    match_especifico = padrao_matriz_especifico.search(texto)
-    if match_especifico:
-        matriz = match_especifico.group(2)  # Pega apenas a parte ano.período
-        print(f"[MATRIZ] Matriz Curricular extraída (padrão específico): {matriz}")
-        return matriz
-
-    # Debug: mostrar todas as linhas que contêm 'CURRICULO' ou 'INTEGRALIZAÇÃO'
-    for i, linha in enumerate(linhas):
-        norm = normalizar(linha)
-        if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
-            print(f"[DEBUG MATRIZ] Linha {i}: {repr(linha)}")
-            if i + 1 < len(linhas):
-                print(f"[DEBUG MATRIZ] Próxima linha {i+1}: {repr(linhas[i+1])}")
-
-    # Procura por linhas relacionadas à integralização ou currículo
-    for i, linha in enumerate(linhas):
-        norm = normalizar(linha)
-        # Procura por 'CURRICULO' ou 'INTEGRALIZAÇÃO' na linha
-        if "CURRICULO" in norm or "INTEGRALIZACAO" in norm:
-            # Tenta extrair o padrão na mesma linha
-            match = re.search(r"(\d{4}[\./]\d)", linha)
-            if match:
-                matriz = match.group(1).replace("/", ".")
-                print(f"[MATRIZ] Matriz Curricular extraída: {matriz}")
-                return matriz
-            # Se não encontrar, tenta na próxima linha
-            if i + 1 < len(linhas):
-                prox = linhas[i + 1]
-                match_prox = re.search(r"(\d{4}[\./]\d)", prox)
-                if match_prox:
-                    matriz = match_prox.group(1).replace("/", ".")
-                    print(
-                        f"[MATRIZ] Matriz Curricular extraída (linha seguinte): {matriz}"
-                    )
-                    return matriz
-
-    # Fallback: procura por linhas que contenham o padrão "número/número - ano.período"
-    # mesmo sem contexto específico
-    for linha in linhas:
-        match_fallback = re.search(r"\d+/\d+\s*-\s*(\d{4}\.\d)", linha)
-        if match_fallback:
-            matriz = match_fallback.group(1)
-            print(f"[MATRIZ] Matriz Curricular extraída (fallback): {matriz}")
-            return matriz
-
-    print("[AVISO] Matriz Curricular não encontrada no PDF")
-    return None
-
-
-def extrair_semestre_atual(disciplinas):
-    """
-    Extrai o semestre atual baseado nas disciplinas com status MATR ou Matriculado
-    """
-    semestres_matriculados = []
-
-    # Procura por disciplinas com status de matrícula
-    for disc in disciplinas:
-        if isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Regular":
-            status = disc.get("status", "").upper()
-            ano_periodo = disc.get("ano_periodo", "")
-            if status in ["MATR"] and ano_periodo:
-                try:
-                    # Converte para float para comparação (ex: 2024.1 -> 2024.1)
-                    semestre_float = float(ano_periodo)
-                    semestres_matriculados.append(semestre_float)
-                except ValueError:
-                    continue
-        elif isinstance(disc, dict) and disc.get("tipo_dado") == "Disciplina Pendente":
-            status = disc.get("status", "").upper()
-            observacao = disc.get("observacao", "").upper()
-            if status == "MATR" or "MATRICULADO" in observacao:
-                # Para disciplinas pendentes, usa o semestre atual
-                hoje = datetime.now()
-                semestre = 1 if hoje.month <= 6 else 2
-                semestre_atual = f"{hoje.year}.{semestre}"
-                try:
-                    semestres_matriculados.append(float(semestre_atual))
-                except ValueError:
-                    continue
-
-    # Retorna o semestre mais recente se houver algum
-    if semestres_matriculados:
-        semestre_atual = max(semestres_matriculados)
-        return f"{semestre_atual:.1f}"  # Formata como string (ex: 2024.1)
-
-    # Se não encontrar nenhum, retorna None
-    return None
-
-
-def calcular_numero_semestre(disciplinas):
-    """
-    Calcula o número do semestre baseado na quantidade de semestres onde houve conclusão de disciplinas
-    Considera semestres onde houve aprovação, dispensa, reprovação ou cumprimento (equivalência) de disciplinas
-    """
-    if not disciplinas:
-        return None
-
-    # Conjunto para armazenar semestres únicos onde o aluno concluiu disciplinas
-    semestres_cursados = set()
-
-    for disc in disciplinas:
-        if isinstance(disc, dict):
-            status = disc.get("status", "").upper()
-            ano_periodo = disc.get("ano_periodo", "")
-
-            # Considera apenas disciplinas efetivamente concluídas
-            # APR = Aprovado
-            # DISP = Dispensa (integralizada sem cursar)
-            # REP/REPF/REPMF = Reprovado (por nota, falta ou média/falta)
-            # CUMP = Cumpriu por equivalência
-            if (
-                status in ["APR", "DISP", "REP", "REPF", "REPMF", "CUMP"]
-                and ano_periodo
-                and ano_periodo.strip()
-            ):
-                try:
-                    semestres_cursados.add(ano_periodo)
-                except Exception:
-                    continue
-
-    # Debug: mostrar os semestres encontrados
-    semestres_ordenados = sorted(list(semestres_cursados))
-    print(f"[DEBUG] Semestres com disciplinas concluídas: {semestres_ordenados}")
-
-    # Retorna o número de semestres únicos + 1 (para o semestre atual)
-    if semestres_cursados:
-        return len(semestres_cursados) + 1
-
-    return 1  # Se não encontrou nenhum semestre cursado, assume primeiro semestre
-
 
 def extrair_dados_academicos(texto_total):
     """
@@ -394,34 +140,14 @@ def extrair_dados_academicos(texto_total):
     print(repr(texto_total[:500]))
     print("[DEBUG] Procurando por padrões de disciplinas...")
 
-    # Extrair informações básicas
-    curso = extrair_curso(texto_total)
-    matriz_curricular = extrair_matriz_curricular(texto_total)
-
-    # Extrair IRA e MP (aceita vírgula ou ponto como separador decimal)
-    ira_match = padrao_ira.search(texto_total)
-    ira = None
-    if ira_match:
-        ira_str = ira_match.group(1).replace(",", ".")
-        ira = float(ira_str)
-    print(f"[IRA] Extraído: {ira}")
-
-    mp_match = padrao_mp.search(texto_total)
-    mp = None
-    if mp_match:
-        mp_str = mp_match.group(1).replace(",", ".")
-        mp = float(mp_str)
-    print(f"[MP] Extraído: {mp}")
+    # Extrair informações básicas (curso, matriz, IRA/MP, suspensões)
+    cabecalho = extrair_cabecalho(texto_total)
+    print(f"[IRA] Extraído: {cabecalho['ira']}")
+    print(f"[MP] Extraído: {cabecalho['media_ponderada']}")
 
+    # Regulares e CUMP; o item do IRA entra em montar_dados_academicos
     disciplinas = []
 
-    # Adicionar IRA como item se encontrado (valor_texto = como no PDF)
-    if ira:
-        ira_item = {"IRA": "IRA", "valor": ira}
-        if ira_match:
-            ira_item["valor_texto"] = ira_match.group(1)
-        disciplinas.append(ira_item)
-
     # Extrair disciplinas regulares (processamento de duas linhas)
     linhas = texto_total.splitlines()
     disciplinas_encontradas = 0
@@ -578,115 +304,9 @@ def extrair_dados_academicos(texto_total):
         disciplinas.append(disciplina_data)
         print(f"  -> CUMP: {codigo} - {nome.strip()[:30]}...")
 
-    # Extrair disciplinas pendentes (formato novo)
-    disciplinas_pendentes = padrao_pendentes_novo.findall(texto_total)
-    print(
-        f"[PENDENTES] Encontradas {len(disciplinas_pendentes)} disciplinas pendentes (formato novo)"
-    )
-
-    for pend in disciplinas_pendentes:
-        nome, carga_h, codigo = pend[:3]
-        status_matricula = pend[3] if len(pend) > 3 else None
-
-        status = "MATR" if status_matricula else "PENDENTE"
-
-        disciplina_data = {
-            "tipo_dado": "Disciplina Pendente",
-            "nome": limpar_nome_disciplina(nome.strip()),
-            "status": status,
-            "mencao": "-",
-            "creditos": int(int(carga_h) / 15) if carga_h.isdigit() else 0,
-            "codigo": codigo,
-            "carga_horaria": int(carga_h) if carga_h.isdigit() else 0,
-            "ano_periodo": "",
-            "prefixo": "",
-            "observacao": status_matricula,
-        }
-        disciplinas.append(disciplina_data)
-        print(f"  -> Pendente: {codigo} - {nome.strip()[:30]}... (Status: {status})")
-
-    # Extrair equivalências
-    equivalencias = []
-    equivalencias_match = padrao_equivalencias.findall(texto_total)
-    print(f"[EQUIVALENCIAS] Encontradas {len(equivalencias_match)} equivalências")
-
-    for eq in equivalencias_match:
-        (
-            codigo_cumpriu,
-            nome_cumpriu,
-            ch_cumpriu,
-            codigo_equivalente,
-            nome_equivalente,
-            ch_equivalente,
-        ) = eq
-        equivalencias.append(
-            {
-                "cumpriu": codigo_cumpriu,
-                "nome_cumpriu": nome_cumpriu.strip(),
-                "atraves_de": codigo_equivalente,
-                "nome_equivalente": nome_equivalente.strip(),
-                "ch_cumpriu": ch_cumpriu,
-                "ch_equivalente": ch_equivalente,
-            }
-        )
-        print(f"  -> Equivalência: {codigo_cumpriu} ← {codigo_equivalente}")
-
-    # Extrair pendências (apenas contar ocorrências)
-    pendencias = padrao_pendencias.findall(texto_total)
-    if pendencias:
-        # Contar ocorrências de cada status
-        from collections import Counter
-
-        contagem_pendencias = Counter(pendencias)
-        disciplinas.append(
-            {"tipo_dado": "Pendencias", "valores": dict(contagem_pendencias)}
-        )
-        print(f"[PENDENCIAS] Encontradas: {dict(contagem_pendencias)}")
-
-    # Extrair o semestre atual
-    semestre_atual = extrair_semestre_atual(disciplinas)
-    print(f"[SEMESTRE] Semestre atual extraído: {semestre_atual}")
-
-    # Calcular o número do semestre baseado em semestres cursados
-    numero_semestre = calcular_numero_semestre(disciplinas)
-    print(f"[SEMESTRE] Número do semestre calculado: {numero_semestre}º semestre")
-
-    print(f"=== EXTRAÇÃO CONCLUÍDA: {len(disciplinas)} itens extraídos ===\n")
-
-    return {
-        "disciplinas": disciplinas,
-        "equivalencias": equivalencias,
-        "curso": curso,
-        "matriz_curricular": matriz_curricular,
-        "media_ponderada": mp,
-        "ira": ira,
-        "semestre_atual": semestre_atual,
-        "numero_semestre": numero_semestre,
-    }
-
-
-def limpar_nome_professor(nome):
-    """
-    Limpa o nome do professor removendo títulos e formatação
-    """
-    if not nome:
-        return nome
-
-    # Remove títulos acadêmicos
-    nome_limpo = re.sub(
-        r"^(Dr\.|Dra\.|MSc\.|Prof\.|Professor|Professora)\s*",
-        "",
-        nome,
-        flags=re.IGNORECASE,
-    )
-
-    # Remove caracteres especiais no final
-    nome_limpo = re.sub(r"[^A-ZÀ-Ÿa-zà-ÿ\s]+$", "", nome_limpo)
-
-    # Remove espaços extras
-    nome_limpo = re.sub(r"\s+", " ", nome_limpo).strip()
-
-    return nome_limpo
+    # Pendentes, equivalências, pendências e semestre: mesmo código do
+    # parser PyMuPDF
+    return montar_dados_academicos(texto_total, cabecalho, disciplinas)
 
 
 def pdf_to_text_with_ocr(pdf_bytes):
@@ -0,0 +1,180 @@
+"""
+Pool de processos para o parse de históricos (modo opcional do /upload-pdf).
+
+No modo padrão o Flask executa PyMuPDF + regex dentro da própria thread da
+requisição, então um histórico de 40 páginas segura todos os uploads que
+chegam atrás dele. Com o pool ligado, a rota só recebe o arquivo, despacha o
+job para um worker já forkado e serializa o resultado.
+
+Os workers são criados uma única vez (pre-fork) a partir do processo principal,
+que já importou ``fitz`` e compilou os ``padrao_*``; o initializer ainda abre
+um PDF mínimo em memória para inicializar o contexto do MuPDF antes do
+primeiro job real.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_POOL_WORKERS   nº de workers; 0 desliga o pool (padrão: 0)
+    PDF_PARSER_POOL_TIMEOUT   timeout por job, em segundos (padrão: 30)
+    PDF_PARSER_POOL_MAX_JOBS  jobs por worker antes de reciclá-lo (padrão: 200)
+    PDF_PARSER_BATCH_WORKERS  workers do pool do /upload-pdf-batch quando o
+                              pool global está desligado (padrão: nº de CPUs)
+    PDF_PARSER_PAGE_WORKERS   processos para extrair páginas em paralelo
+                              dentro de um parse; 0 = serial (padrão: 0)
+    PDF_PARSER_PAGE_MIN_PAGES nº mínimo de páginas para usar a extração
+                              paralela (padrão: 8)
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+POOL_WORKERS = int(os.environ.get("PDF_PARSER_POOL_WORKERS", "0"))
+POOL_TIMEOUT = float(os.environ.get("PDF_PARSER_POOL_TIMEOUT", "30"))
+POOL_MAX_JOBS = int(os.environ.get("PDF_PARSER_POOL_MAX_JOBS", "200"))
+BATCH_WORKERS = int(
+    os.environ.get("PDF_PARSER_BATCH_WORKERS", str(os.cpu_count() or 2))
+)
+PAGE_WORKERS = int(os.environ.get("PDF_PARSER_PAGE_WORKERS", "0"))
+PAGE_MIN_PAGES = int(os.environ.get("PDF_PARSER_PAGE_MIN_PAGES", "8"))
+
+
+class PoolTimeoutError(Exception):
+    """O job excedeu ``PDF_PARSER_POOL_TIMEOUT`` dentro do worker."""
+
+
+def _aquecer_worker():
+    """Initializer dos workers: inicializa o MuPDF com um PDF mínimo."""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "NoFluxo")
+    page.get_text("dict")
+    doc.close()
+
+
+def _contexto():
+    # fork mantém fitz e os regex já carregados no processo pai (pre-warm de
+    # graça); em plataformas sem fork (Windows) cai no spawn padrão.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+class PoolParser:
+    """
+    Pool de processos com timeout por job e reciclagem de workers.
+
+    ``funcao`` precisa ser uma função de módulo (picklável); cada chamada de
+    ``executar`` roda ``funcao(*args)`` em um worker e devolve o retorno.
+    """
+
+    def __init__(
+        self,
+        funcao,
+        workers=POOL_WORKERS,
+        timeout=POOL_TIMEOUT,
+        max_jobs=POOL_MAX_JOBS,
+    ):
+        self.funcao = funcao
+        self.workers = workers
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self._pool = _contexto().Pool(
+            processes=workers,
+            initializer=_aquecer_worker,
+            maxtasksperchild=max_jobs or None,
+        )
+        logger.info(
+            f"Pool de parse iniciado: {workers} workers, timeout={timeout}s, "
+            f"reciclagem a cada {max_jobs} jobs"
+        )
+
+    def submeter(self, *args, callback=None, error_callback=None):
+        """
+        Despacha o job sem bloquear; devolve o ``AsyncResult``. Os callbacks
+        rodam na thread de resultados do pool assim que o job termina.
+        """
+        return self._pool.apply_async(
+            self.funcao, args, callback=callback, error_callback=error_callback
+        )
+
+    def executar(self, *args):
+        """
+        Executa ``funcao(*args)`` em um worker e espera o resultado.
+        Exceções levantadas no worker são relançadas aqui; estouro do timeout
+        vira ``PoolTimeoutError`` (o worker termina o job em segundo plano e
+        segue a reciclagem normal).
+        """
+        resultado = self.submeter(*args)
+        try:
+            return resultado.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            raise PoolTimeoutError(
+                f"Parse excedeu o limite de {self.timeout:g}s no pool de processos"
+            )
+
+    def encerrar(self):
+        self._pool.terminate()
+        self._pool.join()
+
+
+_pool_global = None
+_pool_lote = None
+_lock_lote = threading.Lock()
+_pool_paginas = None
+
+
+def iniciar_pool(funcao, workers=POOL_WORKERS):
+    """
+    Cria o pool global (idempotente). Chamado no startup do serviço para que
+    o fork aconteça antes de o servidor abrir threads de requisição.
+    """
+    global _pool_global
+    if _pool_global is None and workers > 0:
+        _pool_global = PoolParser(funcao, workers=workers)
+    return _pool_global
+
+
+def obter_pool():
+    """Pool global, ou ``None`` quando o serviço roda em modo inline."""
+    return _pool_global
+
+
+def obter_pool_lote(funcao):
+    """
+    Pool usado pelo processamento em lote. Reaproveita o pool global quando
+    ele existe; senão cria (uma vez, sob demanda) um pool dedicado com
+    ``PDF_PARSER_BATCH_WORKERS`` workers, sem mudar o modo do /upload-pdf.
+    """
+    global _pool_lote
+    if _pool_global is not None:
+        return _pool_global
+    with _lock_lote:
+        if _pool_lote is None:
+            _pool_lote = PoolParser(funcao, workers=max(1, BATCH_WORKERS))
+        return _pool_lote
+
+
+def obter_pool_paginas(workers=None):
+    """
+    Executor da extração paralela de páginas, ou ``None`` quando ela está
+    desligada. Também devolve ``None`` dentro de um worker do pool de parse:
+    workers do ``multiprocessing.Pool`` são daemon e não podem ter filhos, e
+    ali o paralelismo já vem de vários PDFs ao mesmo tempo.
+    """
+    global _pool_paginas
+    workers = PAGE_WORKERS if workers is None else workers
+    if workers <= 0 or multiprocessing.current_process().daemon:
+        return None
+    with _lock_lote:
+        if _pool_paginas is None:
+            _pool_paginas = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_contexto(),
+                initializer=_aquecer_worker,
+            )
+        return _pool_paginas
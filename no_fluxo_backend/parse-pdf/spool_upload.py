@@ -0,0 +1,100 @@
+"""
+Recebimento dos uploads em arquivo temporário (spool), com SHA-256 calculado
+durante a gravação.
+
+Por padrão o Werkzeug guarda arquivos pequenos do multipart em memória e a
+rota ainda lia o PDF inteiro duas vezes (uma só para logar o tamanho) antes de
+passar os bytes ao PyMuPDF. Com ``RequisicaoSpool`` como ``request_class`` do
+Flask, todo arquivo do multipart vai direto para um ``ArquivoSpool`` em disco,
+pedaço a pedaço: o tamanho e o hash (chave do cache) saem da própria gravação,
+e o PDF é aberto pelo PyMuPDF a partir do caminho, sem cópia em ``bytes``. O
+caminho também é o que atravessa o pool de processos, em vez do PDF inteiro
+serializado pelo pipe.
+
+O arquivo é apagado quando o Werkzeug fecha os arquivos da requisição. Um
+documento já aberto pelo PyMuPDF (modo streaming) continua legível depois
+disso, porque o MuPDF mantém o próprio descritor.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_SPOOL_DIR  diretório dos arquivos temporários (padrão: o do
+                          sistema; /dev/shm evita disco e ainda mantém só uma
+                          cópia do PDF em memória)
+"""
+
+import contextlib
+import hashlib
+import os
+import tempfile
+
+from flask import Request
+
+SPOOL_DIR = os.environ.get("PDF_PARSER_SPOOL_DIR") or None
+
+
+class ArquivoSpool:
+    """
+    Arquivo temporário nomeado que soma tamanho e SHA-256 do que é gravado
+    nele. O resto da interface de arquivo (read, seek, tell...) é a do
+    arquivo subjacente.
+    """
+
+    def __init__(self, diretorio=None):
+        self._arquivo = tempfile.NamedTemporaryFile(
+            prefix="nofluxo-", suffix=".pdf", dir=diretorio or SPOOL_DIR, delete=False
+        )
+        self._sha256 = hashlib.sha256()
+        self.tamanho = 0
+
+    @property
+    def caminho(self):
+        return self._arquivo.name
+
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def write(self, dados):
+        self._sha256.update(dados)
+        self.tamanho += len(dados)
+        return self._arquivo.write(dados)
+
+    def close(self):
+        self._arquivo.close()
+        # No Windows falha enquanto o MuPDF ainda tem o arquivo aberto
+        with contextlib.suppress(OSError):
+            os.unlink(self._arquivo.name)
+
+    def __getattr__(self, nome):
+        return getattr(self._arquivo, nome)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+
+def spool_de(arquivo):
+    """
+    ``ArquivoSpool`` de um ``FileStorage`` já gravado e pronto para leitura.
+    Uploads que não passaram por ``RequisicaoSpool`` são copiados para um
+    spool novo (em pedaços, sem carregar o arquivo inteiro).
+    """
+    stream = arquivo.stream
+    if not isinstance(stream, ArquivoSpool):
+        spool = ArquivoSpool()
+        stream.seek(0)
+        for pedaco in iter(lambda: stream.read(1024 * 1024), b""):
+            spool.write(pedaco)
+        arquivo.stream = stream = spool
+    stream.flush()
+    stream.seek(0)
+    return stream
+
+
+class RequisicaoSpool(Request):
+    """``Request`` do Flask que grava todo arquivo do multipart em um spool."""
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        return ArquivoSpool()
@@ -0,0 +1,84 @@
+"""
+Trace estruturado das decisões do parse (substitui os ``print`` de debug).
+
+Desligado, ``trace(...)`` é só uma leitura de ContextVar e um ``return``: a
+mensagem é formatada (estilo ``%``) apenas quando há um trace ativo, e os
+trechos caros de montar ficam atrás de ``trace_ativo()``. Um trace é ligado
+por requisição com ``capturar_trace()`` e devolvido na resposta.
+
+Sem trace, cada parse gera no máximo uma linha de resumo no log, amostrada.
+
+Configuração por variáveis de ambiente:
+    PDF_PARSER_TRACE_AMOSTRA  fração dos parses com resumo no log; 0 desliga
+                              (padrão: 0.01)
+    PDF_PARSER_TRACE_MAX      eventos guardados por trace (padrão: 5000)
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACE_AMOSTRA = float(os.environ.get("PDF_PARSER_TRACE_AMOSTRA", "0.01"))
+TRACE_MAX = int(os.environ.get("PDF_PARSER_TRACE_MAX", "5000"))
+
+_trace_atual = contextvars.ContextVar("trace_parser", default=None)
+
+
+class TraceParse:
+    """Eventos ``(t_ms, etapa, mensagem)`` de um parse, até ``max_eventos``."""
+
+    def __init__(self, max_eventos=TRACE_MAX):
+        self.max_eventos = max_eventos
+        self.eventos = []
+        self.descartados = 0
+        self._inicio = time.perf_counter()
+
+    def registrar(self, etapa, mensagem, args):
+        if len(self.eventos) >= self.max_eventos:
+            self.descartados += 1
+            return
+        self.eventos.append(
+            {
+                "t_ms": round((time.perf_counter() - self._inicio) * 1000, 3),
+                "etapa": etapa,
+                "mensagem": mensagem % args if args else mensagem,
+            }
+        )
+
+    def como_dict(self):
+        return {"eventos": self.eventos, "descartados": self.descartados}
+
+
+def trace(etapa, mensagem, *args):
+    """Registra um evento no trace da requisição atual, se houver um."""
+    atual = _trace_atual.get()
+    if atual is not None:
+        atual.registrar(etapa, mensagem, args)
+
+
+def trace_ativo():
+    return _trace_atual.get() is not None
+
+
+@contextmanager
+def capturar_trace():
+    """Liga o trace no contexto atual e entrega o ``TraceParse``."""
+    atual = TraceParse()
+    token = _trace_atual.set(atual)
+    try:
+        yield atual
+    finally:
+        _trace_atual.reset(token)
+
+
+def registrar_resumo(resumo, amostra=None):
+    """Loga ``resumo`` (dict) em uma linha JSON para uma fração dos parses."""
+    amostra = TRACE_AMOSTRA if amostra is None else amostra
+    if amostra > 0 and random.random() < amostra:
+        logger.info("Parse summary: %s", json.dumps(resumo, ensure_ascii=False))
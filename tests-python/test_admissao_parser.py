@@ -0,0 +1,130 @@
+"""
+Testes do controle de admissão do /upload-pdf
+(no_fluxo_backend/parse-pdf/admissao_parser.py): vagas de parse, fila
+limitada, pré-checagem de páginas e respostas 429/503/413.
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSE_PDF = os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf")
+
+# Torna os módulos de parse-pdf e de parse-pdf/benchmarks importáveis
+sys.path.insert(0, PARSE_PDF)
+sys.path.insert(0, os.path.join(PARSE_PDF, "benchmarks"))
+
+import pdf_parser_final  # noqa: E402
+from admissao_parser import AdmissaoRecusada, ControleAdmissao  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+from gerador_historico import gerar_historico  # noqa: E402
+
+
+class TestControleAdmissao:
+    def test_fila_cheia_recusa_com_429(self):
+        admissao = ControleAdmissao(max_parses=1, fila_max=0)
+        entrada = admissao.entrar()
+        with pytest.raises(AdmissaoRecusada) as erro:
+            admissao.entrar()
+        assert erro.value.status == 429
+        assert erro.value.motivo == "queue_full"
+        assert erro.value.retry_after >= 1
+        with pytest.raises(AdmissaoRecusada):
+            admissao.verificar_fila()
+        admissao.sair(entrada)
+        admissao.verificar_fila()
+        admissao.sair(admissao.entrar())
+
+    def test_espera_na_fila_ate_liberar_vaga(self):
+        admissao = ControleAdmissao(max_parses=1, fila_max=1, espera_s=5)
+        entrada = admissao.entrar()
+        liberar = threading.Timer(0.05, admissao.sair, (entrada,))
+        liberar.start()
+        inicio = time.perf_counter()
+        with admissao.vaga():
+            assert admissao.em_andamento == 1
+        assert time.perf_counter() - inicio >= 0.04
+        assert admissao.em_andamento == 0 and admissao.na_fila == 0
+
+    def test_espera_estourada_recusa_com_503(self):
+        admissao = ControleAdmissao(max_parses=1, fila_max=1, espera_s=0.05)
+        entrada = admissao.entrar()
+        with pytest.raises(AdmissaoRecusada) as erro:
+            admissao.entrar()
+        assert erro.value.status == 503
+        assert admissao.na_fila == 0
+        admissao.sair(entrada)
+
+    def test_limite_de_paginas(self):
+        admissao = ControleAdmissao(max_paginas=10)
+        admissao.verificar_paginas(10)
+        with pytest.raises(AdmissaoRecusada) as erro:
+            admissao.verificar_paginas(11)
+        assert erro.value.status == 413 and erro.value.retry_after is None
+
+    def test_desligada_nao_limita(self):
+        admissao = ControleAdmissao(max_parses=0, fila_max=0)
+        entradas = [admissao.entrar() for _ in range(5)]
+        admissao.verificar_fila()
+        for entrada in entradas:
+            admissao.sair(entrada)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _enviar(client, pdf_bytes, **headers):
+    return client.post(
+        "/upload-pdf",
+        data={"pdf": (io.BytesIO(pdf_bytes), "historico_1.pdf")},
+        headers=headers,
+    )
+
+
+class TestEndpoint:
+    def test_sem_vaga_responde_429_com_retry_after(self, client, monkeypatch):
+        admissao = ControleAdmissao(max_parses=1, fila_max=0)
+        monkeypatch.setattr(pdf_parser_final, "admissao", admissao)
+        entrada = admissao.entrar()
+        try:
+            response = _enviar(client, gerar_historico(disciplinas=10)[0])
+        finally:
+            admissao.sair(entrada)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.get_json()["motivo"] == "queue_full"
+        metricas = client.get("/metrics").get_data(as_text=True)
+        assert 'pdf_parser_admission_rejections_total{reason="queue_full"}' in metricas
+
+    def test_muitas_paginas_responde_413(self, client, monkeypatch):
+        monkeypatch.setattr(
+            pdf_parser_final, "admissao", ControleAdmissao(max_paginas=2)
+        )
+        pdf_bytes = gerar_historico(disciplinas=200)[0]
+        assert _enviar(client, pdf_bytes).status_code == 413
+        response = _enviar(client, pdf_bytes, Accept="application/x-ndjson")
+        assert response.status_code == 413
+        assert "Retry-After" not in response.headers
+
+    def test_vaga_liberada_depois_do_parse(self, client, monkeypatch):
+        admissao = ControleAdmissao(max_parses=1, fila_max=0)
+        monkeypatch.setattr(pdf_parser_final, "admissao", admissao)
+        pdf_bytes = gerar_historico(disciplinas=10)[0]
+        assert _enviar(client, pdf_bytes, **{"X-Parse-Trace": "1"}).status_code == 200
+        outro = gerar_historico(disciplinas=10, semente=1)[0]
+        response = _enviar(client, outro, Accept="application/x-ndjson")
+        assert response.headers["X-Parse-Cache"] == "MISS"
+        response.get_data()
+        assert admissao.em_andamento == 0
+        # o hit do cache não ocupa vaga
+        assert _enviar(client, pdf_bytes).headers["X-Parse-Cache"] == "HIT"
+        assert admissao.em_andamento == 0
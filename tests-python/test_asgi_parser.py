@@ -0,0 +1,166 @@
+"""
+Testes do modo ASGI do parse-pdf (no_fluxo_backend/parse-pdf/asgi_parser.py):
+mesmo contrato do /upload-pdf do Flask, upload lido em streaming e parse
+fora do loop de eventos.
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("python_multipart")
+pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import asgi_parser  # noqa: E402
+import pdf_parser_final  # noqa: E402
+from admissao_parser import ControleAdmissao  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+
+HISTORICO = "historico_231026330.pdf"
+
+
+def _pdf_bytes():
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+
+
+@pytest.fixture
+def client(cache):
+    with TestClient(asgi_parser.app) as client:
+        yield client
+
+
+def _enviar(client, conteudo=None, url="/upload-pdf", **headers):
+    conteudo = _pdf_bytes() if conteudo is None else conteudo
+    return client.post(url, files={"pdf": (HISTORICO, conteudo)}, headers=headers)
+
+
+def _flask(url="/upload-pdf", **headers):
+    flask_client = pdf_parser_final.app.test_client()
+    return flask_client.post(
+        url, data={"pdf": (io.BytesIO(_pdf_bytes()), HISTORICO)}, headers=headers
+    )
+
+
+class TestContrato:
+    @pytest.mark.parametrize("perfil", ["full", "lean"])
+    def test_mesmo_json_do_flask(self, client, monkeypatch, perfil):
+        url = f"/upload-pdf?profile={perfil}"
+        response = _enviar(client, url=url)
+        assert response.status_code == 200
+        assert response.headers["X-Parse-Cache"] == "MISS"
+        assert "disciplinas" in response.headers["Server-Timing"]
+        monkeypatch.setattr(
+            pdf_parser_final, "cache_parse", CacheParser(diretorio=None)
+        )
+        assert response.json() == _flask(url).get_json()
+
+    def test_streaming_ndjson(self, client):
+        response = _enviar(client, Accept="application/x-ndjson")
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        eventos = [json.loads(linha) for linha in response.text.splitlines()]
+        assert eventos[0]["tipo"] == "cabecalho"
+        assert eventos[-1]["tipo"] == "fim"
+        assert pdf_parser_final.admissao.em_andamento == 0
+
+    def test_cache_hit(self, client):
+        _enviar(client)
+        assert _enviar(client).headers["X-Parse-Cache"] == "HIT"
+
+    def test_gzip_negociado(self, client):
+        response = client.post(
+            "/upload-pdf",
+            files={"pdf": (HISTORICO, _pdf_bytes())},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        # o httpx já entrega o corpo descomprimido
+        assert response.json()["extracted_data"]
+
+    @pytest.mark.parametrize(
+        "kwargs, status",
+        [
+            ({"files": {"outro": ("a.pdf", b"x")}}, 400),
+            ({"data": {"pdf": "texto"}}, 400),
+            ({"files": {"pdf": ("a.pdf", b"isto nao e um pdf")}}, 400),
+        ],
+    )
+    def test_erros(self, client, kwargs, status):
+        response = client.post("/upload-pdf", **kwargs)
+        assert response.status_code == status
+        assert "error" in response.json()
+
+    def test_perfil_invalido(self, client):
+        response = _enviar(client, url="/upload-pdf?profile=xml")
+        assert response.status_code == 400
+        assert response.json()["perfis"] == list(pdf_parser_final.PERFIS_RESPOSTA)
+
+    def test_corpo_acima_do_limite(self, client, monkeypatch):
+        monkeypatch.setitem(pdf_parser_final.app.config, "MAX_CONTENT_LENGTH", 1024)
+        response = _enviar(client)
+        assert response.status_code == 413
+        assert response.json() == pdf_parser_final.ERRO_MUITO_GRANDE
+
+    def test_admissao_recusa_com_retry_after(self, client, monkeypatch):
+        admissao = ControleAdmissao(max_parses=1, fila_max=0)
+        monkeypatch.setattr(pdf_parser_final, "admissao", admissao)
+        entrada = admissao.entrar()
+        try:
+            response = _enviar(client)
+        finally:
+            admissao.sair(entrada)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_metrics_e_cache_stats(self, client):
+        _enviar(client)
+        assert "pdf_parser_requests_total" in client.get("/metrics").text
+        assert client.get("/cache/stats").json()["misses"] == 1
+
+
+def test_parse_roda_no_executor(client, monkeypatch):
+    threads = []
+    original = pdf_parser_final.processar_upload
+
+    def registrar(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(pdf_parser_final, "processar_upload", registrar)
+    assert _enviar(client).status_code == 200
+    assert threads and threads[0].startswith("parse")
+
+
+def test_modo_diff(client):
+    primeira = _enviar(client)
+    response = client.post(
+        "/upload-pdf",
+        files={"pdf": (HISTORICO, _pdf_bytes())},
+        data={"anterior_hash": primeira.headers["X-Parse-Hash"]},
+    )
+    assert response.status_code == 200
+    assert response.json()["diff"]["sem_alteracoes"]
+    fora_do_cache = client.post(
+        "/upload-pdf",
+        files={"pdf": (HISTORICO, _pdf_bytes())},
+        data={"anterior_hash": "0" * 64},
+    )
+    assert fora_do_cache.status_code == 409
@@ -0,0 +1,82 @@
+"""
+Testes do cache de resultados de parse
+(no_fluxo_backend/parse-pdf/cache_parser.py).
+
+Cobre a chave por conteúdo + versão, o LRU em memória, o nível em disco
+(persistência e despejo por tamanho) e os contadores de hit/miss.
+"""
+
+import os
+import sys
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "no_fluxo_backend",
+        "parse-pdf",
+    ),
+)
+
+from cache_parser import CacheParser, chave_cache  # noqa: E402
+
+
+class TestChaveCache:
+    def test_mesmo_conteudo_mesma_chave(self):
+        assert chave_cache(b"%PDF-1.7 abc", "1") == chave_cache(b"%PDF-1.7 abc", "1")
+
+    def test_versao_do_parser_muda_a_chave(self):
+        assert chave_cache(b"%PDF-1.7 abc", "1") != chave_cache(b"%PDF-1.7 abc", "2")
+
+    def test_conteudo_diferente_muda_a_chave(self):
+        assert chave_cache(b"%PDF-1.7 abc", "1") != chave_cache(b"%PDF-1.7 abd", "1")
+
+
+class TestCacheMemoria:
+    def test_miss_e_hit_sao_contados(self):
+        cache = CacheParser(max_itens=4, diretorio=None)
+        assert cache.obter("k1") is None
+        cache.guardar("k1", {"curso": "ENGENHARIA DE SOFTWARE"})
+        assert cache.obter("k1") == {"curso": "ENGENHARIA DE SOFTWARE"}
+        stats = cache.estatisticas()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_despeja_o_menos_usado(self):
+        cache = CacheParser(max_itens=2, diretorio=None)
+        cache.guardar("a", {"v": 1})
+        cache.guardar("b", {"v": 2})
+        cache.obter("a")  # "a" passa a ser o mais recente
+        cache.guardar("c", {"v": 3})
+        assert cache.obter("b") is None
+        assert cache.obter("a") == {"v": 1}
+        assert cache.obter("c") == {"v": 3}
+
+    def test_max_itens_zero_desliga_memoria(self):
+        cache = CacheParser(max_itens=0, diretorio=None)
+        cache.guardar("a", {"v": 1})
+        assert cache.obter("a") is None
+
+
+class TestCacheDisco:
+    def test_disco_sobrevive_a_nova_instancia(self, tmp_path):
+        CacheParser(max_itens=2, diretorio=str(tmp_path)).guardar("ab12", {"v": 1})
+        cache = CacheParser(max_itens=2, diretorio=str(tmp_path))
+        assert cache.obter("ab12") == {"v": 1}
+        assert cache.estatisticas()["hits_disco"] == 1
+        # segundo acesso já vem do LRU em memória
+        cache.obter("ab12")
+        assert cache.estatisticas()["hits_memoria"] == 1
+
+    def test_despejo_por_tamanho(self, tmp_path):
+        valor = {"full_text": "x" * 1000}
+        cache = CacheParser(max_itens=0, diretorio=str(tmp_path), max_bytes_disco=2500)
+        for idade, chave in enumerate(("aa01", "bb02", "cc03")):
+            cache.guardar(chave, valor)
+            # mtimes crescentes e determinísticos: "aa01" é o mais antigo
+            os.utime(cache._caminho(chave), (idade, idade))
+        assert cache.estatisticas()["bytes_disco"] <= 2500
+        assert cache.obter("aa01") is None
+        assert cache.obter("cc03") == valor
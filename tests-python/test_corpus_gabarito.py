@@ -0,0 +1,72 @@
+"""
+Regressão do parser contra o gabarito do corpus real
+(test_historicos/gabarito, gravado por
+no_fluxo_backend/parse-pdf/benchmarks/corpus_gabarito.py): texto e dados de
+cada PDF de test_historicos/historicos têm que sair iguais, campo a campo.
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+PARSE_PDF = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "no_fluxo_backend",
+    "parse-pdf",
+)
+# Torna os módulos de parse-pdf e de parse-pdf/benchmarks importáveis
+sys.path.insert(0, PARSE_PDF)
+sys.path.insert(0, os.path.join(PARSE_PDF, "benchmarks"))
+
+from corpus_gabarito import (  # noqa: E402
+    caminho_gabarito,
+    comparar_com_gabarito,
+    diferencas,
+    pdfs_do_corpus,
+    rodar_pdf,
+)
+
+PDFS = pdfs_do_corpus()
+
+
+@pytest.mark.skipif(not PDFS, reason="corpus test_historicos ausente")
+@pytest.mark.parametrize("pdf", PDFS, ids=os.path.basename)
+def test_corpus_igual_ao_gabarito(pdf):
+    logging.disable(logging.CRITICAL)
+    try:
+        saida, _ = rodar_pdf(pdf, repeticoes=1)
+    finally:
+        logging.disable(logging.NOTSET)
+    encontradas = comparar_com_gabarito(saida, caminho_gabarito(pdf))
+    assert encontradas is not None, "sem gabarito: rode corpus_gabarito.py --gravar"
+    assert encontradas == [], "\n".join(
+        f"{c}: {a!r} -> {d!r}" for c, a, d in encontradas[:20]
+    )
+
+
+class TestDiferencas:
+    def test_campo_alterado_aponta_o_caminho(self):
+        antes = {"dados": {"disciplinas": [{"status": "MATR", "codigo": "MAT0025"}]}}
+        depois = {"dados": {"disciplinas": [{"status": "APR", "codigo": "MAT0025"}]}}
+        assert list(diferencas(antes, depois)) == [
+            ("dados.disciplinas[0].status", "MATR", "APR")
+        ]
+
+    def test_item_inserido_nao_desalinha_os_seguintes(self):
+        antes = [{"codigo": c} for c in ("A", "B", "C")]
+        depois = [{"codigo": c} for c in ("A", "X", "B", "C")]
+        assert list(diferencas(antes, depois, "d")) == [("d[1]", None, {"codigo": "X"})]
+
+    def test_item_removido_e_chave_nova(self):
+        antes = {"texto": ["a", "b", "c"], "ira": 3.5}
+        depois = {"texto": ["a", "c"], "ira": 3.5, "mp": 3.1}
+        assert list(diferencas(antes, depois)) == [
+            ("mp", None, 3.1),
+            ("texto[1]", "b", None),
+        ]
+
+    def test_tipo_diferente_conta(self):
+        assert list(diferencas({"n": 1}, {"n": 1.0})) == [("n", 1, 1.0)]
+        assert list(diferencas({"n": 1.5}, {"n": 1.5})) == []
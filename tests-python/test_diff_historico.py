@@ -0,0 +1,229 @@
+"""
+Testes do modo diff do /upload-pdf (no_fluxo_backend/parse-pdf/
+diff_historico.py) e do cache de texto por página (cache_paginas.py): o
+histórico do semestre seguinte volta como diferença para o anterior, e as
+páginas que não mudaram não são extraídas de novo.
+"""
+
+import copy
+import hashlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+PARSE_PDF = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "no_fluxo_backend",
+    "parse-pdf",
+)
+# Torna os módulos de parse-pdf e de parse-pdf/benchmarks importáveis
+sys.path.insert(0, PARSE_PDF)
+sys.path.insert(0, os.path.join(PARSE_PDF, "benchmarks"))
+
+import fitz  # noqa: E402
+
+import pdf_parser_final  # noqa: E402
+from cache_paginas import CachePaginas, hash_da_pagina  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+from diff_historico import diff_historicos, normalizar_resultado  # noqa: E402
+from gerador_historico import desenhar_pdf, gerar_dados  # noqa: E402
+from metricas_parser import medir_parse  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def semestres():
+    """PDFs de dois semestres seguidos: as MATR viram APR e o IRA muda."""
+    anterior = gerar_dados(disciplinas=150, semente=3)
+    atual = copy.deepcopy(anterior)
+    for disciplina in atual["disciplinas"]:
+        if disciplina["situacao"] == "MATR":
+            disciplina["situacao"], disciplina["mencao"] = "APR", "MS"
+    atual["ira"] = 4.1234
+    return desenhar_pdf(anterior), desenhar_pdf(atual)
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    monkeypatch.setattr(
+        pdf_parser_final,
+        "cache_paginas",
+        CachePaginas(diretorio=None, versao=pdf_parser_final.VERSAO_PARSER),
+    )
+
+
+@pytest.fixture
+def client(caches):
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _regular(codigo, ano_periodo="2024.1", **campos):
+    return {
+        "tipo_dado": "Disciplina Regular",
+        "nome": "CÁLCULO 1",
+        "status": "MATR",
+        "mencao": "-",
+        "codigo": codigo,
+        "ano_periodo": ano_periodo,
+        **campos,
+    }
+
+
+def _dados(disciplinas, ira=3.5, **campos):
+    return {
+        "disciplinas": [{"IRA": "IRA", "valor": ira}, *disciplinas],
+        "equivalencias": [],
+        "curso": "ENGENHARIA DE SOFTWARE",
+        "media_ponderada": 3.4,
+        **campos,
+    }
+
+
+class TestDiffHistoricos:
+    def test_sem_alteracoes(self):
+        dados = _dados([_regular("MAT0025")])
+        diff = diff_historicos(dados, copy.deepcopy(dados))
+        assert diff["sem_alteracoes"]
+        assert diff["alteradas"] == diff["adicionadas"] == diff["removidas"] == []
+
+    def test_matr_vira_apr_e_ira_muda(self):
+        antes = _dados([_regular("MAT0025"), _regular("CIC0004")])
+        depois = _dados(
+            [_regular("MAT0025", status="APR", mencao="MS"), _regular("CIC0004")],
+            ira=3.7,
+        )
+        diff = diff_historicos(antes, depois)
+        assert diff["alteradas"] == [
+            {
+                "tipo_dado": "Disciplina Regular",
+                "codigo": "MAT0025",
+                "ano_periodo": "2024.1",
+                "nome": "CÁLCULO 1",
+                "campos": {
+                    "mencao": {"antes": "-", "depois": "MS"},
+                    "status": {"antes": "MATR", "depois": "APR"},
+                },
+            }
+        ]
+        assert diff["campos"] == {"ira": {"antes": 3.5, "depois": 3.7}}
+        assert not diff["sem_alteracoes"]
+
+    def test_mesma_disciplina_em_outro_periodo_e_nova_linha(self):
+        antes = _dados([_regular("MAT0025", status="REP")])
+        depois = _dados(
+            [_regular("MAT0025", status="REP"), _regular("MAT0025", "2024.2")]
+        )
+        diff = diff_historicos(antes, depois)
+        assert [d["ano_periodo"] for d in diff["adicionadas"]] == ["2024.2"]
+        assert diff["alteradas"] == diff["removidas"] == []
+
+    def test_pendente_cursada_sai_das_pendentes(self):
+        pendente = {"tipo_dado": "Disciplina Pendente", "codigo": "FGA0003"}
+        antes = _dados([pendente])
+        depois = _dados([_regular("FGA0003")])
+        diff = diff_historicos(antes, depois)
+        assert diff["removidas"] == [
+            {"tipo_dado": "Disciplina Pendente", "codigo": "FGA0003", "nome": None}
+        ]
+        assert diff["adicionadas"][0]["codigo"] == "FGA0003"
+
+    def test_aceita_resposta_do_upload_pdf(self):
+        dados = _dados([_regular("MAT0025")])
+        resposta = pdf_parser_final.montar_resposta(
+            "historico_1.pdf",
+            "1",
+            None,
+            {
+                **dados,
+                "matriz_curricular": "2017.1",
+                "semestre_atual": "2024.1",
+                "numero_semestre": 3,
+                "suspensoes": 0,
+            },
+        )
+        assert normalizar_resultado(resposta)["resumo"]["ira"] == 3.5
+        assert diff_historicos(resposta, dados)["alteradas"] == []
+
+    @pytest.mark.parametrize("resultado", [[], {"disciplinas": "x"}, {"a": 1}])
+    def test_resultado_invalido(self, resultado):
+        with pytest.raises(ValueError):
+            normalizar_resultado(resultado)
+
+
+class TestCachePaginas:
+    def test_hash_igual_so_nas_paginas_que_nao_mudaram(self, semestres):
+        docs = [fitz.open(stream=pdf, filetype="pdf") for pdf in semestres]
+        hashes = [
+            [hash_da_pagina(doc, n) for n in range(doc.page_count)] for doc in docs
+        ]
+        iguais = [a == b for a, b in zip(*hashes)]
+        # IRA (página 1) e as MATR do último período (última página) mudaram
+        assert not iguais[0] and not iguais[-1]
+        assert any(iguais)
+
+    def test_paginas_reaproveitadas_dao_o_mesmo_texto(
+        self, caches, semestres, monkeypatch
+    ):
+        anterior, atual = semestres
+        pdf_parser_final.processar_pdf(anterior)
+        with medir_parse() as medicao:
+            texto, dados = pdf_parser_final.processar_pdf(atual)
+        assert medicao.cache_paginas["hit"] > 0
+        assert medicao.cache_paginas["miss"] > 0
+
+        monkeypatch.setattr(pdf_parser_final, "cache_paginas", CachePaginas(0))
+        assert pdf_parser_final.processar_pdf(atual) == (texto, dados)
+
+
+class TestModoDiff:
+    def _enviar(self, client, pdf, **campos):
+        return client.post(
+            "/upload-pdf",
+            data={"pdf": (io.BytesIO(pdf), "historico_1.pdf"), **campos},
+        )
+
+    def test_diff_pelo_hash_do_pdf_anterior(self, client, semestres):
+        anterior, atual = semestres
+        primeira = self._enviar(client, anterior)
+        assert primeira.headers["X-Parse-Hash"] == hashlib.sha256(anterior).hexdigest()
+
+        response = self._enviar(
+            client, atual, anterior_hash=primeira.headers["X-Parse-Hash"]
+        )
+        assert response.status_code == 200
+        corpo = response.get_json()
+        assert corpo["anterior"] == "hash"
+        assert corpo["hash_pdf"] == hashlib.sha256(atual).hexdigest()
+        diff = corpo["diff"]
+        assert diff["adicionadas"] == diff["removidas"] == []
+        assert {a["campos"]["status"]["depois"] for a in diff["alteradas"]} == {"APR"}
+        assert diff["campos"]["ira"]["depois"] == 4.1234
+        assert "extracted_data" not in corpo
+
+    def test_diff_pelo_resultado_anterior(self, client, semestres):
+        anterior, atual = semestres
+        resultado = self._enviar(client, anterior).get_json()
+        por_json = self._enviar(client, atual, anterior=json.dumps(resultado))
+        por_hash = self._enviar(
+            client, atual, anterior_hash=hashlib.sha256(anterior).hexdigest()
+        )
+        assert por_json.get_json()["anterior"] == "resultado"
+        assert por_json.get_json()["diff"] == por_hash.get_json()["diff"]
+
+    def test_hash_fora_do_cache_pede_o_resultado(self, client, semestres):
+        response = self._enviar(client, semestres[1], anterior_hash="0" * 64)
+        assert response.status_code == 409
+        assert response.get_json()["motivo"] == "anterior_fora_do_cache"
+
+    @pytest.mark.parametrize(
+        "campos",
+        [{"anterior_hash": "xyz"}, {"anterior": "{"}, {"anterior": '{"a": 1}'}],
+    )
+    def test_anterior_invalido(self, client, semestres, campos):
+        response = self._enviar(client, semestres[1], **campos)
+        assert response.status_code == 400
+        assert "error" in response.get_json()
@@ -0,0 +1,57 @@
+"""
+Testes da extração de texto por página do serviço parse-pdf
+(no_fluxo_backend/parse-pdf/pdf_parser_final.py).
+
+O modo paralelo divide o PDF em faixas de páginas extraídas em processos
+separados; o texto final precisa ser idêntico ao do modo serial.
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pool_parser  # noqa: E402
+from pdf_parser_final import extrair_texto_paginas  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def pdf_longo():
+    # 3 cópias de um histórico de 4 páginas: 12 páginas, ordem verificável
+    fonte = fitz.open(os.path.join(HISTORICOS, "historico_231026330.pdf"))
+    destino = fitz.open()
+    for _ in range(3):
+        destino.insert_pdf(fonte)
+    dados = destino.tobytes()
+    destino.close()
+    fonte.close()
+    return dados
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ProcessPoolExecutor(max_workers=3, mp_context=pool_parser._contexto())
+    yield executor
+    executor.shutdown()
+
+
+class TestExtrairTextoPaginas:
+    def test_paralelo_igual_ao_serial(self, pdf_longo, executor):
+        serial = extrair_texto_paginas(pdf_longo)
+        paralelo = extrair_texto_paginas(pdf_longo, executor=executor)
+        assert len(serial) == 12
+        assert paralelo == serial
+        # páginas repetidas voltam na mesma posição relativa
+        assert serial[:4] == serial[4:8] == serial[8:]
+
+    def test_desligado_por_padrao(self, monkeypatch):
+        monkeypatch.setattr(pool_parser, "PAGE_WORKERS", 0)
+        assert pool_parser.obter_pool_paginas() is None
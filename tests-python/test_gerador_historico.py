@@ -0,0 +1,115 @@
+"""
+Testes do gerador de históricos sintéticos e do benchmark do parser
+(no_fluxo_backend/parse-pdf/benchmarks/): o PDF gerado precisa ser lido pelo
+parser de volta com o que foi plantado nele.
+"""
+
+import os
+import sys
+
+import pytest
+
+PARSE_PDF = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "no_fluxo_backend",
+    "parse-pdf",
+)
+# Torna os módulos de parse-pdf e de parse-pdf/benchmarks importáveis
+sys.path.insert(0, PARSE_PDF)
+sys.path.insert(0, os.path.join(PARSE_PDF, "benchmarks"))
+
+import fitz  # noqa: E402
+
+from bench_parser import comparar, percentil  # noqa: E402
+from gerador_historico import gerar_historico  # noqa: E402
+from pdf_parser_final import processar_pdf  # noqa: E402
+
+
+def _regulares(dados):
+    return [
+        d for d in dados["disciplinas"] if d.get("tipo_dado") == "Disciplina Regular"
+    ]
+
+
+@pytest.mark.parametrize("layout", ["novo", "antigo"])
+@pytest.mark.parametrize("travessao", [False, True])
+def test_parser_recupera_o_que_foi_gerado(layout, travessao):
+    pdf_bytes, gabarito = gerar_historico(
+        layout=layout,
+        disciplinas=60,
+        equivalencias=2,
+        suspensoes=["2019.1"],
+        travessao=travessao,
+        semente=7,
+    )
+    _, dados = processar_pdf(pdf_bytes)
+
+    regulares = _regulares(dados)
+    assert [d["codigo"] for d in regulares] == [
+        d["codigo"] for d in gabarito["disciplinas"]
+    ]
+    # menções de reprovação (II/MI/SR) viram REP no parser
+    assert [d["status"] for d in regulares] == [
+        "REP" if d["mencao"] in ("II", "MI", "SR") else d["situacao"]
+        for d in gabarito["disciplinas"]
+    ]
+    assert dados["curso"] == gabarito["curso"]
+    assert dados["ira"] == gabarito["ira"]
+    assert dados["suspensoes"] == ["2019.1"]
+    assert len(dados["equivalencias"]) == 2
+    # só o layout novo traz a linha de docente
+    assert all(bool(d["professor"]) == (layout == "novo") for d in regulares)
+
+
+def test_tamanho_configuravel_quebra_paginas():
+    pequeno, _ = gerar_historico(disciplinas=10)
+    grande, gabarito = gerar_historico(disciplinas=300)
+    with fitz.open(stream=pequeno, filetype="pdf") as doc:
+        assert doc.page_count == 1
+    with fitz.open(stream=grande, filetype="pdf") as doc:
+        assert doc.page_count > 5
+    _, dados = processar_pdf(grande)
+    assert len(_regulares(dados)) == len(gabarito["disciplinas"]) == 300
+
+
+def test_mesma_semente_gera_mesmo_pdf():
+    assert gerar_historico(semente=3)[0] == gerar_historico(semente=3)[0]
+    assert gerar_historico(semente=3)[0] != gerar_historico(semente=4)[0]
+
+
+def test_layout_desconhecido():
+    with pytest.raises(ValueError):
+        gerar_historico(layout="outro")
+
+
+def test_percentil():
+    assert percentil([5], 95) == 5
+    assert percentil([1, 2, 3, 4, 5], 50) == 3
+    assert percentil(list(range(1, 101)), 95) == pytest.approx(95.05)
+
+
+def test_comparar_aponta_regressao_acima_da_tolerancia():
+    def resultado(p95_texto, p95_dados):
+        return {
+            "meta": {},
+            "resultados": [
+                {
+                    "layout": "novo",
+                    "disciplinas": 40,
+                    "etapa": "extract_structured_text",
+                    "ms_p95": p95_texto,
+                },
+                {
+                    "layout": "novo",
+                    "disciplinas": 40,
+                    "etapa": "extrair_dados_academicos",
+                    "ms_p95": p95_dados,
+                },
+            ],
+        }
+
+    base = resultado(1.0, 4.0)
+    linhas, regressao = comparar(base, resultado(1.1, 3.0), 0.2)
+    assert len(linhas) == 2 and not regressao
+    linhas, regressao = comparar(base, resultado(1.5, 3.0), 0.2)
+    assert regressao and "REGRESSÃO" in linhas[0]
@@ -0,0 +1,226 @@
+"""
+Testes do núcleo de parse compartilhado (no_fluxo_backend/parse-pdf/
+historico_parser.py): importável sem a pilha web e usado pelas cópias do
+parser (serviço, OCR e DBA/parse_pdf).
+"""
+
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSE_PDF = os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, PARSE_PDF)
+
+import historico_parser  # noqa: E402
+import pdf_parser_final  # noqa: E402
+
+TEXTO = """\
+Curso: ENGENHARIA DE SOFTWARE/FCTE - BACHARELADO - DIURNO
+Status: ATIVO
+IRA: 3,8765 MP: 3,1234
+Currículo: 6360/1 - 2017.2
+ALGORITMOS E PROGRAMAÇÃO DE COMPUTADORES
+2021.1 01 APR CIC0004 90 100,0 SS *
+Dr. JOSÉ DA SILVA (90h)
+"""
+
+
+def test_import_sem_flask_fitz_numpy():
+    codigo = (
+        "import sys; import historico_parser; "
+        "print(sorted(m for m in ('flask', 'fitz', 'pymupdf', 'numpy') "
+        "if m in sys.modules))"
+    )
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=PARSE_PDF,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert saida.strip() == "[]"
+
+
+def test_servico_reexporta_o_nucleo():
+    for nome in (
+        "VERSAO_PARSER",
+        "extrair_dados_academicos",
+        "ExtracaoIncremental",
+        "limpar_nome_disciplina",
+        "extrair_curso",
+        "tokenizar_linhas",
+    ):
+        assert getattr(pdf_parser_final, nome) is getattr(historico_parser, nome)
+
+
+def test_dba_usa_o_nucleo():
+    from DBA.parse_pdf import pdf_parser_final as dba
+
+    assert dba.limpar_nome_disciplina is historico_parser.limpar_nome_disciplina
+    assert dba.extrair_curso is historico_parser.extrair_curso
+
+
+def test_ocr_usa_o_nucleo():
+    pytest.importorskip("pytesseract")
+    pytest.importorskip("PIL")
+    import pdf_parser_ocr
+
+    assert pdf_parser_ocr.extrair_cabecalho is historico_parser.extrair_cabecalho
+    dados = pdf_parser_ocr.extrair_dados_academicos(TEXTO)
+    assert dados["curso"] == historico_parser.extrair_dados_academicos(TEXTO)["curso"]
+    assert dados["ira"] == 3.8765
+
+
+@pytest.mark.parametrize(
+    "nome, esperado",
+    [
+        ("2021.1 ALGORITMOS", "ALGORITMOS"),
+        ("-- CÁLCULO 1", "CÁLCULO 1"),
+        ("— CÁLCULO 1", "CÁLCULO 1"),
+    ],
+)
+def test_limpar_nome_disciplina(nome, esperado):
+    assert historico_parser.limpar_nome_disciplina(nome) == esperado
+
+
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+CABECALHO_SIGAA = """\
+Dados do Vínculo do(a) Discente
+Curso:
+ENGENHARIA DE SOFTWARE/FCTE - BACHARELADO - DIURNO
+IRA: 3.5551
+MP: 3.4828
+Currículo:
+6360/1 - 2017.1
+Suspensões:
+{suspensoes}
+Componentes Curriculares Cursados/Cursando
+"""
+
+
+class TestLayoutCabecalho:
+    def test_reconhece_layout_sigaa(self):
+        texto = CABECALHO_SIGAA.format(suspensoes="Nenhum")
+        layout, cabecalho = historico_parser.identificar_layout(texto)
+        assert layout == historico_parser.LAYOUT_SIGAA
+        assert cabecalho.endswith("Nenhum\n")
+        assert historico_parser.extrair_cabecalho(texto) == {
+            "curso": "ENGENHARIA DE SOFTWARE",
+            "matriz_curricular": "2017.1",
+            "suspensoes": [],
+            "ira": 3.5551,
+            "ira_texto": "3.5551",
+            "media_ponderada": 3.4828,
+        }
+
+    def test_suspensoes_no_cabecalho(self):
+        texto = CABECALHO_SIGAA.format(suspensoes="2022.1, 2023.2")
+        cabecalho = historico_parser.extrair_cabecalho(texto)
+        assert cabecalho["suspensoes"] == ["2022.1", "2023.2"]
+
+    def test_layout_desconhecido(self):
+        assert historico_parser.identificar_layout(TEXTO) == (None, None)
+        cabecalho = historico_parser.extrair_cabecalho(TEXTO)
+        assert cabecalho["curso"] == "ENGENHARIA DE SOFTWARE"
+        assert cabecalho["ira"] == 3.8765
+
+    @pytest.mark.parametrize(
+        "arquivo", sorted(f for f in os.listdir(HISTORICOS) if f.endswith(".pdf"))
+    )
+    def test_mesmo_resultado_que_a_extracao_completa(self, arquivo, monkeypatch):
+        texto, _ = pdf_parser_final.processar_pdf(os.path.join(HISTORICOS, arquivo))
+        assert historico_parser.identificar_layout(texto)[0] is not None
+        pelo_layout = historico_parser.extrair_cabecalho(texto)
+        monkeypatch.setattr(
+            historico_parser, "identificar_layout", lambda _texto: (None, None)
+        )
+        assert pelo_layout == historico_parser.extrair_cabecalho(texto)
+
+
+# Formas antigas (com grupos repetidos aninhados) dos padrões reescritos:
+# referência de comportamento para entradas pequenas
+NOME_DISCIPLINA_ANTIGO = re.compile(
+    r"^([A-ZÀ-ÿ][A-ZÀ-ÿ\s0-9\-]+(?:DE\s+[A-ZÀ-ÿ\s0-9\-]*)*(?:\s+[A-ZÀ-ÿ\s0-9\-]*)*)\s*$",
+    re.MULTILINE | re.IGNORECASE,
+)
+PENDENTES_ANTIGO = re.compile(
+    r"^\s+([A-ZÀ-Ÿ\s0-9]+(?:DE\s+[A-ZÀ-Ÿ\s0-9]*)*)\s+(\d+)\s*h\s+([A-Z]{2,}\d{3,})(?:\s+(Matriculado|Matriculado em Equivalente))?",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+
+def _aleatorios(pecas, quantidade, max_pecas, semente):
+    rnd = random.Random(semente)
+    for _ in range(quantidade):
+        yield "".join(rnd.choice(pecas) for _ in range(rnd.randint(0, max_pecas)))
+
+
+def _rapido(funcao, entrada, limite_s=1.0):
+    inicio = time.perf_counter()
+    resultado = funcao(entrada)
+    assert time.perf_counter() - inicio < limite_s
+    return resultado
+
+
+class TestEntradasAdversariais:
+    def test_nome_disciplina_igual_a_forma_antiga(self):
+        pecas = ["A", "é", "DE", " ", "\t", "-", "1", "!", "(", ".", "ÿ", "×", "x"]
+        for linha in _aleatorios(pecas, 20000, 12, semente=1):
+            linha = linha.strip()
+            antigo = NOME_DISCIPLINA_ANTIGO.search(linha)
+            novo = historico_parser.padrao_nome_disciplina.search(linha)
+            assert (antigo and antigo.group(1)) == (novo and novo.group(1)), linha
+
+    def test_pendentes_iguais_a_forma_antiga(self):
+        pecas = [" ", "  ", "\n", "\n  ", "DE ", "A", "É", "60", "h", "CIC", "0004"]
+        pecas += ["FGA0003", " Matriculado", "!", ":", "\t", "x", "1"]
+        for texto in _aleatorios(pecas, 20000, 24, semente=2):
+            assert historico_parser.encontrar_pendentes(
+                texto
+            ) == PENDENTES_ANTIGO.findall(texto), texto
+
+    def test_pendentes_do_sigaa(self):
+        texto = (
+            "Componentes Curriculares Obrigatórios Pendentes: 2\n"
+            "  TRABALHO DE CONCLUSÃO DE CURSO 1  60 h  FGA0003\n"
+            "  ESTÁGIO SUPERVISIONADO  120 h  FGA0004 Matriculado\n"
+        )
+        assert historico_parser.encontrar_pendentes(texto) == [
+            ("TRABALHO DE CONCLUSÃO DE CURSO 1 ", "60", "FGA0003", ""),
+            ("ESTÁGIO SUPERVISIONADO ", "120", "FGA0004", "Matriculado"),
+        ]
+
+    @pytest.mark.parametrize(
+        "linha",
+        ["A" + " B" * 20000 + "!", "CALCULO " + "DE " * 20000 + "!", "A" * 100000],
+    )
+    def test_nome_disciplina_linear(self, linha):
+        _rapido(historico_parser.padrao_nome_disciplina.search, linha)
+
+    @pytest.mark.parametrize(
+        "texto",
+        [
+            "  X " + "DE " * 20000 + "!",
+            "  ABC DEF 60\n" * 20000,
+            "\n " * 50000 + " 60 h",
+            "  CALCULO " + "1 " * 20000 + "60 h\n",
+        ],
+    )
+    def test_pendentes_linear(self, texto):
+        assert _rapido(historico_parser.encontrar_pendentes, texto) == (
+            PENDENTES_ANTIGO.findall(texto) if len(texto) < 2000 else []
+        )
+
+    def test_historico_malformado_termina(self):
+        texto = TEXTO + ("DE " * 3000 + "\n") * 20 + "  X " + "DE " * 5000 + "\n"
+        dados = _rapido(historico_parser.extrair_dados_academicos, texto, 5.0)
+        assert dados["curso"] == "ENGENHARIA DE SOFTWARE"
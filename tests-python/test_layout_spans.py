@@ -0,0 +1,62 @@
+"""
+Testes da montagem de linhas a partir dos spans do PyMuPDF
+(no_fluxo_backend/parse-pdf/layout_spans.py).
+"""
+
+import os
+import sys
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "no_fluxo_backend",
+        "parse-pdf",
+    ),
+)
+
+from pdf_parser_final import extract_structured_text  # noqa: E402
+
+
+def _span(texto, x0, x1):
+    return {"text": texto, "bbox": (x0, 0, x1, 10), "font": "Arial", "size": 8}
+
+
+def _linha(y, *spans):
+    return {"bbox": (0, y, 500, y + 10), "spans": list(spans)}
+
+
+def _pagina(*linhas):
+    return {"blocks": [{"lines": list(linhas)}, {"type": 1, "bbox": (0, 0, 1, 1)}]}
+
+
+class TestExtractStructuredText:
+    def test_dict_vazio(self):
+        assert extract_structured_text({}) == ""
+        assert extract_structured_text(_pagina()) == ""
+
+    def test_spans_ordenados_por_x_e_linhas_por_y(self):
+        pagina = _pagina(
+            _linha(50, _span("B", 100, 106)),
+            _linha(10, _span("mundo", 40, 70), _span("olá", 0, 18)),
+        )
+        # "olá" termina em 18 e "mundo" começa em 40: 22pt → 3 espaços
+        assert extract_structured_text(pagina) == "olá   mundo\nB"
+
+    def test_distancia_usa_largura_real_do_span(self):
+        # Span largo: o fim real (x1=95) cola no próximo, sem espaço
+        pagina = _pagina(_linha(0, _span("MM", 0, 95), _span("X", 100, 106)))
+        assert extract_structured_text(pagina) == "MMX"
+
+    def test_espacos_limitados_e_spans_em_branco_ignorados(self):
+        pagina = _pagina(
+            _linha(0, _span("A", 0, 6), _span("   ", 10, 20), _span("Z", 400, 406))
+        )
+        assert extract_structured_text(pagina) == "A" + " " * 10 + "Z"
+
+    def test_empate_em_y_mantem_ordem_do_pdf(self):
+        pagina = _pagina(
+            _linha(5, _span("primeira", 0, 40)), _linha(5, _span("segunda", 0, 40))
+        )
+        assert extract_structured_text(pagina) == "primeira\nsegunda"
@@ -0,0 +1,176 @@
+"""
+Testes das métricas do serviço parse-pdf: /metrics e header Server-Timing
+(no_fluxo_backend/parse-pdf/metricas_parser.py e pdf_parser_final.py).
+"""
+
+import io
+import os
+import re
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import metricas_parser  # noqa: E402
+import pdf_parser_final  # noqa: E402
+from cache_paginas import CachePaginas  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+from metricas_parser import (  # noqa: E402
+    Contador,
+    Histograma,
+    MedicaoParse,
+    etapa,
+    medir_parse,
+    server_timing,
+)
+
+HISTORICO = "historico_231026330.pdf"
+
+
+def _pdf():
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        return io.BytesIO(f.read())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    # Sem páginas de parses anteriores: as etapas de extração sempre rodam
+    monkeypatch.setattr(pdf_parser_final, "cache_paginas", CachePaginas(diretorio=None))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _enviar(client, **headers):
+    return client.post(
+        "/upload-pdf", data={"pdf": (_pdf(), HISTORICO)}, headers=headers
+    )
+
+
+def _valor(texto, amostra):
+    """Valor de uma linha de amostra exata do /metrics (0 se ausente)."""
+    for linha in texto.splitlines():
+        if linha.startswith(amostra + " "):
+            return float(linha.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def _timings(header):
+    return dict(re.findall(r"([a-z_]+);dur=([\d.]+)", header))
+
+
+class TestMedicao:
+    def test_etapa_sem_medicao_ativa_nao_mede(self):
+        with etapa("get_text"):
+            pass  # nada a registrar, e não falha
+
+    def test_etapas_somam_na_medicao(self):
+        with medir_parse() as medicao:
+            with etapa("get_text"):
+                pass
+            with etapa("get_text"):
+                pass
+            with etapa("disciplinas"):
+                pass
+        assert set(medicao.etapas) == {"get_text", "disciplinas"}
+        with etapa("get_text"):
+            pass
+        assert len(medicao.etapas) == 2
+
+    def test_server_timing_em_ordem_de_pipeline(self):
+        medicao = MedicaoParse()
+        medicao.somar("disciplinas", 0.002)
+        medicao.somar("fitz_open", 0.0005)
+        valor = server_timing(medicao, 0.01, hit=False)
+        assert valor == (
+            'cache;desc="miss", fitz_open;dur=0.50, disciplinas;dur=2.00, '
+            "total;dur=10.00"
+        )
+
+
+class TestExposicao:
+    def test_histograma_cumulativo(self):
+        h = Histograma("teste_segundos", "Ajuda.", ("stage",), buckets=(0.1, 1.0))
+        h.observar(0.05, stage="a")
+        h.observar(0.5, stage="a")
+        h.observar(5, stage="a")
+        linhas = list(h.linhas())
+        assert linhas[:2] == [
+            "# HELP teste_segundos Ajuda.",
+            "# TYPE teste_segundos histogram",
+        ]
+        assert 'teste_segundos_bucket{stage="a",le="0.1"} 1' in linhas
+        assert 'teste_segundos_bucket{stage="a",le="1.0"} 2' in linhas
+        assert 'teste_segundos_bucket{stage="a",le="+Inf"} 3' in linhas
+        assert 'teste_segundos_sum{stage="a"} 5.55' in linhas
+        assert 'teste_segundos_count{stage="a"} 3' in linhas
+
+    def test_rotulos_escapados(self):
+        c = Contador("teste_total", "Ajuda.", ("rota",))
+        c.inc(rota='a"b\\c')
+        assert 'teste_total{rota="a\\"b\\\\c"} 1' in list(c.linhas())
+
+
+class TestEndpoint:
+    def test_server_timing_com_etapas_do_parse(self, client):
+        response = _enviar(client)
+        assert response.status_code == 200
+        header = response.headers["Server-Timing"]
+        assert 'cache;desc="miss"' in header
+        tempos = _timings(header)
+        for nome in ("fitz_open", "get_text", "extract_structured_text"):
+            assert nome in tempos
+        for nome in ("disciplinas", "pendentes", "equivalencias", "total"):
+            assert nome in tempos
+
+    def test_cache_hit_so_com_total(self, client):
+        _enviar(client)
+        header = _enviar(client).headers["Server-Timing"]
+        assert 'cache;desc="hit"' in header
+        assert set(_timings(header)) == {"total"}
+
+    def test_metrics_conta_parses_e_cache(self, client):
+        antes = client.get("/metrics").get_data(as_text=True)
+        _enviar(client)
+        _enviar(client)
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+        depois = response.get_data(as_text=True)
+
+        def delta(amostra):
+            return _valor(depois, amostra) - _valor(antes, amostra)
+
+        assert delta('pdf_parser_cache_requests_total{result="miss"}') == 1
+        assert delta('pdf_parser_cache_requests_total{result="hit"}') == 1
+        assert delta('pdf_parser_stage_duration_seconds_count{stage="get_text"}') == 1
+        assert delta("pdf_parser_request_bytes_count") == 2
+        assert delta("pdf_parser_pages_per_request_count") == 1
+        assert delta("pdf_parser_disciplines_per_request_count") == 2
+        assert (
+            delta('pdf_parser_requests_total{endpoint="/upload-pdf",status="200"}') == 2
+        )
+        # nenhuma requisição em andamento fora a própria raspagem do /metrics
+        assert (
+            _valor(depois, 'pdf_parser_requests_in_flight{endpoint="/upload-pdf"}') == 0
+        )
+        assert _valor(depois, 'pdf_parser_requests_in_flight{endpoint="/metrics"}') == 1
+
+    def test_streaming_registra_etapas(self, client):
+        antes = client.get("/metrics").get_data(as_text=True)
+        response = _enviar(client, Accept="application/x-ndjson")
+        response.get_data()  # consome o stream
+        depois = client.get("/metrics").get_data(as_text=True)
+        amostra = 'pdf_parser_stage_duration_seconds_count{stage="disciplinas"}'
+        assert _valor(depois, amostra) - _valor(antes, amostra) == 1
+
+    def test_metricas_desligadas(self, client, monkeypatch):
+        monkeypatch.setattr(pdf_parser_final, "METRICAS_ATIVAS", False)
+        assert client.get("/metrics").status_code == 404
+        assert "Server-Timing" not in _enviar(client).headers
+        assert metricas_parser.METRICAS_ATIVAS  # só a app foi desligada
@@ -0,0 +1,95 @@
+"""
+Testes dos perfis de resposta (?profile=full|lean|debug) e da compressão
+negociada do /upload-pdf
+(no_fluxo_backend/parse-pdf/pdf_parser_final.py e compressao_resposta.py).
+"""
+
+import gzip
+import io
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pdf_parser_final  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+
+HISTORICO = "historico_231026330.pdf"
+
+
+def _pdf():
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        return io.BytesIO(f.read())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _enviar(client, query="", **headers):
+    return client.post(
+        f"/upload-pdf{query}", data={"pdf": (_pdf(), HISTORICO)}, headers=headers
+    )
+
+
+class TestPerfisResposta:
+    def test_full_e_o_padrao(self, client):
+        dados = _enviar(client).get_json()
+        assert dados["full_text"]
+        assert "debug" not in dados
+
+    def test_lean_sem_full_text_e_mesmos_dados(self, client):
+        lean = _enviar(client, "?profile=lean").get_json()
+        full = _enviar(client).get_json()
+        assert "full_text" not in lean
+        assert {k: v for k, v in full.items() if k != "full_text"} == lean
+
+    def test_lean_nao_guarda_texto_no_cache(self, client):
+        _enviar(client, "?profile=lean")
+        # A entrada do lean não serve ao full: reprocessa e traz o texto
+        response = _enviar(client)
+        assert response.headers["X-Parse-Cache"] == "MISS"
+        assert response.get_json()["full_text"]
+
+    def test_debug_traz_diagnostico(self, client):
+        debug = _enviar(client, "?profile=debug").get_json()["debug"]
+        assert debug["versao_parser"] == pdf_parser_final.VERSAO_PARSER
+        assert debug["itens_por_tipo"]["Disciplina Regular"] > 0
+
+    def test_perfil_invalido(self, client):
+        response = _enviar(client, "?profile=minimo")
+        assert response.status_code == 400
+        assert response.get_json()["perfis"] == ["full", "lean", "debug"]
+
+
+class TestCompressao:
+    def test_gzip_negociado(self, client):
+        response = _enviar(client, **{"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert json.loads(gzip.decompress(response.get_data()))["full_text"]
+
+    def test_sem_accept_encoding_nao_comprime(self, client):
+        response = _enviar(client)
+        assert "Content-Encoding" not in response.headers
+
+    def test_resposta_pequena_nao_comprime(self, client):
+        response = client.get("/cache/stats", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+    def test_zstd_quando_disponivel(self, client):
+        zstandard = pytest.importorskip("zstandard")
+        response = _enviar(client, **{"Accept-Encoding": "gzip, zstd"})
+        assert response.headers["Content-Encoding"] == "zstd"
+        corpo = zstandard.ZstdDecompressor().decompress(response.get_data())
+        assert json.loads(corpo)["full_text"]
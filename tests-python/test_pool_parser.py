@@ -0,0 +1,82 @@
+"""
+Testes do pool de processos do serviço parse-pdf
+(no_fluxo_backend/parse-pdf/pool_parser.py).
+
+Cobre o despacho de jobs, a propagação de exceções do worker, o timeout por
+job e a reciclagem de workers após ``max_jobs`` execuções.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "no_fluxo_backend",
+        "parse-pdf",
+    ),
+)
+
+from pool_parser import PoolParser, PoolTimeoutError  # noqa: E402
+
+
+def _dobrar(valor):
+    return valor * 2
+
+
+def _pid(_):
+    return os.getpid()
+
+
+def _falhar(mensagem):
+    raise ValueError(mensagem)
+
+
+def _dormir(segundos):
+    time.sleep(segundos)
+    return segundos
+
+
+@pytest.fixture
+def criar_pool():
+    pools = []
+
+    def _criar(funcao, **kwargs):
+        pool = PoolParser(funcao, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield _criar
+    for pool in pools:
+        pool.encerrar()
+
+
+class TestPoolParser:
+    def test_executa_job_no_worker(self, criar_pool):
+        pool = criar_pool(_dobrar, workers=1, timeout=10, max_jobs=10)
+        assert pool.executar(21) == 42
+
+    def test_job_roda_fora_do_processo_principal(self, criar_pool):
+        pool = criar_pool(_pid, workers=1, timeout=10, max_jobs=10)
+        assert pool.executar(None) != os.getpid()
+
+    def test_excecao_do_worker_e_relancada(self, criar_pool):
+        pool = criar_pool(_falhar, workers=1, timeout=10, max_jobs=10)
+        with pytest.raises(ValueError, match="PDF corrompido"):
+            pool.executar("PDF corrompido")
+
+    def test_timeout_por_job(self, criar_pool):
+        pool = criar_pool(_dormir, workers=1, timeout=0.2, max_jobs=10)
+        with pytest.raises(PoolTimeoutError):
+            pool.executar(2)
+
+    def test_worker_reciclado_apos_max_jobs(self, criar_pool):
+        # Valor-limite: max_jobs=1 força um processo novo a cada job
+        pool = criar_pool(_pid, workers=1, timeout=10, max_jobs=1)
+        pids = {pool.executar(None) for _ in range(3)}
+        assert len(pids) == 3
@@ -0,0 +1,114 @@
+"""
+Testes do tokenizador de linhas e da máquina de estados que reconhece blocos
+de disciplina no texto do histórico
+(no_fluxo_backend/parse-pdf/pdf_parser_final.py).
+"""
+
+import os
+import sys
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "no_fluxo_backend",
+        "parse-pdf",
+    ),
+)
+
+from pdf_parser_final import (  # noqa: E402
+    ORDEM_ALTERNATIVA,
+    ORDEM_ORIGINAL,
+    TOK_ANO_PERIODO,
+    TOK_CARGA,
+    TOK_CODIGO,
+    TOK_FREQUENCIA,
+    TOK_MENCAO,
+    TOK_PROFESSOR,
+    TOK_SITUACAO,
+    TOK_TURMA,
+    classificar_linha,
+    reconhecer_disciplinas,
+    tokenizar_linhas,
+)
+
+BLOCO_ORIGINAL = [
+    "INTRODUÇÃO À ADMINISTRAÇÃO",
+    "2022.2",
+    "08",
+    "APR",
+    "ADM0023",
+    "60",
+    "100,0",
+    "MM",
+    "Dr. RILDO RIBEIRO DOS SANTOS (60h)",
+]
+
+
+def _reconhecer(linhas):
+    return list(reconhecer_disciplinas(*tokenizar_linhas(linhas)))
+
+
+class TestClassificarLinha:
+    def test_linha_vazia_nao_tem_classe(self):
+        assert classificar_linha("") == 0
+
+    def test_linha_pode_ter_varias_classes(self):
+        # Partição: "60" é ao mesmo tempo turma, carga horária e frequência
+        assert classificar_linha("60") == TOK_TURMA | TOK_CARGA | TOK_FREQUENCIA
+        # "MM" é turma e menção
+        assert classificar_linha("MM") == TOK_TURMA | TOK_MENCAO
+
+    def test_classes_exclusivas(self):
+        assert classificar_linha("2022.2") == TOK_ANO_PERIODO
+        assert classificar_linha("ADM0023") == TOK_CODIGO
+        assert classificar_linha("REPMF") == TOK_SITUACAO
+        assert classificar_linha("100,0") == TOK_FREQUENCIA
+
+    def test_mencao_com_travessao_unicode(self):
+        # D1: en-dash e em-dash contam como menção "-"
+        assert classificar_linha("–") & TOK_MENCAO
+        assert classificar_linha("—") & TOK_MENCAO
+
+    def test_professor_candidato(self):
+        assert classificar_linha("Dr. FULANO (60h)") & TOK_PROFESSOR
+
+
+class TestReconhecerDisciplinas:
+    def test_ordem_original(self):
+        ((indice, ordem, campos),) = _reconhecer(BLOCO_ORIGINAL)
+        assert indice == 0
+        assert ordem is ORDEM_ORIGINAL
+        assert campos == {
+            "nome": "INTRODUÇÃO À ADMINISTRAÇÃO",
+            "ano_periodo": "2022.2",
+            "turma": "08",
+            "situacao": "APR",
+            "codigo": "ADM0023",
+            "carga_h": "60",
+            "freq": "100,0",
+            "mencao": "MM",
+        }
+
+    def test_ordem_alternativa(self):
+        linhas = [BLOCO_ORIGINAL[1], BLOCO_ORIGINAL[0]] + BLOCO_ORIGINAL[2:]
+        ((indice, ordem, campos),) = _reconhecer(linhas)
+        assert ordem is ORDEM_ALTERNATIVA
+        assert campos["nome"] == "INTRODUÇÃO À ADMINISTRAÇÃO"
+
+    def test_linha_com_espacos_nas_pontas(self):
+        linhas = ["  " + linha + "  " for linha in BLOCO_ORIGINAL]
+        ((_, _, campos),) = _reconhecer(linhas)
+        assert campos["codigo"] == "ADM0023"
+
+    def test_bloco_quebrado_avanca_uma_linha(self):
+        # Ruído antes do bloco e bloco incompleto: o seguinte ainda é achado
+        incompleto = BLOCO_ORIGINAL[:4] + ["LIXO"] + BLOCO_ORIGINAL[5:]
+        resultado = _reconhecer(["Componente Curricular"] + incompleto + BLOCO_ORIGINAL)
+        assert [indice for indice, _, _ in resultado] == [10]
+
+    def test_bloco_no_fim_exige_linha_extra_na_ordem_original(self):
+        # Valor-limite herdado da janela antiga: a ordem original exige i+8 < n
+        assert _reconhecer(BLOCO_ORIGINAL[:8]) == []
+        assert len(_reconhecer(BLOCO_ORIGINAL[:9])) == 1
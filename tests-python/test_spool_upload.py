@@ -0,0 +1,109 @@
+"""
+Testes do spool de uploads do parse-pdf (no_fluxo_backend/parse-pdf/
+spool_upload.py): o PDF vai para disco com tamanho e SHA-256 calculados na
+gravação e o parse recebe o caminho, não os bytes.
+"""
+
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pdf_parser_final  # noqa: E402
+from cache_parser import CacheParser, chave_cache  # noqa: E402
+from spool_upload import ArquivoSpool, spool_de  # noqa: E402
+
+HISTORICO = "historico_231026330.pdf"
+
+
+def _pdf_bytes():
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    monkeypatch.setattr("spool_upload.SPOOL_DIR", str(tmp_path))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _enviar(client, conteudo=None, **headers):
+    conteudo = _pdf_bytes() if conteudo is None else conteudo
+    return client.post(
+        "/upload-pdf",
+        data={"pdf": (io.BytesIO(conteudo), HISTORICO)},
+        headers=headers,
+    )
+
+
+class TestArquivoSpool:
+    def test_tamanho_e_hash_da_gravacao(self, tmp_path):
+        with ArquivoSpool(str(tmp_path)) as spool:
+            spool.write(b"%PDF-1.7 ")
+            spool.write(b"abc")
+            spool.flush()
+            assert spool.tamanho == 12
+            assert spool.sha256() == hashlib.sha256(b"%PDF-1.7 abc").hexdigest()
+            with open(spool.caminho, "rb") as f:
+                assert f.read() == b"%PDF-1.7 abc"
+        assert not os.path.exists(spool.caminho)
+
+    def test_spool_de_copia_upload_em_memoria(self, tmp_path):
+        arquivo = FileStorage(stream=io.BytesIO(b"%PDF-1.7 abc"), filename="a.pdf")
+        spool = spool_de(arquivo)
+        try:
+            assert isinstance(spool, ArquivoSpool)
+            assert arquivo.stream is spool
+            assert arquivo.read() == b"%PDF-1.7 abc"
+            assert spool.tamanho == 12
+        finally:
+            spool.close()
+
+
+class TestUpload:
+    def test_parse_recebe_o_caminho(self, client, monkeypatch):
+        recebidos = []
+        original = pdf_parser_final.processar_pdf_medido
+
+        def registrar(pdf, incluir_texto=True):
+            recebidos.append(pdf)
+            return original(pdf, incluir_texto)
+
+        monkeypatch.setattr(pdf_parser_final, "processar_pdf_medido", registrar)
+        response = _enviar(client)
+        assert response.status_code == 200
+        assert len(recebidos) == 1 and isinstance(recebidos[0], str)
+
+    def test_chave_do_spool_igual_a_dos_bytes(self, client):
+        _enviar(client)
+        chave = chave_cache(_pdf_bytes(), pdf_parser_final.VERSAO_PARSER)
+        assert pdf_parser_final.cache_parse.obter(chave) is not None
+        assert _enviar(client).headers["X-Parse-Cache"] == "HIT"
+
+    def test_spool_apagado_ao_fim_da_requisicao(self, client, tmp_path):
+        _enviar(client)
+        assert glob.glob(str(tmp_path / "nofluxo-*")) == []
+
+    def test_streaming_le_o_pdf_depois_do_fim_da_requisicao(self, client, tmp_path):
+        response = _enviar(client, Accept="application/x-ndjson")
+        eventos = [json.loads(linha) for linha in response.get_data().splitlines()]
+        assert eventos[-1]["tipo"] == "fim"
+        assert glob.glob(str(tmp_path / "nofluxo-*")) == []
+
+    def test_pdf_invalido_nao_expoe_caminho(self, client, tmp_path):
+        response = _enviar(client, conteudo=b"isto nao e um pdf")
+        assert response.status_code == 400
+        assert str(tmp_path) not in response.get_data(as_text=True)
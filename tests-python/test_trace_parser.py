@@ -0,0 +1,108 @@
+"""
+Testes do trace de parse (no_fluxo_backend/parse-pdf/trace_parser.py) e do
+trace por requisição no /upload-pdf.
+"""
+
+import io
+import logging
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pdf_parser_final  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+from trace_parser import (  # noqa: E402
+    TraceParse,
+    capturar_trace,
+    registrar_resumo,
+    trace,
+    trace_ativo,
+)
+
+HISTORICO = "historico_231026330.pdf"
+
+
+class _Contador:
+    """Argumento que conta quantas vezes foi formatado."""
+
+    def __init__(self):
+        self.formatado = 0
+
+    def __str__(self):
+        self.formatado += 1
+        return "x"
+
+
+class TestTraceParse:
+    def test_desligado_nao_formata(self):
+        arg = _Contador()
+        assert not trace_ativo()
+        trace("TESTE", "valor %s", arg)
+        assert arg.formatado == 0
+
+    def test_capturar_registra_em_ordem(self):
+        with capturar_trace() as atual:
+            assert trace_ativo()
+            trace("CURSO", "Curso extraído: %s", "ENGENHARIA")
+            trace("FIM", "pronto")
+        assert not trace_ativo()
+        assert [(e["etapa"], e["mensagem"]) for e in atual.eventos] == [
+            ("CURSO", "Curso extraído: ENGENHARIA"),
+            ("FIM", "pronto"),
+        ]
+
+    def test_limite_de_eventos(self):
+        atual = TraceParse(max_eventos=2)
+        for i in range(5):
+            atual.registrar("E", "%d", (i,))
+        assert atual.como_dict()["descartados"] == 3
+        assert len(atual.eventos) == 2
+
+    def test_resumo_amostrado(self, caplog):
+        with caplog.at_level(logging.INFO, logger="trace_parser"):
+            registrar_resumo({"itens": 3}, amostra=0)
+            assert not caplog.records
+            registrar_resumo({"itens": 3}, amostra=1)
+        assert '"itens": 3' in caplog.records[0].getMessage()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+def _enviar(client, query="", **headers):
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        pdf = io.BytesIO(f.read())
+    return client.post(
+        f"/upload-pdf{query}", data={"pdf": (pdf, HISTORICO)}, headers=headers
+    )
+
+
+class TestTraceNaRequisicao:
+    def test_sem_trace_por_padrao(self, client):
+        assert "trace" not in _enviar(client).get_json()
+
+    def test_trace_por_query(self, client):
+        _enviar(client)  # resultado já em cache: o trace ignora o cache
+        response = _enviar(client, "?trace=1")
+        assert response.headers["X-Parse-Cache"] == "MISS"
+        etapas = {e["etapa"] for e in response.get_json()["trace"]["eventos"]}
+        assert {"CURSO", "MATRIZ", "IRA", "DISCIPLINAS", "FIM"} <= etapas
+
+    def test_trace_por_header(self, client):
+        dados = _enviar(client, **{"X-Parse-Trace": "1"}).get_json()
+        assert dados["trace"]["eventos"]
+
+    def test_parse_sem_trace_nao_escreve_no_stdout(self, client, capsys):
+        _enviar(client)
+        assert capsys.readouterr().out == ""
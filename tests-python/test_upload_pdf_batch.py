@@ -0,0 +1,107 @@
+"""
+Testes do endpoint /upload-pdf-batch do serviço parse-pdf
+(no_fluxo_backend/parse-pdf/pdf_parser_final.py).
+
+Usa os históricos reais de test_historicos/historicos como fixtures: o lote
+mistura PDFs soltos, um ZIP e arquivos inválidos para verificar que cada
+arquivo recebe sua própria linha NDJSON e que um erro não derruba o lote.
+"""
+
+import io
+import json
+import os
+import sys
+import zipfile
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pdf_parser_final  # noqa: E402
+import pool_parser  # noqa: E402
+
+HISTORICO_A = "historico_222038485.pdf"
+HISTORICO_B = "historico_231026330.pdf"
+
+
+def _abrir(nome):
+    with open(os.path.join(HISTORICOS, nome), "rb") as f:
+        return io.BytesIO(f.read())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pool_parser, "BATCH_WORKERS", 2)
+    pdf_parser_final.app.testing = True
+    yield pdf_parser_final.app.test_client()
+    if pool_parser._pool_lote is not None:
+        pool_parser._pool_lote.encerrar()
+        pool_parser._pool_lote = None
+
+
+def _linhas(response):
+    return [json.loads(linha) for linha in response.get_data(as_text=True).splitlines()]
+
+
+class TestUploadPdfBatch:
+    def test_sem_arquivos_retorna_400(self, client):
+        response = client.post("/upload-pdf-batch", data={})
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "Nenhum arquivo PDF ou ZIP enviado."
+
+    def test_lote_misto_uma_linha_por_arquivo(self, client):
+        zip_buf = io.BytesIO()
+        with zipfile.ZipFile(zip_buf, "w") as zf:
+            zf.writestr(f"pasta/{HISTORICO_B}", _abrir(HISTORICO_B).read())
+            zf.writestr("pasta/leiame.txt", "ignorado")
+        zip_buf.seek(0)
+
+        data = {
+            "pdfs": [
+                (_abrir(HISTORICO_A), HISTORICO_A),
+                (io.BytesIO(b"nao e pdf"), "corrompido.pdf"),
+                (zip_buf, "lote.zip"),
+                (io.BytesIO(b"nao e zip"), "quebrado.zip"),
+            ]
+        }
+        response = client.post(
+            "/upload-pdf-batch", data=data, content_type="multipart/form-data"
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+
+        por_arquivo = {linha["filename"]: linha for linha in _linhas(response)}
+        assert set(por_arquivo) == {
+            HISTORICO_A,
+            "corrompido.pdf",
+            f"pasta/{HISTORICO_B}",
+            "quebrado.zip",
+        }
+        assert por_arquivo["corrompido.pdf"]["status"] == 400
+        assert por_arquivo["quebrado.zip"]["status"] == 400
+
+        sucesso = por_arquivo[HISTORICO_A]
+        assert sucesso["status"] == 200
+        assert sucesso["matricula"] == "222038485"
+        assert sucesso["curso_extraido"] == "GESTÃO DE POLÍTICAS PÚBLICAS"
+        assert "extracted_data" in sucesso
+        assert por_arquivo[f"pasta/{HISTORICO_B}"]["status"] == 200
+
+    def test_lote_reusa_formato_do_upload_unico(self, client):
+        unico = client.post(
+            "/upload-pdf",
+            data={"pdf": (_abrir(HISTORICO_A), HISTORICO_A)},
+            content_type="multipart/form-data",
+        ).get_json()
+        (linha,) = _linhas(
+            client.post(
+                "/upload-pdf-batch",
+                data={"pdfs": [(_abrir(HISTORICO_A), HISTORICO_A)]},
+                content_type="multipart/form-data",
+            )
+        )
+        assert {k: v for k, v in linha.items() if k not in ("index", "status")} == unico
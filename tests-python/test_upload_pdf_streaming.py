@@ -0,0 +1,93 @@
+"""
+Testes do modo streaming (NDJSON) do /upload-pdf
+(no_fluxo_backend/parse-pdf/pdf_parser_final.py).
+
+O cliente pede o modo com ``Accept: application/x-ndjson``; o conteúdo
+somado dos eventos precisa bater com a resposta JSON normal.
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICOS = os.path.join(REPO_ROOT, "test_historicos", "historicos")
+
+# Torna os módulos de no_fluxo_backend/parse-pdf importáveis a partir de tests-python/
+sys.path.insert(0, os.path.join(REPO_ROOT, "no_fluxo_backend", "parse-pdf"))
+
+import pdf_parser_final  # noqa: E402
+from cache_parser import CacheParser  # noqa: E402
+
+HISTORICO = "historico_231026330.pdf"
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def _pdf():
+    with open(os.path.join(HISTORICOS, HISTORICO), "rb") as f:
+        return io.BytesIO(f.read())
+
+
+def _eventos(response):
+    return [json.loads(linha) for linha in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pdf_parser_final, "cache_parse", CacheParser(diretorio=None))
+    pdf_parser_final.app.testing = True
+    return pdf_parser_final.app.test_client()
+
+
+class TestUploadPdfStreaming:
+    def test_ordem_dos_eventos_e_conteudo_igual_ao_json(self, client):
+        response = client.post(
+            "/upload-pdf", data={"pdf": (_pdf(), HISTORICO)}, headers=NDJSON
+        )
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.headers["X-Parse-Cache"] == "MISS"
+        eventos = _eventos(response)
+
+        tipos = [evento["tipo"] for evento in eventos]
+        assert tipos[0] == "cabecalho" and tipos[-1] == "fim"
+        assert set(tipos[1:-1]) == {"disciplinas"}
+        paginas = [evento["pagina"] for evento in eventos[1:-1]]
+        assert paginas == sorted(paginas) and len(paginas) > 1
+
+        # Segunda chamada sai do cache em JSON normal
+        completo = client.post(
+            "/upload-pdf", data={"pdf": (_pdf(), HISTORICO)}
+        ).get_json()
+        assert eventos[0]["curso_extraido"] == completo["curso_extraido"]
+        assert eventos[0]["matriz_curricular"] == completo["matriz_curricular"]
+        assert eventos[-1]["equivalencias_pdf"] == completo["equivalencias_pdf"]
+        assert eventos[-1]["numero_semestre"] == completo["numero_semestre"]
+        regulares = [d for evento in eventos[1:-1] for d in evento["disciplinas"]]
+        assert regulares == [
+            d
+            for d in completo["extracted_data"]
+            if d.get("tipo_dado") == "Disciplina Regular"
+        ]
+        assert "full_text" not in {k for evento in eventos for k in evento}
+
+    def test_replay_do_cache(self, client):
+        client.post("/upload-pdf", data={"pdf": (_pdf(), HISTORICO)})
+        response = client.post(
+            "/upload-pdf", data={"pdf": (_pdf(), HISTORICO)}, headers=NDJSON
+        )
+        assert response.headers["X-Parse-Cache"] == "HIT"
+        tipos = [evento["tipo"] for evento in _eventos(response)]
+        assert tipos == ["cabecalho", "disciplinas", "fim"]
+
+    def test_pdf_invalido_continua_400(self, client):
+        response = client.post(
+            "/upload-pdf",
+            data={"pdf": (io.BytesIO(b"nao e pdf"), "corrompido.pdf")},
+            headers=NDJSON,
+        )
+        assert response.status_code == 400
+        assert "error" in response.get_json()